@@ -0,0 +1,280 @@
+# benchmark.py
+"""
+抽出・翻訳・書き戻しのベンチマーク（オフライン・Linux 可）
+
+python-pptx で合成デッキを作り、各ステージの処理時間を JSON で出力する
+翻訳は決定的なスタブで測る（--real-model で OpenVINO モデルも測れる）
+
+    python benchmark.py --slides 80 --shapes 12 --script cjk --out bench.json
+    python benchmark.py --baseline bench_baseline.json          # 基準との比較
+    python benchmark.py --save-baseline bench_baseline.json     # 基準を更新
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from pptx import Presentation
+from pptx.util import Inches, Pt
+
+import fake_powerpoint
+from model import PPTModel
+from ppt_com_model import PowerPointCOM
+from run_distribution import distribute_translation
+from stub_translator import StubTranslator
+import xml_extract
+
+CJK_WORDS = ["売上", "前年比", "成長", "新製品", "市場", "顧客", "戦略", "計画", "課題", "施策",
+             "品質", "改善", "開発", "導入", "効果", "目標", "実績", "予算", "体制", "推進"]
+LATIN_WORDS = ["revenue", "growth", "market", "customer", "strategy", "plan", "issue", "quality",
+               "improve", "launch", "target", "budget", "result", "team", "roadmap", "risk"]
+
+
+# ---------------------------
+# 合成デッキ
+# ---------------------------
+def _make_text(rng, script, words):
+    if script == "cjk":
+        return "".join(rng.choice(CJK_WORDS) for _ in range(words)) + "。"
+    return " ".join(rng.choice(LATIN_WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _fill_text_frame(text_frame, rng, script, paragraphs, runs_per_paragraph):
+    for p_idx in range(paragraphs):
+        p = text_frame.paragraphs[0] if p_idx == 0 else text_frame.add_paragraph()
+        for r_idx in range(runs_per_paragraph):
+            run = p.add_run()
+            run.text = _make_text(rng, script, rng.randint(2, 5))
+            run.font.size = Pt(14 + r_idx % 3 * 2)
+            run.font.bold = r_idx % 2 == 1
+
+
+def make_synthetic_deck(path, slides=20, shapes_per_slide=8, group_depth=0, paragraphs_per_shape=2,
+                        runs_per_paragraph=3, script="cjk", seed=0):
+    """
+    合成 .pptx を作る
+    group_depth > 0 なら各スライドの図形の半分をその深さまで入れ子のグループに入れる
+    """
+    rng = random.Random(seed)
+    prs = Presentation()
+    layout = prs.slide_layouts[6]  # 白紙
+    for _ in range(slides):
+        slide = prs.slides.add_slide(layout)
+        for s_idx in range(shapes_per_slide):
+            container = slide.shapes
+            if group_depth and s_idx % 2 == 1:
+                for _ in range(group_depth):
+                    container = container.add_group_shape().shapes
+            box = container.add_textbox(Inches(0.5), Inches(0.3 + 0.5 * s_idx), Inches(9), Inches(0.5))
+            _fill_text_frame(box.text_frame, rng, script, paragraphs_per_shape, runs_per_paragraph)
+    prs.save(path)
+    return path
+
+
+# ---------------------------
+# 計測
+# ---------------------------
+def time_call(fn, repeat=3, setup=None):
+    """fn を repeat 回計測する（setup の戻り値を fn に渡す）"""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        result = fn(arg) if setup else fn()
+        samples.append(time.perf_counter() - start)
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "runs": len(samples),
+    }, result
+
+
+def _collect_run_texts(path):
+    """python-pptx で段落ごとの run テキスト一覧を集める（distribute_translation 計測用）"""
+    paragraphs = []
+
+    def walk(shapes):
+        for shape in shapes:
+            if shape.shape_type == 6:  # group
+                walk(shape.shapes)
+            elif shape.has_text_frame:
+                for p in shape.text_frame.paragraphs:
+                    runs = [r.text for r in p.runs]
+                    if runs:
+                        paragraphs.append(runs)
+
+    for slide in Presentation(path).slides:
+        walk(slide.shapes)
+    return paragraphs
+
+
+def bench_com_replace(params, translator, repeat=3):
+    """
+    フェイクの COM オブジェクトモデルで replace_text_preserve_format を計測する
+    時間に加えて COM 往復回数（com_calls）も返す
+    """
+    words = CJK_WORDS if params.get("script", "cjk") == "cjk" else [w + " " for w in LATIN_WORDS]
+    spec = fake_powerpoint.make_random_spec(
+        slides=params["slides"], shapes_per_slide=params["shapes_per_slide"],
+        paragraphs_per_shape=params["paragraphs_per_shape"],
+        runs_per_paragraph=params["runs_per_paragraph"], words=words, seed=params.get("seed", 0))
+
+    def setup():
+        ppt = PowerPointCOM.from_presentation(fake_powerpoint.build_presentation(spec))
+        slides_text = ppt.extract_texts()
+        translations = [translator.translate_batch(texts) for texts in slides_text]
+        ppt.com_calls.reset()
+        return ppt, slides_text, translations
+
+    def replace(args):
+        ppt, slides_text, translations = args
+        for idx, texts in enumerate(slides_text):
+            ppt.replace_text_preserve_format(idx, texts, translations[idx])
+        return ppt.com_calls.calls
+
+    result, calls = time_call(replace, repeat, setup=setup)
+    result["com_calls"] = calls
+    result["paragraphs"] = params["slides"] * params["shapes_per_slide"] * params["paragraphs_per_shape"]
+    result["text_runs"] = result["paragraphs"] * params["runs_per_paragraph"]
+    return result
+
+
+def run_benchmarks(params, repeat=3, real_model=False, workdir=None):
+    workdir = workdir or tempfile.mkdtemp(prefix="pptmaster_bench_")
+    deck = make_synthetic_deck(os.path.join(workdir, "synthetic.pptx"), **params)
+    results = {}
+
+    # PPTModel は開いただけでは python-pptx を読み込まない（抽出は xml_extract）
+    results["extract_slides_text"], slides_text = time_call(
+        lambda: PPTModel(deck).extract_slides_text(), repeat)
+    results["open_presentation"], _ = time_call(lambda: PPTModel(deck).presentation, repeat)
+    results["extract_xml_stream"], _ = time_call(
+        lambda: xml_extract.extract_slides_text(deck, include_notes=True), repeat)
+
+    stub = StubTranslator()
+    translations = [stub.translate_batch(texts) for texts in slides_text]
+
+    def update(ppt):
+        for idx, texts in enumerate(translations):
+            ppt.update_slide_text(idx, texts)
+        return ppt
+
+    def opened():
+        ppt = PPTModel(deck)
+        ppt.presentation
+        return ppt
+
+    results["update_slide_text"], updated = time_call(update, repeat, setup=opened)
+    out_path = os.path.join(workdir, "synthetic_out.pptx")
+    results["save"], _ = time_call(lambda: updated.save(path=out_path), repeat)
+    results["save_incremental"], _ = time_call(
+        lambda: updated.save(path=out_path, incremental=True), repeat)
+
+    paragraphs = _collect_run_texts(deck)
+    pieces = [(runs, stub.translate_text("".join(runs))) for runs in paragraphs]
+    results["distribute_translation"], _ = time_call(
+        lambda: [distribute_translation(runs, trans) for runs, trans in pieces], repeat)
+
+    results["com_replace"] = bench_com_replace(params, stub, repeat)
+
+    flat = [t for texts in slides_text for t in texts]
+    results["translate_stub"], _ = time_call(lambda: StubTranslator().translate_batch(flat), repeat)
+
+    if real_model:
+        from translator_model import TranslatorModel
+
+        translator = TranslatorModel()
+        results["translate_model"], _ = time_call(lambda: translator.translate_batch(flat), 1)
+
+    return {
+        "params": params,
+        "counts": {
+            "slides": len(slides_text),
+            "texts": len(flat),
+            "chars": sum(len(t) for t in flat),
+            "paragraphs": len(paragraphs),
+            "runs": sum(len(r) for r in paragraphs),
+            "deck_bytes": os.path.getsize(deck),
+        },
+        "env": {"python": platform.python_version(), "platform": platform.platform()},
+        "results": results,
+    }
+
+
+def compare(report, baseline, tolerance=0.2):
+    """基準との比較。median_s が (1 + tolerance) 倍を超えたものを回帰とする"""
+    comparison = {}
+    for name, current in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or not base.get("median_s"):
+            continue
+        ratio = current["median_s"] / base["median_s"]
+        comparison[name] = {
+            "baseline_s": base["median_s"],
+            "current_s": current["median_s"],
+            "ratio": ratio,
+            "regression": ratio > 1 + tolerance,
+        }
+    return comparison
+
+
+# ---------------------------
+# コマンドライン
+# ---------------------------
+def build_parser():
+    parser = argparse.ArgumentParser(description="pptmaster ベンチマーク")
+    parser.add_argument("--slides", type=int, default=20)
+    parser.add_argument("--shapes", type=int, default=8, help="スライドあたりの図形数")
+    parser.add_argument("--group-depth", type=int, default=0, help="グループの入れ子の深さ")
+    parser.add_argument("--paragraphs", type=int, default=2, help="図形あたりの段落数")
+    parser.add_argument("--runs", type=int, default=3, help="段落あたりの run 数")
+    parser.add_argument("--script", choices=["cjk", "latin"], default="cjk")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--real-model", action="store_true", help="OpenVINO モデルでの翻訳も計測する")
+    parser.add_argument("--out", help="結果 JSON の出力先（省略時は標準出力）")
+    parser.add_argument("--baseline", help="比較する基準 JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="回帰とみなす悪化率")
+    parser.add_argument("--save-baseline", help="今回の結果を基準として保存する")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    params = {
+        "slides": args.slides, "shapes_per_slide": args.shapes, "group_depth": args.group_depth,
+        "paragraphs_per_shape": args.paragraphs, "runs_per_paragraph": args.runs,
+        "script": args.script, "seed": args.seed,
+    }
+    report = run_benchmarks(params, args.repeat, args.real_model)
+
+    regressions = []
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            report["comparison"] = compare(report, json.load(f), args.tolerance)
+        regressions = [name for name, c in report["comparison"].items() if c["regression"]]
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    if regressions:
+        print(f"⚠️ 回帰: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+# com_snapshot.py
+"""
+PowerPoint COM の往復回数を減らすためのスナップショット層
+
+- CountingProxy / ComCallCounter: COM オブジェクトへのアクセス（プロパティ取得・設定・メソッド呼び出し・
+  列挙）を1往復として数える
+- ShapeSnapshot: 図形のテキストと runs を1回だけ読み込み、オフセット索引を作ってから
+  置換位置をローカルで解決し、最後に変更のある run だけを1パスで書き込む
+
+往復回数は 段落数 × run 数 から run 数 のオーダーに減る
+"""
+from bisect import bisect_right
+import inspect
+
+_PRIMITIVES = (str, int, float, bool, bytes, type(None))
+
+
+class ComCallCounter:
+    def __init__(self):
+        self.calls = 0
+
+    def reset(self):
+        self.calls = 0
+
+
+def _unwrap(value):
+    return object.__getattribute__(value, "_obj") if isinstance(value, CountingProxy) else value
+
+
+def _wrap(value, counter):
+    if isinstance(value, _PRIMITIVES) or isinstance(value, CountingProxy):
+        return value
+    return CountingProxy(value, counter)
+
+
+class CountingProxy:
+    """COM オブジェクト（またはフェイク）を包み、往復1回ごとに counter.calls を増やす"""
+
+    __slots__ = ("_obj", "_counter")
+
+    def __init__(self, obj, counter):
+        object.__setattr__(self, "_obj", obj)
+        object.__setattr__(self, "_counter", counter)
+
+    def __getattr__(self, name):
+        obj = object.__getattribute__(self, "_obj")
+        counter = object.__getattribute__(self, "_counter")
+        value = getattr(obj, name)
+        if inspect.ismethod(value) or inspect.isbuiltin(value):
+            # メソッドは呼び出した時点で1往復
+            def method(*args, **kwargs):
+                counter.calls += 1
+                result = value(*[_unwrap(a) for a in args],
+                               **{k: _unwrap(v) for k, v in kwargs.items()})
+                return _wrap(result, counter)
+            return method
+        counter.calls += 1
+        return _wrap(value, counter)
+
+    def __setattr__(self, name, value):
+        object.__getattribute__(self, "_counter").calls += 1
+        setattr(object.__getattribute__(self, "_obj"), name, _unwrap(value))
+
+    def __call__(self, *args, **kwargs):
+        counter = object.__getattribute__(self, "_counter")
+        counter.calls += 1
+        result = object.__getattribute__(self, "_obj")(*[_unwrap(a) for a in args],
+                                                       **{k: _unwrap(v) for k, v in kwargs.items()})
+        return _wrap(result, counter)
+
+    def __iter__(self):
+        counter = object.__getattribute__(self, "_counter")
+        counter.calls += 1
+        for item in object.__getattribute__(self, "_obj"):
+            counter.calls += 1
+            yield _wrap(item, counter)
+
+
+def read_runs(text_range):
+    """TextRange の runs を Python リストにする（取得できなければ None）"""
+    if text_range is None:
+        return None
+    runs = []
+    try:
+        runs_col = text_range.Runs()
+        count = int(runs_col.Count)
+        for i in range(1, count + 1):
+            runs.append(runs_col.Item(i))
+    except Exception:
+        try:
+            for r in text_range.Runs:
+                runs.append(r)
+        except Exception:
+            return None
+    return runs
+
+
+def _norm(s):
+    """比較用の正規化（全角スペース→半角、前後の空白除去）"""
+    return s.replace('\u3000', ' ').strip()
+
+
+class ShapeSnapshot:
+    """1つの図形のテキスト・runs を一度だけ読んだローカルコピー"""
+
+    def __init__(self, shape):
+        self.text_range = shape.TextFrame.TextRange
+        self.runs = read_runs(self.text_range) or []
+        self.run_texts = [r.Text or "" for r in self.runs]
+        # runs の連結が図形全体のテキストなので、取れた場合は Text を別に読まない
+        self.full_text = "".join(self.run_texts) if self.runs else self.text_range.Text
+
+        # オフセット索引（run i は combined[starts[i]:ends[i]]）
+        self.starts = []
+        self.ends = []
+        pos = 0
+        for t in self.run_texts:
+            self.starts.append(pos)
+            pos += len(t)
+            self.ends.append(pos)
+        # 全角スペースの置き換えは長さを変えないので、位置はそのまま run に対応する
+        self.search_text = "".join(self.run_texts).replace('\u3000', ' ')
+        self.cursor = 0
+
+        self.edits = {}  # run index -> [(run内開始, run内終了, 新テキスト)]
+        self.local_full = self.full_text  # runs が取れない図形用
+
+    def paragraphs(self):
+        return [p for p in self.full_text.split('\r') if p]
+
+    def _locate(self, orig):
+        key = _norm(orig)
+        if not key:
+            return None
+        start = self.search_text.find(key, self.cursor)
+        if start < 0:
+            start = self.search_text.find(key)
+        if start < 0:
+            return None
+        return start, start + len(key)
+
+    def replace(self, orig, trans, distribute):
+        """orig に対応する run 範囲を探し、trans を run に分配して変更を溜める（書き込みはしない）"""
+        if not self.runs:
+            # runs が取れない場合は図形全体のテキストで置換（書式は失われる）
+            if orig and orig in self.local_full:
+                self.local_full = self.local_full.replace(orig, trans, 1)
+                return True
+            return False
+
+        span = self._locate(orig)
+        if span is None:
+            return False
+        start, end = span
+
+        first = bisect_right(self.starts, start) - 1
+        indices = []
+        for i in range(max(first, 0), len(self.runs)):
+            if self.starts[i] >= end:
+                break
+            if self.ends[i] > start:
+                indices.append(i)
+        if not indices:
+            return False
+
+        slices = []
+        for i in indices:
+            a = max(start, self.starts[i]) - self.starts[i]
+            b = min(end, self.ends[i]) - self.starts[i]
+            slices.append((i, a, b))
+        pieces = distribute([self.run_texts[i][a:b] for i, a, b in slices], trans)
+        for (i, a, b), piece in zip(slices, pieces):
+            self.edits.setdefault(i, []).append((a, b, piece))
+        self.cursor = end
+        return True
+
+    def apply(self):
+        """溜めた変更を書き込む。変更のある run だけ、後ろから1回ずつ書く。書き込み回数を返す"""
+        writes = 0
+        if not self.runs:
+            if self.local_full != self.full_text:
+                self.text_range.Text = self.local_full
+                writes += 1
+            return writes
+
+        # 後ろの run から書けば、前の run の位置は書き込みの影響を受けない
+        for i in sorted(self.edits, reverse=True):
+            text = self.run_texts[i]
+            out = []
+            pos = 0
+            for a, b, piece in sorted(self.edits[i]):
+                out.append(text[pos:a])
+                out.append(piece)
+                pos = b
+            out.append(text[pos:])
+            new_text = "".join(out)
+            if new_text != text:
+                try:
+                    self.runs[i].Text = new_text
+                    writes += 1
+                except Exception:
+                    pass
+        return writes
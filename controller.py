@@ -1,87 +1,430 @@
 # controller.py
-from ppt_com_model import PowerPointCOM
+import os
 from translator_model import TranslatorModel
+from translation_cache import TranslationCache
+from translation_server import SERVER_ENV, TranslationClient
 from ppt_view import PPTView
+from workers import BackgroundCall, DeckTranslateJob, PPTDocumentWorker, TranslateJob
+import startup_profile
+from PySide6.QtCore import QObject, QThread, QThreadPool
 from PySide6.QtWidgets import QFileDialog
 
-class PPTController:
+class PPTController(QObject):
+    # QObject にしておくと、ワーカースレッドからのシグナルが GUI スレッドのスロットへキューで届く
     def __init__(self, view: PPTView):
+        super().__init__()
         self.view = view
-        self.ppt = None
-        self.translator = TranslatorModel()
+        self.translator = None  # バックグラウンドで読み込む（準備完了まで翻訳ボタンは無効）
         self.slides_text = []  # 元テキスト保持
-        self.preview_translations = []  # 翻訳文保持
+        self.preview_translations = []  # 翻訳文保持（表示中スライド）
+        self.translations_by_slide = {}  # 翻訳済みスライド（先読み分を含む）
+        self.partial_translations = {}  # 翻訳中スライドの途中結果
+        self.jobs = {}  # slide_idx -> 実行中の TranslateJob
+        self.known_by_slide = {}  # マニフェストから引き継いだ訳文（一部の段落だけ分かっているスライド）
+        self.accepted_by_slide = {}  # slide_idx -> 置換した（チェックした）段落番号の集合
+        self.applied_by_slide = {}  # 置換済みスライドの、文書中にある段落テキスト（置換時の検索に使う）
+        self.deck_job = None  # 実行中の DeckTranslateJob（全スライド一括）
+
+        # PowerPoint 操作は専用スレッドで行う（COM はそのスレッドに閉じる）
+        self.document = PPTDocumentWorker()
+        self.document_thread = QThread()
+        self.document.moveToThread(self.document_thread)
+        self.document_thread.start()
+        self.document.restored.connect(self.on_restored)
+        self.document.loaded.connect(self.on_loaded)
+        self.document.saved.connect(self.on_saved)
+        self.document.failed.connect(self.on_failed)
+        self.document.replaced.connect(self.on_replaced)
+        self.document.deck_progress.connect(self.on_deck_replace_progress)
+        self.document.deck_replaced.connect(self.on_deck_replaced)
+        self.document.applied.connect(self.on_applied)
+
+        # 翻訳は1本のワーカースレッドで順に実行（モデルを同時に呼ばない）
+        self.translate_pool = QThreadPool()
+        self.translate_pool.setMaxThreadCount(1)
+        self.background = []  # 実行中の BackgroundCall（GC されないよう保持）
+        self.translator_ready_callbacks = []  # モデル読み込み完了（成否問わず）時に呼ぶ
 
         # ボタン・スライド選択連携
         view.open_btn.clicked.connect(self.load_ppt)
         view.translate_btn.clicked.connect(self.translate_slide)
+        view.deck_btn.clicked.connect(self.translate_deck)
+        view.cancel_btn.clicked.connect(self.cancel_translation)
         view.replace_btn.clicked.connect(self.replace_slide_partial)
         view.save_btn.clicked.connect(self.save_ppt)
         view.slide_select.currentIndexChanged.connect(self.on_slide_change)
 
+        # 🚀 ウィンドウ表示を待たせないよう、重い初期化は裏で行う
+        self._run_background(QThreadPool.globalInstance(), view.detect_devices,
+                             self.on_devices_detected)
+        self._run_background(self.translate_pool, self._load_translator,
+                             self.on_translator_loaded, self.on_translator_failed)
+
+    # ----------------------------
+    # バックグラウンド初期化
+    # ----------------------------
+    def _run_background(self, pool, fn, on_done, on_failed=None):
+        call = BackgroundCall(fn)
+        self.background.append(call)
+
+        def finish(result, handler):
+            self.background.remove(call)
+            if handler is not None:
+                handler(result)
+
+        call.signals.done.connect(lambda result: finish(result, on_done))
+        call.signals.failed.connect(lambda message: finish(message, on_failed))
+        pool.start(call)
+
+    @staticmethod
+    def _load_translator():
+        # PPT_MASTER_SERVER があれば翻訳サーバを使い、モデルは読み込まない
+        if os.environ.get(SERVER_ENV):
+            client = TranslationClient(os.environ[SERVER_ENV])
+            client.stats()  # 接続できなければここで失敗させる
+            return client
+        return TranslatorModel(cache=TranslationCache())
+
+    def on_devices_detected(self, info_text):
+        self.view.update_device_info(info_text)
+        startup_profile.mark("devices detected")
+
+    def on_translator_loaded(self, translator):
+        self.translator = translator
+        self.view.set_model_ready(True, "✅ 翻訳モデル準備完了")
+        startup_profile.mark("model ready")
+        if self.slides_text:
+            self._prefetch(self.view.slide_select.currentIndex() + 1)
+        for callback in self.translator_ready_callbacks:
+            callback(translator)
+
+    def on_translator_failed(self, message):
+        self.view.set_model_ready(False, f"❌ 翻訳モデルを読み込めませんでした: {message}")
+        startup_profile.mark("model failed")
+        for callback in self.translator_ready_callbacks:
+            callback(None)
+
     def load_ppt(self):
         path, _ = QFileDialog.getOpenFileName(self.view, "PPTを選択", "", "PowerPoint (*.pptx)")
         if not path:
             return
-        self.ppt = PowerPointCOM(path)
-        self.slides_text = self.ppt.extract_texts()
+        self._cancel_all_jobs()
+        self.translations_by_slide = {}
+        self.partial_translations = {}
+        self.known_by_slide = {}
+        self.accepted_by_slide = {}
+        self.applied_by_slide = {}
+        self.view.set_busy(True, "📂 読み込み中…")
+        self.document.open_requested.emit(path)
+
+    def on_restored(self, restored):
+        """前回の訳文を引き継ぐ。全段落が分かっているスライドは翻訳済みとして扱う"""
+        for slide_idx, (translations, accepted) in restored.items():
+            if all(t is not None for t in translations):
+                self.translations_by_slide[slide_idx] = translations
+            else:
+                self.known_by_slide[slide_idx] = translations
+            self.accepted_by_slide[slide_idx] = set(accepted)
+
+    def on_loaded(self, slides_text):
+        self.slides_text = slides_text
+        self.view.set_busy(False)
         self.view.slide_select.clear()
         self.view.slide_select.addItems([f"Slide {i+1}" for i in range(len(self.slides_text))])
         self.on_slide_change(0)
         self.preview_translations = []
 
+    def on_failed(self, message):
+        self.view.set_busy(False, message)
+
     def on_slide_change(self, idx):
-        """スライド切替時は元テキスト表示、チェックリストは空に"""
-        if not self.ppt:
+        """スライド切替時は元テキスト表示。先読み済みなら翻訳も即表示"""
+        if not self.slides_text or idx < 0:
             return
         texts = self.slides_text[idx]
         self.view.input_text.setText("\n".join(texts))
-        self.view.text_list_widget.clear()  # 翻訳前はチェックリスト表示しない
+        self.view.clear_text_list()  # 翻訳前はチェックリスト表示しない
+        self.preview_translations = []
+
+        if idx in self.translations_by_slide:
+            self._show_translations(idx)
+        elif idx in self.jobs:
+            self.jobs[idx].prefetch = False  # 先読み中ならそのまま表示に切り替える
+            self._show_partial(idx)
+        else:
+            self.view.set_busy(False)
+
+        # 次のスライドを裏で翻訳しておく（もう次ではないスライドの先読みは止める）
+        for slide_idx, job in list(self.jobs.items()):
+            if job.prefetch and slide_idx != idx + 1:
+                self._cancel_job(slide_idx)
+        self._prefetch(idx + 1)
 
     def translate_slide(self):
-        """スライド内テキストを翻訳してチェックリストに反映"""
-        if not self.ppt:
+        """スライド内テキストを翻訳してチェックリストに反映（段落ごとに逐次表示）"""
+        if not self.slides_text or self.translator is None:
+            return
+        idx = self.view.slide_select.currentIndex()
+        if idx in self.translations_by_slide:
+            self._show_translations(idx)
             return
+
+        # 他スライドの先読みは止め、このスライドを優先する
+        for slide_idx, job in list(self.jobs.items()):
+            if slide_idx != idx and job.prefetch:
+                self._cancel_job(slide_idx)
+
+        job = self.jobs.get(idx)
+        if job is None:
+            self._start_job(idx, prefetch=False)
+        else:
+            job.prefetch = False  # 先読み中のジョブをそのまま引き継ぐ
+        self._show_partial(idx)
+
+    def cancel_translation(self):
+        if self.deck_job is not None:
+            self._cancel_deck_job()
         idx = self.view.slide_select.currentIndex()
+        self._cancel_job(idx)
+        self.view.set_busy(False, "⏹ 翻訳をキャンセルしました")
+
+    # ----------------------------
+    # 翻訳ジョブ管理
+    # ----------------------------
+    def _start_job(self, idx, prefetch):
+        job = TranslateJob(self.translator, idx, self.slides_text[idx], prefetch=prefetch,
+                           known=self.known_by_slide.get(idx))
+        job.signals.paragraph_done.connect(
+            lambda slide_idx, i, text, job=job: self.on_paragraph_done(job, i, text))
+        job.signals.finished.connect(
+            lambda slide_idx, results, job=job: self.on_job_finished(job, results))
+        job.signals.failed.connect(
+            lambda slide_idx, message, job=job: self.on_job_failed(job, message))
+        self.jobs[idx] = job
+        self.partial_translations[idx] = []
+        self.translate_pool.start(job, 0 if prefetch else 1)
+        return job
+
+    def _prefetch(self, idx):
+        if self.translator is None or self.deck_job is not None:
+            return
+        if idx >= len(self.slides_text) or idx in self.translations_by_slide or idx in self.jobs:
+            return
+        self._start_job(idx, prefetch=True)
+
+    def _cancel_job(self, idx):
+        job = self.jobs.pop(idx, None)
+        if job is not None:
+            job.cancel()
+            self.partial_translations.pop(idx, None)
+
+    def _cancel_all_jobs(self):
+        for idx in list(self.jobs):
+            self._cancel_job(idx)
+        self._cancel_deck_job()
+
+    def _is_current(self, job):
+        return self.jobs.get(job.slide_idx) is job and not job.is_cancelled
+
+    def _is_visible(self, job):
+        return not job.prefetch and job.slide_idx == self.view.slide_select.currentIndex()
+
+    def on_paragraph_done(self, job, i, text):
+        if not self._is_current(job):
+            return
+        self.partial_translations[job.slide_idx].append(text)
+        if self._is_visible(job):
+            self.view.add_text_item(text, original=job.texts[i], key=(job.slide_idx, i))
+            self.view.output_text.setText("\n".join(self.partial_translations[job.slide_idx]))
+            self.view.status_label.setText(
+                f"翻訳中… {i + 1}/{len(job.texts)} (Slide {job.slide_idx + 1})")
+
+    def on_job_finished(self, job, results):
+        if not self._is_current(job):
+            return
+        del self.jobs[job.slide_idx]
+        self.partial_translations.pop(job.slide_idx, None)
+        self.translations_by_slide[job.slide_idx] = results
+        self.known_by_slide.pop(job.slide_idx, None)
+        self.document.record_requested.emit(job.slide_idx, results)
+        if self._is_visible(job):
+            self.preview_translations = results
+            self.view.set_busy(False, f"✅ 翻訳完了 (Slide {job.slide_idx + 1})")
+            self._prefetch(job.slide_idx + 1)
+
+    def on_job_failed(self, job, message):
+        if not self._is_current(job):
+            return
+        self._cancel_job(job.slide_idx)
+        if self._is_visible(job):
+            self.view.set_busy(False, f"❌ 翻訳に失敗しました: {message}")
+
+    # ----------------------------
+    # 全スライド一括の翻訳・置換
+    # ----------------------------
+    def translate_deck(self):
+        """
+        全スライドの段落を重複なしで1つのジョブにまとめて翻訳し、
+        終わったらプレゼンテーションを1回走査してすべて置換する
+        """
+        if not self.slides_text or self.translator is None or self.deck_job is not None:
+            return
+        # スライド単位のジョブ（先読みを含む）は止め、一括ジョブに任せる
+        for idx in list(self.jobs):
+            self._cancel_job(idx)
+
+        # 置換済みで訳が揃っているスライドはそのまま（利用者の選択を残す）
+        # 翻訳済みで未置換のスライド（先読み分など）は訳文を known として渡し、置換だけ行う
+        pending = {idx: texts for idx, texts in enumerate(self.slides_text)
+                   if idx not in self.translations_by_slide or idx not in self.applied_by_slide}
+        known = dict(self.known_by_slide)
+        known.update({idx: self.translations_by_slide[idx] for idx in pending if idx in self.translations_by_slide})
+        job = DeckTranslateJob(self.translator, pending, known=known)
+        job.signals.progress.connect(
+            lambda done, total, job=job: self.on_deck_progress(job, done, total))
+        job.signals.finished.connect(lambda results, job=job: self.on_deck_finished(job, results))
+        job.signals.failed.connect(lambda message, job=job: self.on_deck_failed(job, message))
+        self.deck_job = job
+        unique = len(job.unique_texts())
+        total = sum(len(texts) for texts in pending.values())
+        self.view.set_busy(True, f"🌐 全スライド翻訳中… 0/{unique}（{total} 段落）")
+        self.translate_pool.start(job, 1)
+
+    def _cancel_deck_job(self):
+        if self.deck_job is not None:
+            self.deck_job.cancel()
+            self.deck_job = None
+
+    def on_deck_progress(self, job, done, total):
+        if job is self.deck_job:
+            self.view.status_label.setText(f"🌐 全スライド翻訳中… {done}/{total}")
+
+    def on_deck_failed(self, job, message):
+        if job is self.deck_job:
+            self.deck_job = None
+            self.view.set_busy(False, f"❌ 翻訳に失敗しました: {message}")
+
+    def on_deck_finished(self, job, results):
+        if job is not self.deck_job:
+            return
+        self.deck_job = None
+        for idx, translations in results.items():
+            self.translations_by_slide[idx] = translations
+            self.known_by_slide.pop(idx, None)
+            self.document.record_requested.emit(idx, translations)
+
+        # このジョブで扱ったスライドだけ置換する（PowerPoint 操作スレッドで1回だけ走査）
+        # 置換済みのスライドは利用者の選択を残し、未置換のスライドは全段落を採用する
+        slides = {}
+        for idx, translations in results.items():
+            if not translations:
+                continue
+            if idx in self.applied_by_slide:
+                accepted = self.accepted_by_slide.get(idx, set())
+            else:
+                accepted = set(range(len(translations)))
+            self.accepted_by_slide[idx] = accepted
+            slides[idx] = (self._document_text(idx), self._apply_selection(idx, translations, accepted))
+            self.applied_by_slide[idx] = slides[idx][1]
+        self.document.replace_deck_requested.emit(slides)
+
+        idx = self.view.slide_select.currentIndex()
+        if idx in self.translations_by_slide:
+            self._show_translations(idx)
+        self.view.set_busy(True, f"🔁 置換中… 0/{len(slides)} スライド")
+
+    def on_replaced(self, slide_idx, count, misses):
+        """1枚分の置換数と、置換できなかった段落を表示する"""
+        lines = [f"\n✅ Slide {slide_idx + 1}: {count} 段落を置換しました"]
+        if misses:
+            lines.append(f"⚠️ {len(misses)} 段落を置換できませんでした")
+            lines.extend(f"   - {orig}" for orig, _ in misses[:5])
+            if len(misses) > 5:
+                lines.append(f"   … ほか {len(misses) - 5} 段落")
+        self.view.output_text.append("\n".join(lines))
+
+    def on_deck_replace_progress(self, done, total):
+        self.view.status_label.setText(f"🔁 置換中… {done}/{total} スライド")
+
+    def on_deck_replaced(self, results):
+        """スライドごとの置換数と、置換できなかった段落をまとめて表示する"""
+        replaced = sum(count for count, _ in results.values())
+        missed = {idx: misses for idx, (_, misses) in sorted(results.items()) if misses}
+        lines = [f"\n✅ 全スライド置換: {replaced} 段落（{len(results)} スライド）"]
+        for idx, misses in missed.items():
+            lines.append(f"⚠️ Slide {idx + 1}: {len(misses)} 段落を置換できませんでした")
+            lines.extend(f"   - {orig}" for orig, _ in misses[:5])
+            if len(misses) > 5:
+                lines.append(f"   … ほか {len(misses) - 5} 段落")
+        self.view.output_text.append("\n".join(lines))
+        self.view.set_busy(False, f"✅ 全スライド置換完了（未置換 {sum(map(len, missed.values()))} 段落）")
+        # 置換後のテキストを入力欄に反映
+        idx = self.view.slide_select.currentIndex()
+        if idx in results:
+            self.view.input_text.setText("\n".join(self._document_text(idx)))
+
+    def on_applied(self, applied):
+        """置換後に文書中にあるテキストで置き換える（置換できなかった段落は元のまま）"""
+        self.applied_by_slide.update(applied)
+
+    def _document_text(self, idx):
+        """文書中の現在の段落テキスト（未置換のスライドは原文）"""
+        return self.applied_by_slide.get(idx, self.slides_text[idx])
+
+    def _apply_selection(self, idx, translations, selected):
+        """チェックした段落は訳文、それ以外は原文に戻したテキスト"""
         originals = self.slides_text[idx]
+        return [t if i in selected else originals[i] for i, t in enumerate(translations)]
 
-        # 翻訳
-        self.preview_translations = [self.translator.translate_text(t) for t in originals]
-        self.view.output_text.setText("\n".join(self.preview_translations))
+    def _keys(self, idx):
+        return [(idx, i) for i in range(len(self.slides_text[idx]))]
 
-        # チェックボックスリストを翻訳文で更新
-        self.view.update_text_list(self.preview_translations)
+    def _show_partial(self, idx):
+        partial = self.partial_translations.get(idx, [])
+        self.view.update_text_list(partial, originals=self.slides_text[idx], keys=self._keys(idx))
+        self.view.output_text.setText("\n".join(partial))
+        self.view.set_busy(True, f"翻訳中… {len(partial)}/{len(self.slides_text[idx])} (Slide {idx + 1})")
+
+    def _show_translations(self, idx):
+        self.preview_translations = self.translations_by_slide[idx]
+        self.view.output_text.setText("\n".join(self.preview_translations))
+        # チェックボックスリストを翻訳文で更新（前回置換した段落はチェック済みにする）
+        self.view.update_text_list(self.preview_translations, self.accepted_by_slide.get(idx),
+                                   originals=self.slides_text[idx], keys=self._keys(idx))
+        self.view.set_busy(False)
 
     def replace_slide_partial(self):
         """チェックされた箇所だけ置換"""
-        if not self.ppt or not self.preview_translations:
+        if not self.slides_text or not self.preview_translations:
             return
 
         idx = self.view.slide_select.currentIndex()
-        originals = self.slides_text[idx]
-        translations = self.preview_translations.copy()
 
-        # チェックされているインデックスだけ置換
-        selected_indices = []
-        for i in range(self.view.text_list_widget.count()):
-            item = self.view.text_list_widget.item(i)
-            checkbox = self.view.text_list_widget.itemWidget(item)
-            if checkbox.isChecked():
-                selected_indices.append(i)
+        # チェックされているインデックスだけ置換（モデルのチェック状態を O(n) で読む）
+        selected = set(self.view.checked_indices())
 
         # チェックされていない部分は元テキストに戻す
-        for i in range(len(translations)):
-            if i not in selected_indices:
-                translations[i] = originals[i]
+        translations = self._apply_selection(idx, self.preview_translations, selected)
+        self.accepted_by_slide[idx] = selected
 
-        # スライド置換
-        self.ppt.replace_text_preserve_format(idx, originals, translations)
+        # スライド置換（PowerPoint 操作スレッドで実行）。検索には文書中の現在のテキストを使う
+        self.document.replace_requested.emit(idx, self._document_text(idx), translations)
+        self.applied_by_slide[idx] = translations
         # 入力欄更新
         self.view.input_text.setText("\n".join(translations))
 
     def save_ppt(self):
-        if not self.ppt:
+        if not self.slides_text:
             return
-        path = self.ppt.save_as()
+        self.document.save_requested.emit()
+
+    def on_saved(self, path):
         self.view.output_text.append(f"\n✅ 保存完了: {path}")
-        self.ppt.close()
+
+    def shutdown(self):
+        """アプリ終了時にバックグラウンド処理を止める"""
+        self._cancel_all_jobs()
+        self.translate_pool.waitForDone()
+        QThreadPool.globalInstance().waitForDone()
+        self.document_thread.quit()
+        self.document_thread.wait()
@@ -0,0 +1,163 @@
+# fake_powerpoint.py
+"""
+PowerPoint COM オブジェクトモデルの最小限のフェイク（Linux でのベンチマーク・検証用）
+
+PowerPointCOM が使う部分だけを再現する:
+Presentation.Slides(i) / 列挙、Slide.Shapes、Shape.Id / Type / HasTextFrame / GroupItems、
+TextFrame.HasText / TextRange.Text / TextRange.Runs().Count / .Item(i) / Run.Text
+
+    presentation = build_presentation([
+        [  # slide 1
+            [["タイトル"]],                     # 図形: 段落のリスト（段落は run テキストのリスト）
+            ("group", [[["グループ内", "の文字"]]]),
+        ],
+    ])
+    ppt = PowerPointCOM.from_presentation(presentation)
+"""
+import itertools
+import random
+
+GROUP_TYPE = 6
+
+
+class FakeRun:
+    def __init__(self, text_range, index):
+        self._text_range = text_range
+        self._index = index
+
+    @property
+    def Text(self):
+        return self._text_range._runs[self._index]
+
+    @Text.setter
+    def Text(self, value):
+        self._text_range._runs[self._index] = value
+
+
+class FakeRuns:
+    def __init__(self, text_range):
+        self._text_range = text_range
+
+    @property
+    def Count(self):
+        return len(self._text_range._runs)
+
+    def Item(self, i):
+        return FakeRun(self._text_range, i - 1)
+
+
+class FakeTextRange:
+    """runs はフラットなリスト。段落末尾の run は '\\r' を含む（PowerPoint と同じ）"""
+
+    def __init__(self, paragraphs):
+        self._runs = []
+        for p_idx, runs in enumerate(paragraphs):
+            runs = list(runs) or [""]
+            if p_idx < len(paragraphs) - 1:
+                runs[-1] += "\r"
+            self._runs.extend(runs)
+
+    @property
+    def Text(self):
+        return "".join(self._runs)
+
+    @Text.setter
+    def Text(self, value):
+        # 全体を書き換えると run 構造（書式）は段落ごとに1つへまとまる
+        lines = value.split("\r")
+        self._runs = [line + "\r" for line in lines[:-1]] + [lines[-1]]
+
+    def Runs(self):
+        return FakeRuns(self)
+
+
+class FakeTextFrame:
+    def __init__(self, paragraphs):
+        self.TextRange = FakeTextRange(paragraphs)
+
+    @property
+    def HasText(self):
+        return bool(self.TextRange.Text)
+
+
+class FakeShape:
+    def __init__(self, paragraphs, shape_id=2):
+        self.Id = shape_id
+        self.Type = 17  # msoTextBox
+        self.HasTextFrame = True
+        self.TextFrame = FakeTextFrame(paragraphs)
+
+
+class FakeGroupShape:
+    def __init__(self, shapes, shape_id=2):
+        self.Id = shape_id
+        self.Type = GROUP_TYPE
+        self.GroupItems = shapes
+
+
+class FakeSlide:
+    def __init__(self, shapes):
+        self.Shapes = shapes
+
+
+class FakeSlides:
+    def __init__(self, slides):
+        self._slides = slides
+
+    def __call__(self, index):
+        return self._slides[index - 1]
+
+    def __iter__(self):
+        return iter(self._slides)
+
+    @property
+    def Count(self):
+        return len(self._slides)
+
+
+class FakePresentation:
+    def __init__(self, slides):
+        self.Slides = FakeSlides(slides)
+        self.saved_paths = []
+
+    def SaveAs(self, path):
+        self.saved_paths.append(path)
+
+    def Close(self):
+        pass
+
+
+def _build_shape(spec, ids):
+    # 図形 ID はスライド内の出現順に振る（同じ構造なら改訂版でも同じ ID になる）
+    shape_id = next(ids)
+    if isinstance(spec, tuple) and spec[0] == "group":
+        return FakeGroupShape([_build_shape(s, ids) for s in spec[1]], shape_id)
+    return FakeShape(spec, shape_id)
+
+
+def build_presentation(slides_spec):
+    """スライド → 図形 → 段落 → run テキスト の入れ子リストからフェイクを作る"""
+    slides = []
+    for shapes in slides_spec:
+        ids = itertools.count(2)
+        slides.append(FakeSlide([_build_shape(s, ids) for s in shapes]))
+    return FakePresentation(slides)
+
+
+def make_random_spec(slides=10, shapes_per_slide=6, paragraphs_per_shape=3, runs_per_paragraph=3,
+                     words=None, seed=0):
+    """ベンチマーク用にランダムな入れ子リストを作る（奇数番目の図形はグループに入れる）"""
+    rng = random.Random(seed)
+    words = words or ["売上", "成長", "市場", "顧客", "戦略", "計画", "品質", "改善"]
+    spec = []
+    for _ in range(slides):
+        shapes = []
+        for s_idx in range(shapes_per_slide):
+            shape = [
+                ["".join(rng.choice(words) for _ in range(rng.randint(1, 4)))
+                 for _ in range(runs_per_paragraph)]
+                for _ in range(paragraphs_per_shape)
+            ]
+            shapes.append(("group", [shape]) if s_idx % 2 else shape)
+        spec.append(shapes)
+    return spec
@@ -1,8 +1,39 @@
+import sys
+import metrics
+import startup_profile
+
+# --profile-startup: 起動の各フェーズの所要時間を表示し、モデル準備完了で終了する
+PROFILE_STARTUP = "--profile-startup" in sys.argv
+if PROFILE_STARTUP:
+    startup_profile.enable()
+
+# --metrics: 終了時にステージ別の計測結果と Chrome トレースを書き出す
+METRICS = "--metrics" in sys.argv
+if METRICS:
+    metrics.enable()
+
+from PySide6.QtCore import QTimer
 from PySide6.QtWidgets import QApplication
+startup_profile.mark("import Qt")
 from controller import PPTController, PPTView  # もし controller.py 内に PPTView を書いた場合
+startup_profile.mark("import app modules")
 
 app = QApplication([])
 view = PPTView()
+startup_profile.mark("build window")
 controller = PPTController(view)
+app.aboutToQuit.connect(controller.shutdown)
+if METRICS:
+    app.aboutToQuit.connect(lambda: (metrics.write_json("pptmaster_metrics.json"),
+                                     metrics.write_chrome_trace("pptmaster_trace.json")))
 view.show()
+startup_profile.mark("window shown")
+QTimer.singleShot(0, lambda: startup_profile.mark("event loop running"))
+
+if PROFILE_STARTUP:
+    def finish_profile(*_):
+        startup_profile.report()
+        app.quit()
+    controller.translator_ready_callbacks.append(finish_profile)
+
 app.exec()
@@ -0,0 +1,99 @@
+# memory_report.py
+"""
+推論ワーカーのメモリを、プロセス固有の分と共有の分に分けて測る
+
+mmap した重み（IR の .bin / コンパイル済みキャッシュ）は同じホストのプロセス間で物理ページを共有するので、
+RSS の合計ではなく「共有分1つ + 固有分 × ワーカー数」でホストのメモリに収まる数を見積もる
+
+    samples = [process_memory(pid) for pid in pids]
+    print_report(samples, budget_bytes=32 * GIB)
+
+Linux は /proc/<pid>/smaps_rollup を読む。無い環境では psutil（あれば）の値を使う
+"""
+import os
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+GIB = 1024 ** 3
+DEFAULT_BUDGET_BYTES = 32 * GIB
+# OS・解析/書き込みワーカーの分として残しておく割合
+RESERVE_RATIO = 0.2
+
+
+def _read_smaps_rollup(pid):
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    return fields
+
+
+def process_memory(pid=None):
+    """
+    1プロセスのメモリ（バイト）
+    unique: そのプロセスだけが使うページ（終了すれば解放される分）
+    shared: 他プロセスと共有しているページ（mmap した重みなど）
+    pss: 共有ページを共有数で割って按分した値
+    """
+    pid = pid or os.getpid()
+    try:
+        f = _read_smaps_rollup(pid)
+    except OSError:
+        f = None
+    if f:
+        return {
+            "pid": pid,
+            "rss": f.get("Rss", 0),
+            "pss": f.get("Pss", 0),
+            "unique": f.get("Private_Clean", 0) + f.get("Private_Dirty", 0),
+            "shared": f.get("Shared_Clean", 0) + f.get("Shared_Dirty", 0),
+        }
+    if psutil is None:
+        return None
+    info = psutil.Process(pid).memory_full_info()
+    unique = getattr(info, "uss", info.rss - getattr(info, "shared", 0))
+    return {
+        "pid": pid,
+        "rss": info.rss,
+        "pss": getattr(info, "pss", unique),
+        "unique": unique,
+        "shared": info.rss - unique,
+    }
+
+
+def estimate_workers(samples, budget_bytes=DEFAULT_BUDGET_BYTES, reserve_ratio=RESERVE_RATIO):
+    """
+    budget_bytes に収まる推論ワーカー数
+    共有分は1回だけ数え（各プロセスの最大値）、固有分はワーカーごとに最大値で数える
+    """
+    samples = [s for s in samples if s]
+    if not samples:
+        return None
+    unique = max(s["unique"] for s in samples)
+    shared = max(s["shared"] for s in samples)
+    usable = budget_bytes * (1 - reserve_ratio) - shared
+    if unique <= 0 or usable <= 0:
+        return 0
+    return int(usable // unique)
+
+
+def print_report(samples, budget_bytes=DEFAULT_BUDGET_BYTES):
+    samples = [s for s in samples if s]
+    if not samples:
+        print("⚠️ メモリを取得できません（/proc も psutil もありません）")
+        return
+    mib = 1024 ** 2
+    print("🧮 推論ワーカーのメモリ (MiB)")
+    print(f"{'pid':>8} {'rss':>9} {'pss':>9} {'unique':>9} {'shared':>9}")
+    for s in samples:
+        print(f"{s['pid']:>8} {s['rss'] / mib:>9.1f} {s['pss'] / mib:>9.1f}"
+              f" {s['unique'] / mib:>9.1f} {s['shared'] / mib:>9.1f}")
+    total = sum(s["pss"] for s in samples)
+    print(f"   合計 PSS {total / mib:.1f} MiB（RSS の合計 {sum(s['rss'] for s in samples) / mib:.1f} MiB）")
+    workers = estimate_workers(samples, budget_bytes)
+    print(f"   {budget_bytes / GIB:.0f} GiB（{RESERVE_RATIO:.0%} は予備）に収まる推論ワーカー数の目安: {workers}")
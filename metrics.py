@@ -0,0 +1,223 @@
+# metrics.py
+"""
+各ステージの計測（タイマー・カウンター）とエクスポート
+
+    import metrics
+    metrics.enable()
+    with metrics.span("generate", batch=len(batch)):
+        ...
+    metrics.incr("tokens_in", n)
+    metrics.observe("batch_size", len(batch))
+    metrics.write_json("run.json")            # 実行レポート
+    metrics.write_prometheus("run.prom")      # Prometheus テキスト形式
+    metrics.write_chrome_trace("trace.json")  # chrome://tracing / Perfetto で開く
+
+ステージ名: load / extract / tokenize / generate / decode / replace / save
+無効時（既定）は span() は共有の何もしないオブジェクトを返し、incr() / observe() は即 return する
+プロセスごとの集計なので、DeckPipeline のワーカープロセスの分は含まれない
+"""
+from collections import defaultdict
+import json
+import os
+import threading
+import time
+
+STAGES = ("load", "extract", "tokenize", "encode", "generate", "decode", "replace", "save")
+# Chrome トレースに残すイベント数の上限（長時間実行でメモリを使い切らないように）
+MAX_TRACE_EVENTS = 200000
+
+enabled = False
+_trace = False
+_lock = threading.Lock()
+_START = time.perf_counter()
+_counters = defaultdict(float)
+_timers = {}        # name -> [回数, 合計秒, 最大秒]
+_observations = {}  # name -> [回数, 合計, 最小, 最大]
+_events = []
+
+
+def enable(trace=True):
+    """計測を有効にする。trace=True なら Chrome トレース用のイベントも記録する"""
+    global enabled, _trace
+    enabled = True
+    _trace = trace
+
+
+def disable():
+    global enabled, _trace
+    enabled = False
+    _trace = False
+
+
+def reset():
+    global _START
+    with _lock:
+        _START = time.perf_counter()
+        _counters.clear()
+        _timers.clear()
+        _observations.clear()
+        _events.clear()
+
+
+def incr(name, value=1):
+    if not enabled:
+        return
+    with _lock:
+        _counters[name] += value
+
+
+def observe(name, value):
+    """バッチサイズなど分布を見たい値を記録する"""
+    if not enabled:
+        return
+    with _lock:
+        stat = _observations.get(name)
+        if stat is None:
+            _observations[name] = [1, value, value, value]
+        else:
+            stat[0] += 1
+            stat[1] += value
+            stat[2] = min(stat[2], value)
+            stat[3] = max(stat[3], value)
+
+
+def _record(name, start, end, args):
+    elapsed = end - start
+    with _lock:
+        timer = _timers.get(name)
+        if timer is None:
+            _timers[name] = [1, elapsed, elapsed]
+        else:
+            timer[0] += 1
+            timer[1] += elapsed
+            timer[2] = max(timer[2], elapsed)
+        if _trace and len(_events) < MAX_TRACE_EVENTS:
+            _events.append({
+                "name": name, "ph": "X", "pid": os.getpid(), "tid": threading.get_ident(),
+                "ts": (start - _START) * 1e6, "dur": elapsed * 1e6, "args": args,
+            })
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _record(self.name, self.start, time.perf_counter(), self.args)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, **args):
+    """with ブロックの所要時間を name のタイマーに加える"""
+    if not enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+# ---------------------------
+# エクスポート
+# ---------------------------
+def report():
+    """現在までの集計を dict で返す"""
+    with _lock:
+        timers = {
+            name: {"count": c, "total_s": total, "mean_s": total / c, "max_s": longest}
+            for name, (c, total, longest) in _timers.items()
+        }
+        observations = {
+            name: {"count": c, "sum": total, "mean": total / c, "min": low, "max": high}
+            for name, (c, total, low, high) in _observations.items()
+        }
+        counters = dict(_counters)
+    hits = counters.get("cache_hits", 0)
+    lookups = hits + counters.get("cache_misses", 0)
+    generate = timers.get("generate", {}).get("total_s", 0)
+    return {
+        "pid": os.getpid(),
+        "wall_s": time.perf_counter() - _START,
+        "timers": timers,
+        "counters": counters,
+        "observations": observations,
+        "derived": {
+            "cache_hit_rate": hits / lookups if lookups else 0.0,
+            "tokens_out_per_s": counters.get("tokens_out", 0) / generate if generate else 0.0,
+        },
+    }
+
+
+def write_json(path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report(), f, ensure_ascii=False, indent=2)
+    return path
+
+
+def _metric_name(name):
+    return "pptmaster_" + "".join(c if c.isalnum() else "_" for c in name)
+
+
+def prometheus_text():
+    data = report()
+    lines = [
+        "# HELP pptmaster_stage_seconds_total ステージごとの累計時間",
+        "# TYPE pptmaster_stage_seconds_total counter",
+    ]
+    for name, t in sorted(data["timers"].items()):
+        lines.append(f'pptmaster_stage_seconds_total{{stage="{name}"}} {t["total_s"]:.6f}')
+    lines += ["# TYPE pptmaster_stage_calls_total counter"]
+    for name, t in sorted(data["timers"].items()):
+        lines.append(f'pptmaster_stage_calls_total{{stage="{name}"}} {t["count"]}')
+    for name, value in sorted(data["counters"].items()):
+        metric = _metric_name(name) + "_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {value:g}"]
+    for name, o in sorted(data["observations"].items()):
+        metric = _metric_name(name)
+        lines += [f"# TYPE {metric} summary", f"{metric}_sum {o['sum']:g}", f"{metric}_count {o['count']}"]
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    """node_exporter の textfile collector で読める形式で書く"""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)
+    return path
+
+
+def write_chrome_trace(path):
+    with _lock:
+        events = list(_events)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return path
+
+
+def print_summary():
+    data = report()
+    print("📈 ステージ別の時間")
+    for name in list(STAGES) + sorted(set(data["timers"]) - set(STAGES)):
+        t = data["timers"].get(name)
+        if t:
+            print(f"  {name:<10} {t['total_s']:8.3f} s  ({t['count']} 回, 最大 {t['max_s'] * 1000:.1f} ms)")
+    for name, value in sorted(data["counters"].items()):
+        print(f"  {name:<16} {value:g}")
@@ -1,8 +1,9 @@
 from pptx import Presentation
-from pptx.util import Pt
-from transformers import AutoTokenizer
-from optimum.intel.openvino import OVModelForSeq2SeqLM
-import os, re
+from pptx_writer import SlideTextWriter
+from translator_model import MAX_LENGTH, TranslatorModel as _BaseTranslatorModel
+from zip_package import write_package
+import metrics
+import xml_extract
 
 
 # ---------------------------
@@ -11,100 +12,86 @@ import os, re
 class PPTModel:
     def __init__(self, ppt_path):
         self.ppt_path = ppt_path
-        self.presentation = Presentation(ppt_path)
+        self._presentation = None  # python-pptx のオブジェクトは書き込むときに作る
         self.edited_ppt_path = None
+        self.dirty_parts = set()  # update_slide_text で書き換えたスライドのパート名
 
-    def extract_slides_text(self):
+    @property
+    def presentation(self):
+        if self._presentation is None:
+            self._presentation = Presentation(self.ppt_path)
+        return self._presentation
+
+    def extract_slides_text(self, with_ids=False):
         """
         スライドごとに [[shape1_text, shape2_text, ...], [...], ...] の形式で返す
+        グループ内の図形と表のセルも1要素ずつ含む（update_slide_text と同じ順）
+        with_ids=True なら各要素を (shape_id, text) にする（翻訳マニフェスト用。セルは "id:r行c列"）
+        まだ presentation を開いていなければ zip の XML をストリーム解析する（xml_extract.py）
         """
-        slides_text = []
-        for slide in self.presentation.slides:
-            slide_texts = []
-            for shape in slide.shapes:
-                if hasattr(shape, "text") and shape.has_text_frame:
-                    slide_texts.append(shape.text)
-            slides_text.append(slide_texts)
-        return slides_text
+        if self._presentation is None:
+            with metrics.span("extract", source="xml"):
+                return xml_extract.extract_shape_texts(self.ppt_path, with_ids)
+        with metrics.span("extract", source="pptx"):
+            return [SlideTextWriter(slide.element).texts(with_ids) for slide in self._presentation.slides]
 
     def update_slide_text(self, slide_idx, new_texts):
         """
         フォーマットを崩さずスライド内のテキストを書き換える
-        改行は段落に変換
+        new_texts は extract_slides_text と同じ順の図形（セル）ごとの訳文。改行は段落の区切り
+        各段落の run に訳文を分配し、run の書式（a:rPr）はそのまま残す（pptx_writer.py）
         """
         if slide_idx < 0 or slide_idx >= len(self.presentation.slides):
             return
 
-        slide = self.presentation.slides[slide_idx]
-        shape_idx = 0
-
-        for shape in slide.shapes:
-            if hasattr(shape, "text") and shape.has_text_frame:
-                if shape_idx >= len(new_texts):
-                    break
-
-                text_frame = shape.text_frame
-                new_text = new_texts[shape_idx].strip()
-
-                if not new_text:
-                    shape_idx += 1
-                    continue
+        with metrics.span("replace", slide=slide_idx):
+            self._update_slide_text(slide_idx, new_texts)
 
-                # 既存段落を削除（フォーマット崩れを防ぎつつクリア）
-                for p in list(text_frame.paragraphs):
-                    text_frame._element.remove(p._element)
-
-                # 改行を段落に変換
-                for line in new_text.split("\n"):
-                    line = line.strip()
-                    if not line:
-                        continue
-                    p = text_frame.add_paragraph()
-                    p.text = line
-                    for run in p.runs:
-                        run.font.size = Pt(18)  # 必要なら調整
-
-                shape_idx += 1
+    def _update_slide_text(self, slide_idx, new_texts):
+        # lxml ツリーの既存 run に書き込む（段落・書式は作り直さない）
+        slide = self.presentation.slides[slide_idx]
+        writer = SlideTextWriter(slide.element)
+        for i, text in enumerate(new_texts):
+            writer.set_text(i, text)
+        if writer.apply():
+            self.dirty_parts.add(str(slide.part.partname))
 
-    def save(self, suffix="_edited"):
+    def save(self, suffix="_edited", path=None, incremental=False):
         """
-        編集後PPTを保存
+        編集後PPTを保存（path 指定時はそのパスへ）
+        incremental=True なら書き換えたスライドのパートだけを再シリアライズし、
+        画像・動画など他のメンバーは元ファイルから圧縮済みのままコピーする
+        （update_slide_text 以外で presentation を変更した場合は使わないこと。パートを追加しても
+        [Content_Types].xml は書き換えない）。path は元ファイルと同じでもよい
         """
-        self.edited_ppt_path = self.ppt_path.replace(".pptx", f"{suffix}.pptx")
-        self.presentation.save(self.edited_ppt_path)
+        self.edited_ppt_path = path or self.ppt_path.replace(".pptx", f"{suffix}.pptx")
+        with metrics.span("save", incremental=incremental):
+            if incremental:
+                replacements = {
+                    str(part.partname): part.blob
+                    for part in self.presentation.part.package.iter_parts()
+                    if str(part.partname) in self.dirty_parts
+                }
+                write_package(self.ppt_path, self.edited_ppt_path, replacements)
+            else:
+                self.presentation.save(self.edited_ppt_path)
         return self.edited_ppt_path
 
 
 # ---------------------------
 # 翻訳・トーンアップ モデルクラス
 # ---------------------------
-class TranslatorModel:
-    def __init__(self, model_dir="openvino_model", src_lang="ja_XX", tgt_lang="en_XX"):
-        print("✅ Loading OpenVINO model…")
-        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
-        self.model = OVModelForSeq2SeqLM.from_pretrained(model_dir)
+class TranslatorModel(_BaseTranslatorModel):
+    """
+    translator_model.TranslatorModel にトーンアップを加えたもの
+    デバイス・精度・ストリーム数などの設定は TranslatorConfig（設定ファイル / 環境変数）に従う
+    """
 
-        self.src_lang = src_lang
-        self.tgt_lang = tgt_lang
-        self.tokenizer.src_lang = src_lang
-        self.forced_bos_token_id = self.tokenizer.lang_code_to_id[tgt_lang]
+    def __init__(self, model_dir=None, src_lang="ja_XX", tgt_lang="en_XX", **kwargs):
+        print("✅ Loading OpenVINO model…")
+        super().__init__(model_dir, src_lang, tgt_lang, **kwargs)
         print("✅ OpenVINO model loaded!")
 
-    def translate_text(self, text: str) -> str:
-        if not text.strip():
-            return ""
-
-        # 不要な改行を整形
-        text = re.sub(r'\n{2,}', '\n', text.strip())
-
-        inputs = self.tokenizer(text, return_tensors="pt", truncation=True, max_length=256)
-        outputs = self.model.generate(
-            **inputs,
-            max_length=256,
-            forced_bos_token_id=self.forced_bos_token_id
-        )
-        return self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-
     def tone_up(self, text: str, style_prompt: str = "文体を丁寧に、明るく、日本語でかきかえて") -> str:
         if not text.strip():
             return ""
@@ -112,10 +99,10 @@ class TranslatorModel:
         input_text = f"{style_prompt}: {text}"
         forced_bos_token_id_ja = self.tokenizer.lang_code_to_id["ja_XX"]
 
-        inputs = self.tokenizer(input_text, return_tensors="pt", truncation=True, max_length=256)
+        inputs = self.tokenizer(input_text, return_tensors="pt", truncation=True, max_length=MAX_LENGTH)
         outputs = self.model.generate(
             **inputs,
-            max_length=256,
-            forced_bos_token_id=forced_bos_token_id_ja
+            forced_bos_token_id=forced_bos_token_id_ja,
+            **self.generate_kwargs(len(inputs["input_ids"][0]), profile="quality", tgt_lang="ja_XX")
         )
         return self.tokenizer.decode(outputs[0], skip_special_tokens=True)
@@ -0,0 +1,141 @@
+# passthrough.py
+"""
+翻訳不要なテキストをモデルに通さずそのまま返す前処理
+
+ページ番号・日付・URL・型番・記号だけの段落や、ja→en で原文の文字（かな・漢字）を含まない
+英文などは tokenize / generate を通すと崩れることがあるので、そのまま訳文として使う
+翻訳する文に含まれる URL・長い数字・型番はプレースホルダーに置き換えて短くし、訳文で元に戻す
+
+    f = PassThroughFilter("ja_XX")
+    f.should_skip("https://example.com")   # True
+    masked, spans = f.protect("詳細は https://example.com を参照")
+    # "詳細は [1] を参照", ["https://example.com"]
+    f.restore("See [1] for details", spans)  # "See https://example.com for details"
+
+利用者が追加するそのまま通す語は passthrough.txt（PPT_MASTER_PASSTHROUGH で変更）に1行1つ
+"re:" で始まる行は正規表現（全体一致）として扱う。# で始まる行はコメント
+"""
+import os
+import re
+
+DEFAULT_LIST_PATH = "passthrough.txt"
+LIST_ENV = "PPT_MASTER_PASSTHROUGH"
+
+# 原文の言語の文字範囲（これを1文字も含まないテキストは翻訳しない）
+SOURCE_SCRIPTS = {
+    "ja_XX": "぀-ヿㇰ-ㇿ㐀-䶿一-鿿豈-﫿ｦ-ﾟ",
+    "zh_CN": "㐀-䶿一-鿿豈-﫿",
+    "ko_KR": "가-힯ᄀ-ᇿ㄰-㆏",
+    "ru_RU": "Ѐ-ӿ",
+    "ar_AR": "؀-ۿ",
+    "th_TH": "฀-๿",
+}
+
+# 全体がこれに一致するものは翻訳しない
+SKIP_PATTERNS = [
+    r"[\d\s.,:;/%+\-−–~〜()（）#№¥$€£]*\d[\d\s.,:;/%+\-−–~〜()（）#№¥$€£]*",  # 数字・日付・時刻・金額・ページ番号
+    r"(?:https?://|www\.)\S+",                                                 # URL
+    r"[\w.+\-]+@[\w\-]+(?:\.[\w\-]+)+",                                        # メールアドレス
+    r"[A-Z0-9][A-Z0-9_\-./]*\d[A-Z0-9_\-./]*",                                 # 型番・コード（大文字と数字）
+    r"(?:p|pp|page|slide)\.?\s*\d+(?:\s*/\s*\d+)?",                            # p.3 / Page 3/20
+]
+
+# 翻訳する文の中でプレースホルダーに置き換えるもの（左から順に優先）
+# 日本語の直後・直前でも切り出せるよう ASCII の範囲で書く
+PROTECT_PATTERN = re.compile(
+    r"(?:https?://|www\.)[!#-'*-;=?-Z_a-z~%]+"
+    r"|[A-Za-z0-9.+\-_]+@[A-Za-z0-9\-]+(?:\.[A-Za-z0-9\-]+)+"
+    r"|(?<![A-Za-z0-9])[A-Za-z]+[-_]?[0-9][A-Za-z0-9_\-]*"  # 型番（英字＋数字）
+    r"|(?<![0-9])[0-9][0-9,./:\-]{3,}[0-9]"                 # 5文字以上の数字（日付・桁区切りを含む）
+)
+# これより短いものはプレースホルダーにしても系列が短くならない
+MIN_PROTECT_CHARS = 4
+PLACEHOLDER = "[{}]"
+_PLACEHOLDER_RE = re.compile(r"\[(\d+)\]")
+
+
+def load_list(path=None):
+    """そのまま通す語の一覧を読む（(語の集合, 正規表現のリスト)）"""
+    path = path or os.environ.get(LIST_ENV) or DEFAULT_LIST_PATH
+    terms = set()
+    patterns = []
+    if not os.path.exists(path):
+        return terms, patterns
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("re:"):
+                patterns.append(re.compile(line[3:]))
+            else:
+                terms.add(line)
+    return terms, patterns
+
+
+class PassThroughFilter:
+    def __init__(self, src_lang="ja_XX", terms=None, patterns=None, list_path=None, protect=True):
+        """
+        terms / patterns: そのまま通す語と正規表現（全体一致）。list_path（passthrough.txt）の分に追加される
+        protect=False なら埋め込みの URL・数字はプレースホルダーにしない
+        """
+        self.terms, self.patterns = load_list(list_path)
+        self.terms.update(terms or ())
+        self.patterns.extend(re.compile(p) if isinstance(p, str) else p for p in patterns or ())
+        self.skip_re = re.compile("|".join(f"(?:{p})" for p in SKIP_PATTERNS), re.IGNORECASE)
+        script = SOURCE_SCRIPTS.get(src_lang)
+        self.script_re = re.compile(f"[{script}]") if script else None
+        self.protect_enabled = protect
+
+    def should_skip(self, text):
+        """翻訳せずにそのまま返すべきテキストか"""
+        stripped = text.strip()
+        if not stripped or stripped in self.terms:
+            return True
+        if not any(c.isalnum() for c in stripped):
+            return True  # 記号だけ
+        if any(p.fullmatch(stripped) for p in self.patterns):
+            return True
+        if self.skip_re.fullmatch(stripped):
+            return True
+        # 原文の言語の文字を含まない（ja→en での英文・コードなど）
+        return self.script_re is not None and not self.script_re.search(stripped)
+
+    def protect(self, text):
+        """埋め込みの URL・長い数字・型番・登録語をプレースホルダーに置き換える（(置換後, 元の文字列のリスト)）"""
+        # 原文に "[1]" のような文字列があると戻せないので置き換えない
+        if not self.protect_enabled or _PLACEHOLDER_RE.search(text):
+            return text, []
+        spans = []
+
+        def mask(m, min_chars=0):
+            if len(m.group(0)) < min_chars:
+                return m.group(0)
+            spans.append(m.group(0))
+            return PLACEHOLDER.format(len(spans))
+
+        masked = text
+        if self.terms:
+            # 登録語を先に置き換える（長いものを優先）
+            # 英数字の語の一部（"RAID" の中の "AI" など）には一致させない
+            terms_re = re.compile(
+                r"(?<![A-Za-z0-9])(?:"
+                + "|".join(re.escape(t) for t in sorted(self.terms, key=len, reverse=True))
+                + r")(?![A-Za-z0-9])"
+            )
+            masked = terms_re.sub(mask, masked)
+        masked = PROTECT_PATTERN.sub(lambda m: mask(m, MIN_PROTECT_CHARS), masked)
+        return masked, spans
+
+    @staticmethod
+    def restore(translated, spans):
+        """
+        訳文のプレースホルダーを元に戻す
+        どれかが欠けた・重複した場合は None（呼び出し元は置き換えずに翻訳し直す）
+        """
+        if not spans:
+            return translated
+        found = [int(n) for n in _PLACEHOLDER_RE.findall(translated)]
+        if sorted(found) != list(range(1, len(spans) + 1)):
+            return None
+        return _PLACEHOLDER_RE.sub(lambda m: spans[int(m.group(1)) - 1], translated)
@@ -0,0 +1,461 @@
+# pipeline.py
+"""
+複数デッキを 解析 → 翻訳 → 書き戻し で流すパイプライン
+
+- run_translate: 1プロセス内。解析・書き込みをスレッドで先行させ、翻訳は呼び出し元スレッドで行う
+  tgt_langs を渡すと1回の解析・1回のエンコードから言語ごとのデッキを書く（<名前>_<言語>.pptx）
+- DeckPipeline: 解析・書き込みをプロセスプールで並列化し、常駐の推論ワーカーへキュー経由で翻訳を依頼する
+  推論ワーカーは1つ目のロード（コンパイル済みキャッシュの作成）を待ってから残りを起動し、
+  残りは同じキャッシュを mmap で読む（重みのページはワーカー間で共有される）
+
+    解析/書き込みワーカー × jobs ──request_q──▶ 推論ワーカー × inference_workers
+                              ◀──reply_q (デッキごと)──
+"""
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import memory_report
+from model import PPTModel
+from translator_model import DEFAULT_MAX_BATCH_TOKENS, TranslatorModel
+from translation_cache import TranslationCache
+from translation_manifest import TranslationManifest, manifest_path
+
+_print_lock = threading.Lock()
+
+
+# ---------------------------
+# パイプラインの各ステージ
+# ---------------------------
+def parse_deck(in_path, out_path=None):
+    """
+    デッキを開いてテキストを取り出す
+    out_path の横に翻訳マニフェストがあれば、訳が分かっている段落を known（スライドごとの訳文 or None）で返す
+    """
+    start = time.perf_counter()
+    ppt = PPTModel(in_path)
+    items = ppt.extract_slides_text(with_ids=True)
+    slides_text = [[text for _, text in row] for row in items]
+    known = None
+    if out_path:
+        manifest = TranslationManifest.load(manifest_path(out_path))
+        if manifest is not None:
+            known = [[entry["translation"] if entry else None for entry in row]
+                     for row in manifest.match(items)]
+    return ppt, slides_text, time.perf_counter() - start, known
+
+
+def pending_texts(slides_text, known):
+    """翻訳が必要な（マニフェストに無い）テキストだけを残したスライドごとのリスト"""
+    if known is None:
+        return slides_text
+    return [[t for t, k in zip(texts, row) if k is None] for texts, row in zip(slides_text, known)]
+
+
+def merge_slide(texts, known_row, translated):
+    """マニフェストの訳文と、新しく翻訳した分（pending_texts の順）を段落順に戻す"""
+    if known_row is None:
+        return list(translated)
+    fresh = iter(translated)
+    return [k if k is not None else next(fresh) for k in known_row]
+
+
+def translate_deck(translator, slides_text, max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS, known=None):
+    """
+    デッキ全体のテキストを1回の translate_batch にまとめ、スライドごとに戻す
+    known があれば、訳が分かっている段落はモデルに渡さない
+    """
+    start = time.perf_counter()
+    pending = pending_texts(slides_text, known)
+    flat = [t for texts in pending for t in texts]
+    translated = translator.translate_batch(flat, max_batch_tokens=max_batch_tokens) if flat else []
+    return _split_slides(slides_text, pending, translated, known), time.perf_counter() - start
+
+
+def translate_deck_multi(translator, slides_text, tgt_langs, max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS):
+    """デッキ全体を複数言語へ翻訳する（{tgt_lang: スライドごとの訳文}）。エンコードは1回だけ"""
+    start = time.perf_counter()
+    flat = [t for texts in slides_text for t in texts]
+    translated = translator.translate_multi(flat, tgt_langs, max_batch_tokens=max_batch_tokens) if flat \
+        else {lang: [] for lang in tgt_langs}
+    per_lang = {lang: _split_slides(slides_text, slides_text, texts) for lang, texts in translated.items()}
+    return per_lang, time.perf_counter() - start
+
+
+def _split_slides(slides_text, pending, translated, known=None):
+    """平らな訳文リストをスライドごとに戻す（known の訳文は段落順に差し込む）"""
+    per_slide = []
+    pos = 0
+    for slide_idx, texts in enumerate(pending):
+        chunk = translated[pos:pos + len(texts)]
+        per_slide.append(merge_slide(slides_text[slide_idx], known[slide_idx] if known else None, chunk))
+        pos += len(texts)
+    return per_slide
+
+
+def lang_output_path(out_path, tgt_lang):
+    """out/deck.pptx → out/deck_en_XX.pptx"""
+    root, ext = os.path.splitext(out_path)
+    return f"{root}_{tgt_lang}{ext}"
+
+
+def write_manifest(ppt, slides_text, translations, out_path):
+    """出力の横に翻訳マニフェストを書く（次の改訂では変わった段落だけを翻訳する）"""
+    ids = [[shape_id for shape_id, _ in row] for row in ppt.extract_slides_text(with_ids=True)]
+    paragraphs = [list(zip(row, texts)) for row, texts in zip(ids, slides_text)]
+    manifest = TranslationManifest.from_paragraphs(paragraphs, translations, source=ppt.ppt_path)
+    return manifest.save(manifest_path(out_path))
+
+
+def write_deck(ppt, translations, out_path, slides_text=None):
+    """slides_text（原文）を渡すと翻訳マニフェストも書く"""
+    start = time.perf_counter()
+    for slide_idx, texts in enumerate(translations):
+        ppt.update_slide_text(slide_idx, texts)
+    save_deck(ppt, out_path)
+    if slides_text is not None:
+        write_manifest(ppt, slides_text, translations, out_path)
+    return time.perf_counter() - start
+
+
+def save_deck(ppt, out_path):
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    # 画像・動画は元ファイルから圧縮済みのままコピーし、書き換えたスライドだけ保存する
+    ppt.save(path=out_path, incremental=True)
+    return time.perf_counter() - start
+
+
+def deck_stats(in_path, slides_text, parse_s, translate_s, write_s, decode=None, known=None):
+    """
+    decode は TranslatorModel.last_stats（profile / tokens_per_s など）
+    known はマニフェストから再利用した訳文（parse_deck の戻り値）
+    """
+    texts = sum(len(t) for t in slides_text)
+    chars = sum(len(s) for t in slides_text for s in t)
+    reused = sum(1 for row in known for k in row if k is not None) if known else 0
+    return {
+        "path": in_path, "slides": len(slides_text), "texts": texts, "chars": chars,
+        "parse_s": parse_s, "translate_s": translate_s, "write_s": write_s,
+        "total_s": parse_s + translate_s + write_s, "decode": decode, "reused": reused,
+    }
+
+
+def report_deck(stats):
+    """1ファイル分のスループットを表示する"""
+    total = stats["total_s"]
+    decode = stats.get("decode")
+    with _print_lock:
+        print(f"📊 {os.path.basename(stats['path'])}: {stats['slides']} slides / {stats['texts']} texts"
+              f" / {stats['chars']} chars"
+              f" | parse {stats['parse_s']:.2f}s translate {stats['translate_s']:.2f}s"
+              f" write {stats['write_s']:.2f}s"
+              f" | {stats['chars'] / total if total else 0:.0f} chars/s"
+              + (f" | {decode['profile']} {decode['tokens_per_s']:.0f} tok/s" if decode else "")
+              + (f" | 翻訳不要 {decode['skipped']}" if decode and decode.get("skipped") else "")
+              + (f" | 再利用 {stats['reused']}/{stats['texts']}" if stats.get("reused") else ""))
+    return stats
+
+
+# ---------------------------
+# 1プロセス版（スレッドで解析・書き込みを重ねる）
+# ---------------------------
+def run_translate(pairs, translator, jobs=1, max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS, tgt_langs=None):
+    """
+    解析 → 翻訳 → 書き戻し のパイプライン
+    解析と書き戻しはスレッドプールで先行／並行させ、翻訳は呼び出し元スレッドで順に行う
+    tgt_langs（2言語以上）を渡すと、1回の解析・翻訳から言語ごとのデッキを書く
+    （translator.translate_multi が必要。マニフェストの再利用はしない）
+    """
+    results = []
+    failures = []
+
+    def write_and_report(ppt, slides_text, translations, in_path, out_path, parse_s, translate_s, decode,
+                         known):
+        try:
+            start = time.perf_counter()
+            # 2言語目以降は元ファイルを開き直して書く（テキストの抽出はしない）
+            ppt = ppt or PPTModel(in_path)
+            write_s = time.perf_counter() - start + write_deck(ppt, translations, out_path, slides_text)
+        except Exception as e:
+            with _print_lock:
+                print(f"❌ 書き込み失敗: {out_path}: {e}")
+            failures.append(out_path if tgt_langs else in_path)
+            return
+        results.append(report_deck(deck_stats(out_path if tgt_langs else in_path, slides_text,
+                                              parse_s, translate_s, write_s, decode, known)))
+
+    with ThreadPoolExecutor(max_workers=jobs) as parse_pool, \
+            ThreadPoolExecutor(max_workers=jobs) as write_pool:
+        parsing = deque()
+        remaining = iter(pairs)
+
+        def submit_next():
+            pair = next(remaining, None)
+            if pair is not None:
+                # 言語ごとに出力するときはマニフェストを読まない
+                parsing.append((pair, parse_pool.submit(parse_deck, pair[0], None if tgt_langs else pair[1])))
+
+        # 先読みは jobs 件まで（全デッキを一度にメモリへ載せない）
+        for _ in range(max(1, jobs)):
+            submit_next()
+
+        while parsing:
+            (in_path, out_path), future = parsing.popleft()
+            submit_next()
+            try:
+                ppt, slides_text, parse_s, known = future.result()
+                if tgt_langs:
+                    per_lang, translate_s = translate_deck_multi(translator, slides_text, tgt_langs,
+                                                                 max_batch_tokens)
+                    outputs = [(lang_output_path(out_path, lang), per_lang[lang], None) for lang in tgt_langs]
+                else:
+                    translations, translate_s = translate_deck(translator, slides_text, max_batch_tokens, known)
+                    outputs = [(out_path, translations, known)]
+                decode = dict(translator.last_stats) if getattr(translator, "last_stats", None) else None
+            except Exception as e:
+                with _print_lock:
+                    print(f"❌ 翻訳失敗: {in_path}: {e}")
+                failures.append(in_path)
+                continue
+            # 解析・翻訳の時間は最初の出力にだけ計上する
+            for n, (path, translations, known) in enumerate(outputs):
+                write_pool.submit(write_and_report, ppt if n == 0 else None, slides_text, translations,
+                                  in_path, path, parse_s if n == 0 else 0.0, translate_s if n == 0 else 0.0,
+                                  decode, known)
+
+    return results, failures
+
+
+# ---------------------------
+# マルチプロセス版
+# ---------------------------
+def _inference_worker(worker_id, request_q, ready_q, busy, model_kwargs, cache_path, max_batch_tokens,
+                      translator_factory=TranslatorModel):
+    """
+    常駐の推論ワーカー。モデルはプロセスごとに1回だけロードする
+    busy[worker_id] に処理中の依頼 (deck_id, seq) を置き、落ちたときにどのデッキの返信が来ないかを分かるようにする
+    """
+    cache = TranslationCache(cache_path) if cache_path else None
+    translator = translator_factory(cache=cache, **model_kwargs)
+    ready_q.put(os.getpid())
+    try:
+        while True:
+            item = request_q.get()
+            if item is None:
+                break
+            deck_id, seq, reply_q, chunk = item
+            busy[worker_id] = (deck_id, seq)
+            try:
+                flat = [t for _, texts in chunk for t in texts]
+                translated = translator.translate_batch(flat, max_batch_tokens=max_batch_tokens)
+                result = []
+                pos = 0
+                for slide_idx, texts in chunk:
+                    result.append((slide_idx, translated[pos:pos + len(texts)]))
+                    pos += len(texts)
+                reply_q.put((seq, result, None))
+            except Exception as e:
+                reply_q.put((seq, [(slide_idx, None) for slide_idx, _ in chunk], repr(e)))
+            busy.pop(worker_id, None)
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def _chunk_slides(slides_text, chunk_texts):
+    """スライド単位を崩さずに、テキスト数 chunk_texts 程度の依頼へまとめる"""
+    chunks = []
+    current = []
+    count = 0
+    for slide_idx, texts in enumerate(slides_text):
+        current.append((slide_idx, texts))
+        count += len(texts)
+        if count >= chunk_texts:
+            chunks.append(current)
+            current = []
+            count = 0
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _get_reply(reply_q, lost, poll=1.0):
+    """推論ワーカーの返信を待つ。推論ワーカーが全部落ちた（lost が立った）ら返信は来ないので例外にする"""
+    while True:
+        try:
+            return reply_q.get(timeout=poll)
+        except queue.Empty:
+            if lost.is_set():
+                raise RuntimeError("推論ワーカーが停止しました")
+
+
+def _process_deck(deck_id, in_path, out_path, request_q, reply_q, chunk_texts, lost):
+    """
+    解析/書き込みワーカーで1デッキを処理する。翻訳結果は届いた順にスライドへ反映する
+    依頼には連番を付け、同じ依頼への返信が2回来ても（推論ワーカーが返信直後に落ちたときなど）1回だけ数える
+    lost: 推論ワーカーが全部落ちたときに DeckPipeline が立てるイベント
+    """
+    ppt, slides_text, parse_s, known = parse_deck(in_path, out_path)
+    pending = pending_texts(slides_text, known)
+    translations = [None] * len(slides_text)
+
+    # マニフェストで訳が揃っているスライドは推論ワーカーに送らない
+    chunks = _chunk_slides(pending, chunk_texts)
+    chunks = [[(i, texts) for i, texts in chunk if texts] for chunk in chunks]
+    chunks = [chunk for chunk in chunks if chunk]
+    for seq, chunk in enumerate(chunks):
+        request_q.put((deck_id, seq, reply_q, chunk))
+    apply_start = time.perf_counter()
+    for slide_idx, texts in enumerate(pending):
+        if not texts and slides_text[slide_idx]:
+            translations[slide_idx] = merge_slide(slides_text[slide_idx], known[slide_idx] if known else None, [])
+            ppt.update_slide_text(slide_idx, translations[slide_idx])
+        elif not texts:
+            translations[slide_idx] = []
+
+    translate_s = 0.0
+    write_s = time.perf_counter() - apply_start
+    errors = []
+    waiting = set(range(len(chunks)))
+    while waiting:
+        wait_start = time.perf_counter()
+        seq, result, error = _get_reply(reply_q, lost)
+        translate_s += time.perf_counter() - wait_start
+        if seq not in waiting:
+            continue
+        waiting.discard(seq)
+        if error:
+            errors.append(error)
+            continue
+        apply_start = time.perf_counter()
+        for slide_idx, texts in result:
+            translations[slide_idx] = merge_slide(slides_text[slide_idx],
+                                                  known[slide_idx] if known else None, texts)
+            ppt.update_slide_text(slide_idx, translations[slide_idx])
+        write_s += time.perf_counter() - apply_start
+
+    if errors:
+        raise RuntimeError(f"翻訳失敗: {errors[0]}")
+    write_s += save_deck(ppt, out_path)
+    write_manifest(ppt, slides_text, translations, out_path)
+    return deck_stats(in_path, slides_text, parse_s, translate_s, write_s, known=known)
+
+
+class DeckPipeline:
+    """
+    解析/書き込み用プロセスプールと、常駐の推論ワーカーを組み合わせたスケジューラ
+    デッキ k の推論中にデッキ k+1 の解析が進む
+    """
+
+    def __init__(self, jobs=None, inference_workers=1, model_kwargs=None, cache_path=None,
+                 max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS, chunk_texts=64, memory_budget=None,
+                 translator_factory=TranslatorModel):
+        """
+        memory_budget（バイト）を指定すると、終了前に推論ワーカーのメモリと収まるワーカー数を表示する
+        translator_factory: 推論ワーカーで translator_factory(cache=..., **model_kwargs) として呼ぶ
+        （spawn で渡すのでモジュールのトップレベルにあるもの）
+        """
+        self.jobs = jobs or max(1, (os.cpu_count() or 2) - inference_workers)
+        self.inference_workers = max(1, inference_workers)
+        self.model_kwargs = model_kwargs or {}
+        self.cache_path = cache_path
+        self.max_batch_tokens = max_batch_tokens
+        self.chunk_texts = chunk_texts
+        self.memory_budget = memory_budget
+        self.translator_factory = translator_factory
+        self.worker_pids = []
+        # OpenVINO などネイティブライブラリを fork で複製しないよう spawn を使う
+        self._ctx = mp.get_context("spawn")
+
+    def run(self, pairs):
+        results = []
+        failures = []
+        with self._ctx.Manager() as manager:
+            request_q = manager.Queue()
+            ready_q = manager.Queue()
+            busy = manager.dict()   # 推論ワーカーの番号 -> 処理中の依頼 (deck_id, seq)
+            lost = manager.Event()  # 推論ワーカーが全部落ちたら立てる（残りの依頼を処理するものがない）
+            workers = [
+                self._ctx.Process(
+                    target=_inference_worker,
+                    args=(worker_id, request_q, ready_q, busy, self.model_kwargs, self.cache_path,
+                          self.max_batch_tokens, self.translator_factory),
+                    daemon=True,
+                )
+                for worker_id in range(self.inference_workers)
+            ]
+            try:
+                # 1つ目がキャッシュを作り終えてから残りを起動する（同時にコンパイルしない）
+                workers[0].start()
+                self.worker_pids = self._wait_ready(workers[:1], ready_q)
+                for w in workers[1:]:
+                    w.start()
+                self.worker_pids += self._wait_ready(workers[1:], ready_q)
+                reply_qs = [manager.Queue() for _ in pairs]
+                dead = set()
+                with ProcessPoolExecutor(max_workers=self.jobs, mp_context=self._ctx) as pool:
+                    futures = {
+                        pool.submit(_process_deck, deck_id, in_path, out_path, request_q,
+                                    reply_qs[deck_id], self.chunk_texts, lost): in_path
+                        for deck_id, (in_path, out_path) in enumerate(pairs)
+                    }
+                    pending = set(futures)
+                    while pending:
+                        done, pending = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+                        self._check_workers(workers, dead, busy, reply_qs, lost)
+                        for future in done:
+                            in_path = futures[future]
+                            try:
+                                results.append(report_deck(future.result()))
+                            except Exception as e:
+                                with _print_lock:
+                                    print(f"❌ 処理失敗: {in_path}: {e}")
+                                failures.append(in_path)
+                if self.memory_budget:
+                    memory_report.print_report(
+                        [memory_report.process_memory(pid) for pid in self.worker_pids], self.memory_budget
+                    )
+            finally:
+                for _ in workers:
+                    request_q.put(None)
+                for w in workers:
+                    if w.pid is not None:
+                        w.join()
+
+        return results, failures
+
+    @staticmethod
+    def _check_workers(workers, dead, busy, reply_qs, lost):
+        """
+        落ちた推論ワーカーが処理中だった依頼だけを失敗として返信する（そのデッキだけが失敗になる）
+        残りの依頼は生きているワーカーが引き続き処理する。全部落ちたら lost を立てる
+        """
+        for worker_id, w in enumerate(workers):
+            if worker_id in dead or w.is_alive():
+                continue
+            dead.add(worker_id)
+            task = busy.pop(worker_id, None)
+            with _print_lock:
+                print(f"❌ 推論ワーカー {worker_id} が停止しました（exit {w.exitcode}）")
+            if task is not None:
+                deck_id, seq = task
+                reply_qs[deck_id].put((seq, [], "推論ワーカーが停止しました"))
+        if len(dead) == len(workers):
+            lost.set()
+
+    @staticmethod
+    def _wait_ready(workers, ready_q):
+        """推論ワーカーのモデルロード完了を待つ（ロード中に落ちたら例外）。ワーカーの pid を返す"""
+        pids = []
+        while len(pids) < len(workers):
+            try:
+                pids.append(ready_q.get(timeout=1))
+            except queue.Empty:
+                if any(not w.is_alive() for w in workers):
+                    raise RuntimeError("推論ワーカーの起動に失敗しました")
+        return pids
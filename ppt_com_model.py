@@ -1,8 +1,17 @@
-import win32com.client
 import os
-import pythoncom
 import traceback
 
+import metrics
+
+from com_snapshot import ComCallCounter, CountingProxy, ShapeSnapshot, read_runs
+from run_distribution import distribute_translation
+
+try:
+    import win32com.client
+    import pythoncom
+except ImportError:  # Windows 以外（ベンチマーク等で COM を使わない部分だけ利用する）
+    win32com = pythoncom = None
+
 def _safe_call(fn, *args, **kwargs):
     try:
         return fn(*args, **kwargs)
@@ -16,11 +25,27 @@ class PowerPointCOM:
         self.app = win32com.client.Dispatch("PowerPoint.Application")
         self.app.Visible = True
         try:
-            self.presentation = self.app.Presentations.Open(self.path, WithWindow=True)
+            presentation = self.app.Presentations.Open(self.path, WithWindow=True)
         except Exception as e:
             print(f"❌ PowerPointファイルを開けませんでした: {e}")
             self.app.Quit()
             raise
+        # プレゼンテーション配下への COM 往復回数を数える
+        self.com_calls = ComCallCounter()
+        self.presentation = CountingProxy(presentation, self.com_calls)
+
+    @classmethod
+    def from_presentation(cls, presentation, path=""):
+        """
+        既に取得済みの Presentation（fake_powerpoint のフェイクを含む）から作る
+        PowerPoint の起動は行わないので Linux でも使える
+        """
+        self = cls.__new__(cls)
+        self.path = path
+        self.app = None
+        self.com_calls = ComCallCounter()
+        self.presentation = CountingProxy(presentation, self.com_calls)
+        return self
 
     # ----------------------------------------
     # 再帰的にすべてのテキストを持つ shape を yield
@@ -40,90 +65,87 @@ class PowerPointCOM:
     # runs コレクションを Python リスト化
     # ----------------------------------------
     def _get_runs_list(self, text_range):
-        if text_range is None:
-            return None
-        runs = []
-        try:
-            runs_col = text_range.Runs()
-            count = int(runs_col.Count)
-            for i in range(1, count + 1):
-                runs.append(runs_col.Item(i))
-        except Exception:
-            try:
-                for r in text_range.Runs:
-                    runs.append(r)
-            except Exception:
-                return None
-        return runs
+        return read_runs(text_range)
 
     # ----------------------------------------
     # スライド全体の段落テキスト抽出（空白保持）
     # ----------------------------------------
-    def extract_texts(self):
-        slides_text = []
-        for slide in self.presentation.Slides:
-            slide_paras = []
-            for shape in self._iterate_text_shapes(slide):
-                try:
-                    full = shape.TextFrame.TextRange.Text
-                    paras = [p for p in full.split('\r') if p]
-                    slide_paras.extend(paras)
-                except Exception:
-                    continue
-            slides_text.append(slide_paras)
-        return slides_text
-
-    # ----------------------------------------
-    # 翻訳文を runs に分配
-    # ----------------------------------------
-    def _distribute_translation(self, orig_run_texts, translated):
-        n = len(orig_run_texts)
-        if n == 0:
-            return []
-        if not translated:
-            return [''] * n
-
-        source_has_space = any(' ' in s for s in orig_run_texts)
-        if source_has_space:
-            trans_words = translated.split()
-            total_words = max(1, sum(len(s.split()) if s.strip() else 1 for s in orig_run_texts))
-            assigned = []
-            idx = 0
-            total = len(trans_words)
-            for i, s in enumerate(orig_run_texts):
-                if i == n - 1:
-                    part = ' '.join(trans_words[idx:]) if idx < total else ''
-                else:
-                    want = max(1, round((len(s.split()) / total_words) * total))
-                    part = ' '.join(trans_words[idx:idx + want])
-                    idx += want
-                assigned.append(part)
-            if idx < total:
-                assigned[-1] = (assigned[-1] + ' ' + ' '.join(trans_words[idx:])).strip()
-            return assigned
-        else:
-            total_chars = sum(len(s) for s in orig_run_texts)
-            total_chars = total_chars if total_chars > 0 else 1
-            L = len(translated)
-            assigned = []
-            pos = 0
-            for i, s in enumerate(orig_run_texts):
-                if i == n - 1:
-                    part = translated[pos:]
-                else:
-                    take = max(1, round((len(s) / total_chars) * L))
-                    part = translated[pos:pos + take]
-                    pos += take
-                assigned.append(part)
-            return assigned
+    def extract_texts(self, with_ids=False):
+        """
+        スライドごとの段落テキスト
+        with_ids=True なら各段落を (shape_id, text) にする（翻訳マニフェスト用）
+        """
+        with metrics.span("extract", source="com"):
+            return self._extract_texts(with_ids)
+
+    def _extract_texts(self, with_ids=False):
+        return [self._slide_paragraphs(slide, with_ids) for slide in self.presentation.Slides]
+
+    def slide_texts(self, slide_idx):
+        """1枚のスライドの現在の段落テキスト（置換後に文書の内容を確かめる用）"""
+        return self._slide_paragraphs(self.presentation.Slides(slide_idx + 1))
+
+    def _slide_paragraphs(self, slide, with_ids=False):
+        slide_paras = []
+        for shape in self._iterate_text_shapes(slide):
+            try:
+                full = shape.TextFrame.TextRange.Text
+                paras = [p for p in full.split('\r') if p]
+                if with_ids:
+                    shape_id = shape.Id
+                    paras = [(shape_id, p) for p in paras]
+                slide_paras.extend(paras)
+            except Exception:
+                continue
+        return slide_paras
 
     # ----------------------------------------
     # テキスト置換本体
     # ----------------------------------------
     def replace_text_preserve_format(self, slide_idx, originals, translations, log_misses=False):
+        """
+        図形ごとに runs を1回だけ読み込み（ShapeSnapshot）、置換位置をローカルで解決してから
+        変更のある run だけを書き込む
+        """
+        slide = self.presentation.Slides(slide_idx + 1)
+        calls_before = self.com_calls.calls
+        with metrics.span("replace", slide=slide_idx):
+            replaced_count, misses = self._replace_in_slide(slide, originals, translations)
+        metrics.incr("com_calls", self.com_calls.calls - calls_before)
+
+        if log_misses and misses:
+            print("⚠️ 置換されなかった箇所一覧:")
+            for m in misses:
+                print(" -", m[0], ":", m[1])
+
+        return replaced_count, misses
+
+    def replace_deck(self, slides, progress=None):
+        """
+        複数スライドの置換を Slides を1回だけ走査して行う
+        slides: {slide_idx: (originals, translations)}
+        progress: 1枚終わるごとに progress(済んだ枚数, 全枚数) を呼ぶ
+        戻り値: {slide_idx: (replaced_count, misses)}
+        """
+        results = {}
+        total = len(slides)
+        calls_before = self.com_calls.calls
+        with metrics.span("replace", slides=total):
+            for slide_idx, slide in enumerate(self.presentation.Slides):
+                if len(results) >= total:
+                    break
+                if slide_idx not in slides:
+                    continue
+                originals, translations = slides[slide_idx]
+                results[slide_idx] = self._replace_in_slide(slide, originals, translations)
+                if progress is not None:
+                    progress(len(results), total)
+        metrics.incr("com_calls", self.com_calls.calls - calls_before)
+        return results
+
+    def _replace_in_slide(self, slide, originals, translations):
         misses = []
         replaced_count = 0
-        slide = self.presentation.Slides(slide_idx + 1)
         idx = 0
         total_units = len(originals)
 
@@ -131,81 +153,41 @@ class PowerPointCOM:
             try:
                 if idx >= total_units:
                     break
-                full_text = shape.TextFrame.TextRange.Text
-                shape_paras = [p for p in full_text.split('\r') if p]
-
-                runs = self._get_runs_list(shape.TextFrame.TextRange) or []
-                combined_runs = ''.join([r.Text for r in runs]) if runs else None
+                snapshot = ShapeSnapshot(shape)
 
-                for p in shape_paras:
+                for p in snapshot.paragraphs():
                     if idx >= total_units:
                         break
                     orig = originals[idx]
                     trans = translations[idx]
-                    success = False
-
-                    # normalize for comparison
-                    def norm(s):
-                        return s.replace('\u3000', ' ').strip()
-
-                    if combined_runs and orig and (norm(orig) in norm(combined_runs)):
-                        start = norm(combined_runs).find(norm(orig))
-                        end = start + len(norm(orig))
-                        pos = 0
-                        run_positions = []
-                        for r in runs:
-                            rtext = r.Text
-                            run_positions.append((pos, pos + len(rtext)))
-                            pos += len(rtext)
-                        run_indices = [i for i, (spos, epos) in enumerate(run_positions)
-                                       if not (epos <= start or spos >= end)]
-                        if run_indices:
-                            orig_run_texts = [runs[i].Text for i in run_indices]
-                            pieces = self._distribute_translation(orig_run_texts, trans)
-                            for ri, piece in zip(run_indices, pieces):
-                                try:
-                                    runs[ri].Text = piece
-                                except Exception:
-                                    pass
-                            success = True
-
-                    if not success:
-                        try:
-                            if norm(orig) in norm(full_text):
-                                new_full = full_text.replace(orig, trans, 1)
-                                shape.TextFrame.TextRange.Text = new_full
-                                # runs 再取得（PowerPointがrun構造を再生成するため）
-                                runs = self._get_runs_list(shape.TextFrame.TextRange) or []
-                                combined_runs = ''.join([r.Text for r in runs]) if runs else None
-                                full_text = new_full
-                                success = True
-                        except Exception:
-                            success = False
-
-                    if not success:
-                        misses.append((orig, "not found in shape"))
-                    else:
+                    if snapshot.replace(orig, trans, distribute_translation):
                         replaced_count += 1
+                    else:
+                        misses.append((orig, "not found in shape"))
                     idx += 1
 
+                snapshot.apply()
+
             except Exception as e:
                 traceback.print_exc()
+                metrics.incr("replace_errors")
                 continue
 
-        if log_misses and misses:
-            print("⚠️ 置換されなかった箇所一覧:")
-            for m in misses:
-                print(" -", m[0], ":", m[1])
-
+        metrics.incr("replaced", replaced_count)
+        metrics.incr("replace_misses", len(misses))
         return replaced_count, misses
 
     # ----------------------------------------
     # 保存と終了
     # ----------------------------------------
+    def output_path(self, suffix="_edited"):
+        return self.path.replace(".pptx", f"{suffix}.pptx")
+
     def save_as(self, suffix="_edited"):
-        new_path = self.path.replace(".pptx", f"{suffix}.pptx")
+        new_path = self.output_path(suffix)
         try:
-            self.presentation.SaveAs(new_path)
+            with metrics.span("save", source="com"):
+                self.presentation.SaveAs(new_path)
             print(f"✅ 保存成功: {new_path}")
             return new_path
         except Exception as e:
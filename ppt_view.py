@@ -1,10 +1,10 @@
 # ppt_view.py
 from PySide6.QtWidgets import (
-    QMainWindow, QWidget, QVBoxLayout, QPushButton,
-    QTextEdit, QLabel, QComboBox, QListWidget, QListWidgetItem, QCheckBox
+    QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
+    QTextEdit, QLabel, QComboBox, QTableView, QHeaderView, QAbstractItemView
 )
-import torch
-import openvino.runtime as ov
+
+from review_model import TranslationReviewModel
 
 class PPTView(QMainWindow):
     def __init__(self):
@@ -17,22 +17,44 @@ class PPTView(QMainWindow):
         # ------------------------
         self.device_label = QLabel("🔍 デバイス情報を取得中…")
         self.device_label.setStyleSheet("color: #00aa88; font-weight: bold;")
+        self.model_label = QLabel("🧠 翻訳モデル読み込み中…")
+        self.model_ready = False
+        self.busy = False
 
         self.slide_select = QComboBox()
         self.input_text = QTextEdit()
         self.output_text = QTextEdit()
         self.open_btn = QPushButton("📂 PPTを開く")
         self.translate_btn = QPushButton("🚀 翻訳")
+        self.deck_btn = QPushButton("🌐 全スライドを翻訳して置換")
+        self.cancel_btn = QPushButton("⏹ キャンセル")
+        self.cancel_btn.setEnabled(False)
         self.replace_btn = QPushButton("🔁 部分置換")
         self.save_btn = QPushButton("💾 保存")
 
-        self.text_list_widget = QListWidget()
+        # 置換テキスト選択: 原文・訳文を並べた一覧（チェック状態はモデルが bytearray で持つ）
+        self.review_model = TranslationReviewModel(self)
+        self.review_view = QTableView()
+        self.review_view.setModel(self.review_model)
+        self.review_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.review_view.setWordWrap(False)
+        # 行の高さを固定し、内容に合わせた再計算をしない（表示中の行だけ描画される）
+        self.review_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.review_view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.select_all_btn = QPushButton("☑ すべて選択")
+        self.deselect_all_btn = QPushButton("☐ すべて解除")
+        self.toggle_rows_btn = QPushButton("🔀 選択行を切替")
+        self.select_all_btn.clicked.connect(lambda: self.review_model.set_all_checked(True))
+        self.deselect_all_btn.clicked.connect(lambda: self.review_model.set_all_checked(False))
+        self.toggle_rows_btn.clicked.connect(self.toggle_selected_rows)
+        self.status_label = QLabel("")
 
         # ------------------------
         # 🧩 レイアウト構成
         # ------------------------
         layout = QVBoxLayout()
         layout.addWidget(self.device_label)
+        layout.addWidget(self.model_label)
         layout.addWidget(self.open_btn)
         layout.addWidget(QLabel("スライド選択"))
         layout.addWidget(self.slide_select)
@@ -40,10 +62,18 @@ class PPTView(QMainWindow):
         layout.addWidget(self.input_text)
        
         layout.addWidget(self.translate_btn)
+        layout.addWidget(self.deck_btn)
+        layout.addWidget(self.cancel_btn)
+        layout.addWidget(self.status_label)
         layout.addWidget(QLabel("翻訳プレビュー"))
         layout.addWidget(self.output_text)
         layout.addWidget(QLabel("置換テキスト選択"))
-        layout.addWidget(self.text_list_widget)
+        bulk = QHBoxLayout()
+        bulk.addWidget(self.select_all_btn)
+        bulk.addWidget(self.deselect_all_btn)
+        bulk.addWidget(self.toggle_rows_btn)
+        layout.addLayout(bulk)
+        layout.addWidget(self.review_view)
         layout.addWidget(self.replace_btn)
         layout.addWidget(self.save_btn)
 
@@ -51,20 +81,24 @@ class PPTView(QMainWindow):
         container.setLayout(layout)
         self.setCentralWidget(container)
 
-        # ------------------------
-        # 🚀 初期化処理
-        # ------------------------
-        self.update_device_info()
+        # デバイス検出とモデル読み込みはコントローラがバックグラウンドで行う
+        self.set_model_ready(False)
 
     # ----------------------------
     # 💡 デバイス情報を検出してUIに表示
     # ----------------------------
-    def update_device_info(self):
-        info_text = self.detect_devices()
+    def update_device_info(self, info_text=None):
+        if info_text is None:
+            info_text = self.detect_devices()
         self.device_label.setText(info_text)
 
-    def detect_devices(self):
+    @staticmethod
+    def detect_devices():
+        """torch / OpenVINO は重いので検出時に読み込む（ワーカースレッドから呼ばれる）"""
         try:
+            import torch
+            import openvino.runtime as ov
+
             if torch.cuda.is_available():
                 return f"💻 使用デバイス: GPU ({torch.cuda.get_device_name(0)})"
             elif torch.backends.mps.is_available():
@@ -85,10 +119,44 @@ class PPTView(QMainWindow):
     # ----------------------------
     # 💡 テキストリスト更新（チェックボックス付き）
     # ----------------------------
-    def update_text_list(self, texts):
-        self.text_list_widget.clear()
-        for t in texts:
-            item = QListWidgetItem()
-            checkbox = QCheckBox(t)
-            self.text_list_widget.addItem(item)
-            self.text_list_widget.setItemWidget(item, checkbox)
+    def update_text_list(self, texts, checked=None, originals=None, keys=None):
+        """
+        checked: チェック済みにする段落番号の集合、originals: 並べて表示する原文
+        keys: 行ごとの (slide_idx, paragraph_idx)
+        """
+        self.review_model.set_rows(originals or [], texts, checked, keys)
+
+    def clear_text_list(self):
+        self.review_model.clear()
+
+    def add_text_item(self, text, checked=False, original="", key=None):
+        """翻訳が1段落終わるごとに1行追加する"""
+        self.review_model.append_row(original, text, checked, key)
+
+    def checked_indices(self):
+        return self.review_model.checked_indices()
+
+    def toggle_selected_rows(self):
+        """選択中の行のチェックを、先頭行の逆の状態にそろえる"""
+        rows = [index.row() for index in self.review_view.selectionModel().selectedRows()]
+        if rows:
+            checked = not self.review_model.checked[min(rows)]
+            self.review_model.set_rows_checked(rows, checked)
+
+    # ----------------------------
+    # 💡 翻訳中の状態表示
+    # ----------------------------
+    def set_model_ready(self, ready, message=None):
+        self.model_ready = ready
+        self.translate_btn.setEnabled(ready and not self.busy)
+        self.deck_btn.setEnabled(ready and not self.busy)
+        if message is not None:
+            self.model_label.setText(message)
+
+    def set_busy(self, busy, message=""):
+        self.busy = busy
+        self.translate_btn.setEnabled(self.model_ready and not busy)
+        self.deck_btn.setEnabled(self.model_ready and not busy)
+        self.replace_btn.setEnabled(not busy)
+        self.cancel_btn.setEnabled(busy)
+        self.status_label.setText(message)
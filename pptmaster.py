@@ -0,0 +1,228 @@
+# pptmaster.py
+"""
+GUI (Qt) を使わずに .pptx を一括翻訳する CLI
+
+    python -m pptmaster translate in/ out/ --jobs 4
+    python -m pptmaster translate in/ out/ --jobs 6 --inference-workers 2
+    python -m pptmaster translate in/ out/ --inference-workers 2 --memory-report 32   # ワーカーの固有/共有メモリ
+    python -m pptmaster translate in/ out/ --tgt-lang en_XX,zh_CN,ko_KR   # 言語ごとに out/<名前>_<言語>.pptx
+    python -m pptmaster serve                              # 翻訳サーバ（モデルを共有）
+    python -m pptmaster translate in/ out/ --server 127.0.0.1:8765
+
+python-pptx ベースの PPTModel を使うので PowerPoint (COM) のない Linux サーバでも動く
+"""
+import argparse
+import os
+import sys
+import time
+
+import memory_report
+import metrics
+from pipeline import DeckPipeline, run_translate
+from translator_config import TranslatorConfig
+from translator_model import DEFAULT_MAX_BATCH_TOKENS, TranslatorModel
+from translation_cache import DEFAULT_CACHE_PATH, TranslationCache
+from translation_server import DEFAULT_HOST, DEFAULT_PORT, TranslationClient, run_server
+
+
+def collect_jobs(src, dst):
+    """入力 (ファイル or ディレクトリ) から (入力パス, 出力パス) の組を作る"""
+    if os.path.isdir(src):
+        pairs = []
+        for root, dirs, files in os.walk(src):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(".pptx") and not name.startswith("~$"):
+                    in_path = os.path.join(root, name)
+                    pairs.append((in_path, os.path.join(dst, os.path.relpath(in_path, src))))
+        return pairs
+    if dst.lower().endswith(".pptx"):
+        return [(src, dst)]
+    return [(src, os.path.join(dst, os.path.basename(src)))]
+
+
+def print_summary(results, failures, elapsed):
+    chars = sum(r["chars"] for r in results)
+    print(f"✅ {len(results)} files / {chars} chars in {elapsed:.2f}s"
+          f" ({chars / elapsed if elapsed else 0:.0f} chars/s)")
+    if failures:
+        print(f"⚠️ 失敗: {len(failures)} files")
+
+
+# ---------------------------
+# コマンドライン
+# ---------------------------
+def build_parser():
+    parser = argparse.ArgumentParser(prog="pptmaster", description="PPT ローカル翻訳 (CLI)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    tr = sub.add_parser("translate", help=".pptx ファイルまたはディレクトリを一括翻訳")
+    tr.add_argument("src", help="入力 .pptx またはディレクトリ")
+    tr.add_argument("dst", help="出力ディレクトリ（単一ファイル時は .pptx パスも可）")
+    tr.add_argument("--jobs", type=int, default=1, help="解析・書き込みの並列数")
+    tr.add_argument("--inference-workers", type=int, default=0,
+                    help="常駐推論ワーカー数（1以上でマルチプロセス版パイプラインを使う）")
+    tr.add_argument("--chunk-texts", type=int, default=64, help="推論ワーカーへの1依頼あたりのテキスト数")
+    # 既定値は cmd_translate で補う（--server と併用されたかを見分けるため）
+    tr.add_argument("--src-lang", help="入力言語（既定: ja_XX）")
+    tr.add_argument("--tgt-lang",
+                    help="出力言語（既定: en_XX）。カンマ区切りで複数指定すると、"
+                         "モデル1回の読み込み・エンコード1回で言語ごとに書き出す")
+    tr.add_argument("--config", help="翻訳モデル設定 JSON（既定: PPT_MASTER_CONFIG / translator_config.json）")
+    tr.add_argument("--model-dir", help="モデルディレクトリ（省略時は --precision から決める）")
+    tr.add_argument("--precision", choices=["int8", "fp"])
+    tr.add_argument("--device", help="GPU / CPU / NPU / AUTO など（無ければ CPU にフォールバック）")
+    tr.add_argument("--perf-hint", choices=["LATENCY", "THROUGHPUT"],
+                    help="一括処理では THROUGHPUT で複数推論リクエストを同時に流す")
+    tr.add_argument("--num-streams")
+    tr.add_argument("--inference-threads", type=int)
+    tr.add_argument("--num-requests", type=int, help="同時に投げる推論リクエスト数")
+    tr.add_argument("--ov-cache-dir", help="コンパイル済みモデルのキャッシュ先（相対パスはモデルディレクトリの隣）")
+    tr.add_argument("--no-mmap", action="store_true", help="重みを mmap せずプロセスごとに読み込む")
+    tr.add_argument("--memory-report", type=float, metavar="GB",
+                    help="終了前に推論ワーカーの固有/共有メモリと、GB に収まるワーカー数の目安を表示する")
+    tr.add_argument("--max-batch-tokens", type=int, default=DEFAULT_MAX_BATCH_TOKENS)
+    tr.add_argument("--profile", choices=["fast", "quality"],
+                    help="デコード設定（fast: 貪欲法で高速 / quality: ビームサーチ）")
+    tr.add_argument("--no-segment", action="store_true", help="段落を文に分けずに翻訳する")
+    tr.add_argument("--no-passthrough", action="store_true",
+                    help="数字・URL・原文の文字を含まないテキストなどもモデルに通す")
+    tr.add_argument("--passthrough-list", help="そのまま通す語の一覧（既定: PPT_MASTER_PASSTHROUGH / passthrough.txt）")
+    tr.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="翻訳メモリの SQLite パス")
+    tr.add_argument("--no-cache", action="store_true", help="翻訳メモリを使わない")
+    tr.add_argument("--server", help="翻訳サーバ（host:port / unix:パス）を使う。モデルは読み込まない"
+                                     "（言語・デコード設定などはサーバ側の設定に従う）")
+    tr.add_argument("--metrics", help="ステージ別の時間・カウンターを JSON で書き出す")
+    tr.add_argument("--prometheus", help="同じ内容を Prometheus テキスト形式で書き出す")
+    tr.add_argument("--trace", help="Chrome トレース JSON（chrome://tracing / Perfetto）を書き出す")
+
+    sv = sub.add_parser("serve", help="翻訳モデルを1つ読み込み、ローカルの翻訳サーバとして待ち受ける")
+    sv.add_argument("--host", default=DEFAULT_HOST, help="待ち受けアドレス（ローカルホストのみ）")
+    sv.add_argument("--port", type=int, default=DEFAULT_PORT)
+    sv.add_argument("--socket", help="Unix ソケットのパス（指定時は TCP を使わない）")
+    sv.add_argument("--batch-window-ms", type=float, default=10, help="要求をまとめる待ち時間")
+    sv.add_argument("--max-batch-chars", type=int, default=20000, help="1バッチの最大文字数")
+    sv.add_argument("--max-pending", type=int, default=256, help="待ち行列の上限（超えたら busy を返す）")
+    sv.add_argument("--stub", action="store_true", help="モデルの代わりに StubTranslator を使う（動作確認用）")
+    sv.add_argument("--src-lang", default="ja_XX")
+    sv.add_argument("--tgt-lang", default="en_XX")
+    sv.add_argument("--config", help="翻訳モデル設定 JSON")
+    sv.add_argument("--profile", choices=["fast", "quality"], help="デコード設定")
+    sv.add_argument("--no-segment", action="store_true", help="段落を文に分けずに翻訳する")
+    sv.add_argument("--no-passthrough", action="store_true",
+                    help="数字・URL・原文の文字を含まないテキストなどもモデルに通す")
+    sv.add_argument("--passthrough-list", help="そのまま通す語の一覧")
+    sv.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="翻訳メモリの SQLite パス")
+    sv.add_argument("--no-cache", action="store_true", help="翻訳メモリを使わない")
+    return parser
+
+
+def export_metrics(args):
+    """--metrics / --prometheus / --trace の出力（--inference-workers のワーカープロセス分は含まない）"""
+    if not metrics.enabled:
+        return
+    metrics.print_summary()
+    if args.metrics:
+        metrics.write_json(args.metrics)
+    if args.prometheus:
+        metrics.write_prometheus(args.prometheus)
+    if args.trace:
+        metrics.write_chrome_trace(args.trace)
+
+
+def cmd_translate(args):
+    if args.metrics or args.prometheus or args.trace:
+        metrics.enable(trace=bool(args.trace))
+
+    pairs = collect_jobs(args.src, args.dst)
+    if not pairs:
+        print(f"⚠️ .pptx が見つかりません: {args.src}")
+        return 1
+
+    config = TranslatorConfig.load(args.config).override(
+        model_dir=args.model_dir, precision=args.precision, device=args.device,
+        performance_hint=args.perf_hint, num_streams=args.num_streams,
+        inference_threads=args.inference_threads, num_requests=args.num_requests,
+        cache_dir=args.ov_cache_dir, decoding_profile=args.profile,
+        mmap=False if args.no_mmap else None,
+    )
+    if args.server:
+        # サーバは起動時の言語・設定で翻訳するので、クライアント側の指定は黙って無視せずに断る
+        ignored = [flag for flag, value in [
+            ("--src-lang", args.src_lang), ("--tgt-lang", args.tgt_lang), ("--profile", args.profile),
+            ("--no-segment", args.no_segment), ("--no-passthrough", args.no_passthrough),
+            ("--passthrough-list", args.passthrough_list),
+        ] if value]
+        if ignored:
+            print(f"⚠️ {' / '.join(ignored)} は --server と併用できません（pptmaster serve 側で指定してください）")
+            return 2
+    tgt_langs = [lang.strip() for lang in (args.tgt_lang or "en_XX").split(",") if lang.strip()]
+    fan_out = tgt_langs if len(tgt_langs) > 1 else None
+    if fan_out and args.inference_workers > 0:
+        print("⚠️ 複数言語の出力は --inference-workers と併用できません")
+        return 2
+    model_kwargs = {"src_lang": args.src_lang or "ja_XX", "tgt_lang": tgt_langs[0], "config": config,
+                    "segment": not args.no_segment, "passthrough": not args.no_passthrough,
+                    "passthrough_list": args.passthrough_list}
+
+    start = time.perf_counter()
+    if args.inference_workers > 0:
+        pipeline = DeckPipeline(args.jobs, args.inference_workers, model_kwargs,
+                                None if args.no_cache else args.cache,
+                                args.max_batch_tokens, args.chunk_texts,
+                                args.memory_report and args.memory_report * memory_report.GIB)
+        results, failures = pipeline.run(pairs)
+        print_summary(results, failures, time.perf_counter() - start)
+        export_metrics(args)
+        return 1 if failures else 0
+
+    if args.server:
+        cache = None
+        translator = TranslationClient(args.server)
+    else:
+        cache = None if args.no_cache else TranslationCache(args.cache)
+        translator = TranslatorModel(cache=cache, **model_kwargs)
+    results, failures = run_translate(pairs, translator, args.jobs, args.max_batch_tokens, fan_out)
+    print_summary(results, failures, time.perf_counter() - start)
+    if args.memory_report and not args.server:
+        memory_report.print_report([memory_report.process_memory()], args.memory_report * memory_report.GIB)
+    if cache is not None:
+        print(f"🗂 翻訳メモリ: {cache.stats()}")
+        cache.close()
+    export_metrics(args)
+    return 1 if failures else 0
+
+
+def cmd_serve(args):
+    cache = None
+    if args.stub:
+        from stub_translator import StubTranslator
+
+        translator = StubTranslator()
+    else:
+        cache = None if args.no_cache else TranslationCache(args.cache)
+        translator = TranslatorModel(cache=cache, src_lang=args.src_lang, tgt_lang=args.tgt_lang,
+                                     config=TranslatorConfig.load(args.config), profile=args.profile,
+                                     segment=not args.no_segment, passthrough=not args.no_passthrough,
+                                     passthrough_list=args.passthrough_list)
+    try:
+        run_server(translator, host=args.host, port=args.port, path=args.socket,
+                   batch_window=args.batch_window_ms / 1000, max_batch_chars=args.max_batch_chars,
+                   max_pending=args.max_pending)
+    finally:
+        if cache is not None:
+            cache.close()
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "translate":
+        return cmd_translate(args)
+    if args.command == "serve":
+        return cmd_serve(args)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
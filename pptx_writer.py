@@ -0,0 +1,137 @@
+# pptx_writer.py
+"""
+python-pptx のスライドの lxml ツリーへ、書式（a:rPr）を残したまま訳文を書き込む
+
+段落を作り直さず、既存の run（a:r / a:fld）の a:t だけを書き換える
+訳文は run_distribution.distribute_translation で原文の run の比率に合わせて分配する（COM 版と同じ）
+グループ内の図形と表のセルも対象にする
+
+    writer = SlideTextWriter(slide.element)
+    writer.texts()                      # [(shape_id, text), ...]（段落は "\n"、a:br は "\v"）
+    writer.set_text(0, "Title")         # 図形（セル）単位で訳文を溜める
+    writer.apply()                      # 1回の走査で書き込み、書き換えた段落数を返す
+"""
+from run_distribution import distribute_translation
+from xml_extract import A, P, RUN_TAGS, _paragraph_text, shape_id_value
+
+_BR = A + "br"
+
+
+def iter_text_bodies(container):
+    """
+    spTree / grpSp の子を文書順にたどり、(shape_id, txBody) を返す
+    表のセルは (表の id + ":r行c列", セルの txBody)（xml_extract と同じ表記）
+    """
+    for child in container:
+        tag = child.tag
+        if tag == P + "sp":
+            body = child.find(P + "txBody")
+            if body is not None:
+                yield _shape_id(child), body
+        elif tag == P + "grpSp":
+            yield from iter_text_bodies(child)
+        elif tag == P + "graphicFrame":
+            table = child.find(".//" + A + "tbl")
+            if table is None:
+                continue
+            shape_id = _shape_id(child)
+            for r, tr in enumerate(table.iter(A + "tr")):
+                for c, tc in enumerate(tr.iter(A + "tc")):
+                    body = tc.find(A + "txBody")
+                    if body is not None:
+                        yield f"{shape_id}:r{r}c{c}", body
+
+
+def _shape_id(shape):
+    c_nv_pr = shape.find(".//" + P + "cNvPr")
+    if c_nv_pr is None:
+        return None
+    return shape_id_value(c_nv_pr.get("id"))
+
+
+def body_text(body):
+    """python-pptx の TextFrame.text と同じ（段落は "\n"、a:br は "\v"）"""
+    return "\n".join(_paragraph_text(p)[0] for p in body.findall(A + "p"))
+
+
+def write_paragraph(p, text):
+    """
+    段落 p の run に text を分配して書き込む（run の書式はそのまま）
+    a:br で区切られた行の数が訳文の "\v" の数と合えば行ごとに分配し、合わなければ a:br を除いて段落全体に分配する
+    戻り値: 書き換えたか
+    """
+    lines = [[]]
+    for child in p:
+        if child.tag in RUN_TAGS:
+            t = child.find(A + "t")
+            if t is not None:
+                lines[-1].append(t)
+        elif child.tag == _BR:
+            lines.append([])
+    runs = [t for line in lines for t in line]
+    if not runs:
+        return False
+
+    parts = text.split("\v")
+    if len(parts) == len(lines) and len(lines) > 1:
+        groups = list(zip(lines, parts))
+    else:
+        if len(lines) > 1:
+            for br in p.findall(_BR):
+                p.remove(br)
+        groups = [(runs, " ".join(part.strip() for part in parts if part.strip()))]
+
+    changed = False
+    for line_runs, line_text in groups:
+        if not line_runs:
+            continue
+        pieces = distribute_translation([t.text or "" for t in line_runs], line_text)
+        for t, piece in zip(line_runs, pieces):
+            if (t.text or "") != piece:
+                t.text = piece
+                changed = True
+    return changed
+
+
+def write_body(body, text):
+    """
+    図形（セル）の訳文を段落ごとに書き込む
+    訳文の行は、原文の空でない段落へ順に対応させる（翻訳で空行は詰められるため）
+    行が余れば最後の段落に続け、足りなければ残りの段落を空にする
+    戻り値: 書き換えた段落数
+    """
+    paragraphs = [p for p in body.findall(A + "p") if _paragraph_text(p)[0].strip()]
+    lines = [line for line in text.split("\n") if line.strip()]
+    if not paragraphs or not lines:
+        return 0
+    if len(lines) > len(paragraphs):
+        keep = len(paragraphs) - 1
+        lines = lines[:keep] + [" ".join(line.strip() for line in lines[keep:])]
+    lines += [""] * (len(paragraphs) - len(lines))
+    return sum(1 for p, line in zip(paragraphs, lines) if write_paragraph(p, line))
+
+
+class SlideTextWriter:
+    """1枚のスライドの図形・セルのテキストを読み、訳文をまとめて書き込む"""
+
+    def __init__(self, slide_element):
+        sp_tree = slide_element.find(P + "cSld/" + P + "spTree")
+        self.bodies = list(iter_text_bodies(sp_tree)) if sp_tree is not None else []
+        self.edits = {}  # 図形（セル）の番号 -> 訳文
+
+    def texts(self, with_ids=False):
+        return [(shape_id, body_text(body)) if with_ids else body_text(body)
+                for shape_id, body in self.bodies]
+
+    def set_text(self, index, text):
+        if 0 <= index < len(self.bodies):
+            self.edits[index] = text
+
+    def apply(self):
+        """溜めた訳文を書き込む。書き換えた段落数を返す"""
+        changed = 0
+        for index, text in sorted(self.edits.items()):
+            if text.strip():
+                changed += write_body(self.bodies[index][1], text)
+        self.edits = {}
+        return changed
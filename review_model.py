@@ -0,0 +1,125 @@
+# review_model.py
+"""
+置換する訳文を選ぶ一覧のモデル（QTableView 用）
+
+段落ごとに QCheckBox を作る代わりに、原文・訳文のリストと bytearray のチェック状態だけを持つ
+描画は表示中の行だけビューが行うので、デッキ全体（数千段落）でも1つの一覧で扱える
+
+    model = TranslationReviewModel()
+    model.set_rows(originals, translations, checked={0, 2})
+    model.set_all_checked(True)          # 一括選択（dataChanged は1回だけ）
+    model.checked_indices()              # O(n)、ウィジェットに触らない
+"""
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+COL_ORIGINAL = 0
+COL_TRANSLATION = 1
+HEADERS = ("原文", "訳文")
+
+
+class TranslationReviewModel(QAbstractTableModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.originals = []
+        self.translations = []
+        self.keys = []            # 行ごとの (slide_idx, paragraph_idx)
+        self.checked = bytearray()  # 行ごとのチェック状態（0 / 1）
+
+    # ----------------------------
+    # Qt モデル
+    # ----------------------------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.translations)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return HEADERS[section]
+        if role == Qt.DisplayRole and orientation == Qt.Vertical:
+            slide_idx, paragraph_idx = self.keys[section]
+            return f"{slide_idx + 1}-{paragraph_idx + 1}"
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, col = index.row(), index.column()
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return self.originals[row] if col == COL_ORIGINAL else self.translations[row]
+        if role == Qt.CheckStateRole and col == COL_TRANSLATION:
+            return Qt.Checked if self.checked[row] else Qt.Unchecked
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.CheckStateRole or index.column() != COL_TRANSLATION:
+            return False
+        # PySide6 では CheckStateRole の値が int で渡ることがある
+        self.checked[index.row()] = 1 if Qt.CheckState(value) == Qt.Checked else 0
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.column() == COL_TRANSLATION:
+            flags |= Qt.ItemIsUserCheckable
+        return flags
+
+    # ----------------------------
+    # 内容の更新
+    # ----------------------------
+    def set_rows(self, originals, translations, checked=None, keys=None):
+        """
+        一覧を入れ替える（リセットは1回だけ）
+        checked: チェック済みにする行番号の集合、keys: 行ごとの (slide_idx, paragraph_idx)
+        """
+        self.beginResetModel()
+        self.translations = list(translations)
+        n = len(self.translations)
+        self.originals = (list(originals) + [""] * n)[:n]
+        self.keys = (list(keys) if keys is not None else [(0, i) for i in range(n)])[:n]
+        self.checked = bytearray(n)
+        for i in checked or ():
+            if i < len(self.checked):
+                self.checked[i] = 1
+        self.endResetModel()
+
+    def append_row(self, original, translation, checked=False, key=None):
+        """翻訳が1段落終わるごとに1行追加する"""
+        row = len(self.translations)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.originals.append(original)
+        self.translations.append(translation)
+        self.keys.append(key if key is not None else (self.keys[-1][0] if self.keys else 0, row))
+        self.checked.append(1 if checked else 0)
+        self.endInsertRows()
+
+    def clear(self):
+        self.set_rows([], [])
+
+    def set_all_checked(self, checked=True):
+        """全行を一括でチェック／解除する"""
+        if not self.checked:
+            return
+        self.checked[:] = (b"\x01" if checked else b"\x00") * len(self.checked)
+        self.dataChanged.emit(self.index(0, COL_TRANSLATION),
+                              self.index(len(self.checked) - 1, COL_TRANSLATION), [Qt.CheckStateRole])
+
+    def set_rows_checked(self, rows, checked=True):
+        """選択中の行など、指定した行だけをまとめてチェック／解除する"""
+        rows = sorted(set(rows))
+        if not rows:
+            return
+        for row in rows:
+            self.checked[row] = 1 if checked else 0
+        self.dataChanged.emit(self.index(rows[0], COL_TRANSLATION),
+                              self.index(rows[-1], COL_TRANSLATION), [Qt.CheckStateRole])
+
+    # ----------------------------
+    # 選択結果
+    # ----------------------------
+    def checked_indices(self):
+        return [i for i, c in enumerate(self.checked) if c]
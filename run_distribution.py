@@ -0,0 +1,127 @@
+# run_distribution.py
+"""
+訳文を原文の run（書式の区切り）へ分配する
+
+PowerPoint (COM) の置換と、python-pptx の lxml 直接書き込み（pptx_writer.py）で共通に使う
+各 run の書式（太字・色など）はそのまま残し、テキストだけを原文の長さの比率で割り振る
+
+    distribute_translation(["重要な", "お知らせ"], "Important notice")
+    # ["Important ", "notice"] に近い分け方（空白のない原文は文字数比、ある原文は語数比。run の間の空白は残す）
+"""
+from segmenter import sentence_spans
+
+
+def distribute_translation(orig_run_texts, translated):
+    n = len(orig_run_texts)
+    if n == 0:
+        return []
+    if not translated:
+        return [''] * n
+
+    # 原文と訳文の文の数が同じなら、文の境界で run を揃えてから文ごとに分配する
+    if n > 1:
+        aligned = distribute_by_sentence(orig_run_texts, translated)
+        if aligned is not None:
+            return aligned
+
+    source_has_space = any(' ' in s for s in orig_run_texts)
+    if source_has_space:
+        trans_words = translated.split()
+        total_words = max(1, sum(len(s.split()) if s.strip() else 1 for s in orig_run_texts))
+        assigned = []
+        idx = 0
+        total = len(trans_words)
+        for i, s in enumerate(orig_run_texts):
+            if i == n - 1:
+                part = ' '.join(trans_words[idx:]) if idx < total else ''
+                idx = total
+            else:
+                want = max(1, round((len(s.split()) / total_words) * total))
+                part = ' '.join(trans_words[idx:idx + want])
+                idx += want
+            assigned.append(part)
+        if idx < total:
+            assigned[-1] = (assigned[-1] + ' ' + ' '.join(trans_words[idx:])).strip()
+        return _keep_word_spaces(orig_run_texts, assigned)
+    else:
+        total_chars = sum(len(s) for s in orig_run_texts)
+        total_chars = total_chars if total_chars > 0 else 1
+        L = len(translated)
+        assigned = []
+        pos = 0
+        for i, s in enumerate(orig_run_texts):
+            if i == n - 1:
+                part = translated[pos:]
+            else:
+                take = max(1, round((len(s) / total_chars) * L))
+                end = _snap_to_space(translated, pos, pos + take)
+                part = translated[pos:end]
+                pos = end
+            assigned.append(part)
+        return assigned
+
+
+def _keep_word_spaces(orig_run_texts, assigned):
+    """
+    語単位で分けた訳文の run の間に空白を戻す（"Sales year" + "over year" が "yearover" にならないように）
+    原文で次の run が空白で始まっていればそちらの先頭に、それ以外は前の run の末尾に付ける
+    """
+    nonempty = [i for i, part in enumerate(assigned) if part]
+    for i, j in zip(nonempty, nonempty[1:]):
+        if j == i + 1 and orig_run_texts[j][:1].isspace() and not orig_run_texts[i][-1:].isspace():
+            assigned[j] = ' ' + assigned[j]
+        else:
+            assigned[i] += ' '
+    return assigned
+
+
+def _snap_to_space(text, start, end):
+    """
+    空白のない原文（日本語など）から空白のある訳文（英語など）へ分配するとき、
+    語の途中で run が切れないよう、区切り位置を最寄りの空白の直後にずらす
+    """
+    if end >= len(text) or " " not in text[start:]:
+        return end
+    before = text.rfind(" ", start, end)
+    after = text.find(" ", end)
+    candidates = [i + 1 for i in (before, after) if i >= start]
+    if not candidates:
+        return end
+    return min(candidates, key=lambda i: abs(i - end))
+
+
+def distribute_by_sentence(orig_run_texts, translated):
+    """
+    原文の i 番目の文にかかる run へ、訳文の i 番目の文を分配する
+    文の数が合わない（または1文しかない）場合は None
+    """
+    orig = "".join(orig_run_texts)
+    orig_spans = sentence_spans(orig)
+    trans_spans = sentence_spans(translated)
+    if len(orig_spans) < 2 or len(orig_spans) != len(trans_spans):
+        return None
+
+    starts = []
+    ends = []
+    pos = 0
+    for s in orig_run_texts:
+        starts.append(pos)
+        pos += len(s)
+        ends.append(pos)
+
+    assigned = [''] * len(orig_run_texts)
+    for (oa, ob), (ta, tb) in zip(orig_spans, trans_spans):
+        indices = [i for i in range(len(orig_run_texts)) if ends[i] > oa and starts[i] < ob]
+        if not indices:
+            return None
+        slices = [orig_run_texts[i][max(oa, starts[i]) - starts[i]:min(ob, ends[i]) - starts[i]]
+                  for i in indices]
+        sentence = translated[ta:tb]
+        body = sentence.rstrip()
+        parts = distribute_translation(slices, body)
+        # 文の後ろの空白は、その文の最後の（空でない）run に付ける
+        last = max((k for k, part in enumerate(parts) if part), default=len(parts) - 1)
+        parts[last] += sentence[len(body):]
+        for i, part in zip(indices, parts):
+            assigned[i] += part
+    return assigned
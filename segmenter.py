@@ -0,0 +1,156 @@
+# segmenter.py
+"""
+段落を文単位に分割する（翻訳前の前処理）
+
+長い段落を 256 トークンで切り捨てずに済むよう、文（日本語の 。！？ と欧文の . ! ?）ごとに
+短い系列へ分けて翻訳し、元の改行構造のまま組み立て直す
+短い系列はバッチに詰めやすく、デコードも速い
+
+    lines = segment_text("一文目。二文目！\\n次の行")
+    # [(["一文目。", "二文目！"], "\\n"), (["次の行"], "")]  行ごとの文と行末の改行
+    join_sentences(["First.", "Second!"], "en_XX")  # "First. Second!"
+"""
+import re
+
+# 文末記号（全角・半角）
+CJK_TERMINATORS = "。！？"
+LATIN_TERMINATORS = ".!?"
+# 文末記号の直後に続けて同じ文に含める閉じ括弧・引用符
+CLOSERS = "」』）】〕》〉)]}\"'”’"
+# 閉じ括弧の直後にこれが続く場合は引用の途中（「はい。」と言った）とみなして区切らない
+QUOTE_CONTINUATIONS = "とのをにがはも"
+# 長すぎる文を分けるときの区切り（読点・カンマなど）
+CLAUSE_MARKS = "、，,;；:："
+# 1単位の最大文字数（MAX_LENGTH = 256 トークンに十分収まる長さ）
+MAX_SEGMENT_CHARS = 200
+
+# "." の後でも文を区切らない略語
+ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "prof", "st", "vs", "etc", "e.g", "i.e", "no", "fig", "inc", "ltd", "co"}
+
+# 文の間に空白を入れない言語（mbart-50 の言語コード）
+UNSPACED_LANGS = {"ja_XX", "zh_CN", "th_TH", "my_MM", "km_KH"}
+
+_LINE_BREAK = re.compile(r"(\r\n|[\n\v\r])")
+
+
+def _is_latin_sentence_end(text, i):
+    """text[i] の "." / "!" / "?" が文末かどうか"""
+    ch = text[i]
+    j = i + 1
+    while j < len(text) and (text[j] in CLOSERS or text[j] in LATIN_TERMINATORS):
+        j += 1
+    nxt = text[j] if j < len(text) else ""
+    if nxt and not nxt.isspace():
+        # "3.14" や "example.com" は区切らない
+        return False
+    if ch != ".":
+        return True
+    # 直前の語が略語・1文字（イニシャル）なら区切らない
+    start = i
+    while start > 0 and (text[start - 1].isalpha() or text[start - 1] == "."):
+        start -= 1
+    word = text[start:i].lower()
+    if word in ABBREVIATIONS or (len(word) == 1 and word.isalpha()):
+        return False
+    return True
+
+
+def sentence_spans(text):
+    """
+    text を文ごとの (開始, 終了) に分ける
+    各範囲は文末記号・閉じ括弧・後続の空白までを含み、全体で text を隙間なく覆う
+    """
+    spans = []
+    start = 0
+    i = 0
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        end = None
+        if ch in CJK_TERMINATORS:
+            end = i + 1
+        elif ch in LATIN_TERMINATORS and _is_latin_sentence_end(text, i):
+            end = i + 1
+        if end is None:
+            i += 1
+            continue
+        # 連続する文末記号（「！？」「...」）と閉じ括弧、後続の空白をまとめる
+        while end < n and (text[end] in CJK_TERMINATORS or text[end] in LATIN_TERMINATORS):
+            end += 1
+        closed = end
+        while end < n and text[end] in CLOSERS:
+            end += 1
+        if end > closed and end < n and text[end] in QUOTE_CONTINUATIONS:
+            i = end
+            continue
+        while end < n and text[end].isspace() and text[end] not in "\r\n\v":
+            end += 1
+        if end < n:
+            spans.append((start, end))
+            start = end
+        i = end
+    if start < n:
+        spans.append((start, n))
+    return spans
+
+
+def split_sentences(text):
+    """文ごとのリストを返す（連結すると元の text に戻る）"""
+    return [text[a:b] for a, b in sentence_spans(text)]
+
+
+def _split_long(sentence, max_chars):
+    """max_chars を超える文を読点・カンマで分け、それでも長ければ文字数で切る"""
+    if len(sentence) <= max_chars:
+        return [sentence]
+    clauses = re.findall(r"[^" + re.escape(CLAUSE_MARKS) + r"]*[" + re.escape(CLAUSE_MARKS) + r"]?\s*", sentence)
+    pieces = []
+    current = ""
+    for clause in filter(None, clauses):
+        while len(clause) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(clause[:max_chars])
+            clause = clause[max_chars:]
+        if current and len(current) + len(clause) > max_chars:
+            pieces.append(current)
+            current = ""
+        current += clause
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def segment_text(text, max_chars=MAX_SEGMENT_CHARS):
+    """
+    段落テキストを行 → 文に分ける
+    戻り値は [(行の文リスト, 行末の改行文字), ...]。文は前後の空白を除いたもの（空の文は含めない）
+    """
+    parts = _LINE_BREAK.split(text)
+    lines = []
+    for k in range(0, len(parts), 2):
+        line = parts[k]
+        sep = parts[k + 1] if k + 1 < len(parts) else ""
+        sentences = []
+        for sentence in split_sentences(line):
+            for piece in _split_long(sentence, max_chars):
+                if piece.strip():
+                    sentences.append(piece.strip())
+        lines.append((sentences, sep))
+    return lines
+
+
+def join_sentences(sentences, tgt_lang):
+    """翻訳後の文を1行に連結する（日本語・中国語などは空白なし）"""
+    sentences = [s.strip() for s in sentences if s and s.strip()]
+    return ("" if tgt_lang in UNSPACED_LANGS else " ").join(sentences)
+
+
+def reassemble(lines, translated, tgt_lang):
+    """segment_text の結果と {文: 訳文} から、元の改行構造のまま訳文を組み立てる"""
+    out = []
+    for sentences, sep in lines:
+        out.append(join_sentences([translated.get(s, "") for s in sentences], tgt_lang))
+        out.append(sep)
+    return "".join(out).strip()
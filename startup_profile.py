@@ -0,0 +1,31 @@
+# startup_profile.py
+"""
+起動時間の計測（python main.py --profile-startup）
+
+mark(phase) を呼んだ時点までの経過時間を記録し、report() でフェーズごとに表示する
+無効時は mark() は何もしない
+"""
+import time
+
+_START = time.perf_counter()
+enabled = False
+_marks = []
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def mark(phase):
+    if enabled:
+        _marks.append((phase, time.perf_counter()))
+
+
+def report():
+    """フェーズ名・直前フェーズからの所要時間・起動からの累計を表示する"""
+    print("⏱ 起動時間")
+    prev = _START
+    for phase, t in _marks:
+        print(f"  {phase:<24} +{(t - prev) * 1000:8.1f} ms  ({(t - _START) * 1000:8.1f} ms)")
+        prev = t
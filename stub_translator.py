@@ -0,0 +1,28 @@
+# stub_translator.py
+"""
+モデルを使わない決定的なスタブ翻訳（ベンチマーク・翻訳サーバの動作確認用）
+
+    translator = StubTranslator()
+    translator.translate_batch(["こんにちは"])   # ["[en] はちにんこ"]
+"""
+import time
+
+
+class StubTranslator:
+    """
+    決定的なスタブ翻訳。文字列を加工して返すだけ（モデル不要）
+    delay_per_char を指定すると文字数に比例した待ち時間で推論コストを模擬する
+    """
+
+    def __init__(self, delay_per_char=0.0):
+        self.delay_per_char = delay_per_char
+        self.calls = 0
+
+    def translate_text(self, text):
+        return self.translate_batch([text])[0]
+
+    def translate_batch(self, texts, max_batch_tokens=None, **kwargs):
+        self.calls += 1
+        if self.delay_per_char:
+            time.sleep(self.delay_per_char * sum(len(t) for t in texts))
+        return [f"[en] {t.strip()[::-1]}" if t and t.strip() else "" for t in texts]
@@ -0,0 +1,6 @@
+# tests/conftest.py
+# モジュールはリポジトリ直下に平置きなので、テストからそのまま import できるようにする
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,124 @@
+# tests/test_com_snapshot.py
+# PowerPoint を使わず fake_powerpoint のフェイクで ShapeSnapshot / PowerPointCOM の置換を確かめる
+from com_snapshot import ComCallCounter, CountingProxy, ShapeSnapshot
+from fake_powerpoint import FakeShape, build_presentation, make_random_spec
+from ppt_com_model import PowerPointCOM
+from run_distribution import distribute_translation
+
+
+def run_texts(shape):
+    return list(shape.TextFrame.TextRange._runs)
+
+
+def test_replace_spanning_runs_keeps_run_structure():
+    shape = FakeShape([["重要な", "お知らせ"]])
+    snapshot = ShapeSnapshot(shape)
+    assert snapshot.starts == [0, 3]
+    assert snapshot.ends == [3, 7]
+    assert snapshot.replace("重要なお知らせ", "Important notice", distribute_translation)
+    assert run_texts(shape) == ["重要な", "お知らせ"]  # apply までは書き込まない
+    assert snapshot.apply() == 2
+    assert run_texts(shape) == ["Important ", "notice"]
+
+
+def test_offsets_resolved_inside_one_run():
+    shape = FakeShape([["売上と利益の推移"]])
+    snapshot = ShapeSnapshot(shape)
+    # 後ろの語を先に置換しても、位置は元のテキストの索引で解決される
+    assert snapshot.replace("利益", "profit", distribute_translation)
+    assert snapshot.replace("売上", "Sales", distribute_translation)
+    assert snapshot.edits == {0: [(3, 5, "profit"), (0, 2, "Sales")]}
+    assert snapshot.apply() == 1
+    assert run_texts(shape) == ["Salesとprofitの推移"]
+
+
+def test_paragraphs_and_cursor_follow_document_order():
+    shape = FakeShape([["見出し"], ["本文", "です"], ["見出し"]])
+    snapshot = ShapeSnapshot(shape)
+    assert snapshot.paragraphs() == ["見出し", "本文です", "見出し"]
+    for orig, trans in zip(snapshot.paragraphs(), ["Title", "Body", "Heading"]):
+        assert snapshot.replace(orig, trans, distribute_translation)
+    snapshot.apply()
+    # 同じ原文が2回出ても、2回目は1回目より後ろの段落に当たる
+    assert shape.TextFrame.TextRange.Text == "Title\rBody\rHeading"
+
+
+def test_full_width_space_matches_half_width():
+    shape = FakeShape([["売上　計画"]])
+    snapshot = ShapeSnapshot(shape)
+    assert snapshot.replace("売上 計画", "Sales plan", distribute_translation)
+    snapshot.apply()
+    assert run_texts(shape) == ["Sales plan"]
+
+
+def test_shape_without_runs_falls_back_to_text():
+    class NoRunsRange:
+        Text = "古い文"
+
+        def Runs(self):
+            raise RuntimeError("runs unavailable")
+
+    class NoRunsShape:
+        class TextFrame:
+            TextRange = NoRunsRange()
+
+    shape = NoRunsShape()
+    snapshot = ShapeSnapshot(shape)
+    assert snapshot.replace("古い文", "new", distribute_translation)
+    assert snapshot.apply() == 1
+    assert shape.TextFrame.TextRange.Text == "new"
+
+
+def test_counting_proxy_counts_round_trips():
+    counter = ComCallCounter()
+    shape = CountingProxy(FakeShape([["a", "b"]]), counter)
+    text_range = shape.TextFrame.TextRange  # 2往復
+    assert counter.calls == 2
+    text_range.Runs().Item(1).Text = "x"     # Runs() / Item() / Text の設定で3往復
+    assert counter.calls == 5
+
+
+def _replace_calls(paragraphs, runs, change):
+    spec = make_random_spec(slides=1, shapes_per_slide=2, paragraphs_per_shape=paragraphs,
+                            runs_per_paragraph=runs)
+    ppt = PowerPointCOM.from_presentation(build_presentation(spec))
+    texts = ppt.extract_texts()[0]
+    ppt.com_calls.reset()
+    translations = ["X" + t for t in texts] if change else texts
+    ppt.replace_text_preserve_format(0, texts, translations)
+    return ppt.com_calls.calls
+
+
+def test_com_calls_scale_with_runs_not_paragraphs_times_runs():
+    base = _replace_calls(3, 3, change=False)
+    # 2図形 × 段落3 × run 3 = 18 run → 段落を倍にすると run も 18 増え、読み込みは run あたり2往復
+    assert _replace_calls(6, 3, change=False) - base == 2 * 18
+    assert _replace_calls(3, 6, change=False) - base == 2 * 18
+
+
+def test_com_writes_only_changed_runs():
+    unchanged = _replace_calls(3, 3, change=False)
+    changed = _replace_calls(3, 3, change=True)
+    # 書き込みは変更のある run ごとに1往復（18 run を超えない）
+    assert 0 < changed - unchanged <= 18
+
+
+def test_replace_reports_misses():
+    presentation = build_presentation([[[["売上"], ["利益"]], ("group", [[["顧客"]]])]])
+    ppt = PowerPointCOM.from_presentation(presentation)
+    count, misses = ppt.replace_text_preserve_format(
+        0, ["売上", "存在しない", "顧客"], ["Sales", "Missing", "Customers"])
+    assert count == 2
+    assert misses == [("存在しない", "not found in shape")]
+    assert ppt.extract_texts() == [["Sales", "利益", "Customers"]]
+
+
+def test_replace_deck_walks_requested_slides_only():
+    presentation = build_presentation([[[["一"]]], [[["二"]]], [[["三"]]]])
+    ppt = PowerPointCOM.from_presentation(presentation)
+    progress = []
+    results = ppt.replace_deck({0: (["一"], ["one"]), 2: (["三"], ["three"])},
+                               progress=lambda done, total: progress.append((done, total)))
+    assert results == {0: (1, []), 2: (1, [])}
+    assert progress == [(1, 2), (2, 2)]
+    assert ppt.extract_texts() == [["one"], ["二"], ["three"]]
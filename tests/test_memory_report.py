@@ -0,0 +1,42 @@
+# tests/test_memory_report.py
+import os
+
+import pytest
+
+import memory_report
+from memory_report import GIB, RESERVE_RATIO, estimate_workers
+
+MIB = 1024 ** 2
+
+
+def sample(unique, shared):
+    return {"pid": 1, "rss": unique + shared, "pss": unique + shared // 2, "unique": unique, "shared": shared}
+
+
+def test_shared_pages_count_once():
+    samples = [sample(600 * MIB, 2 * GIB), sample(500 * MIB, 2 * GIB + 10 * MIB)]
+    # 共有分は最大値を1回だけ、固有分は最大値をワーカーごとに数える
+    expected = (8 * GIB * (1 - RESERVE_RATIO) - (2 * GIB + 10 * MIB)) // (600 * MIB)
+    assert estimate_workers(samples, budget_bytes=8 * GIB) == int(expected) == 7
+
+
+def test_reserve_ratio():
+    samples = [sample(1 * GIB, 0)]
+    assert estimate_workers(samples, budget_bytes=10 * GIB, reserve_ratio=0.0) == 10
+    assert estimate_workers(samples, budget_bytes=10 * GIB, reserve_ratio=0.5) == 5
+
+
+def test_no_samples_and_nothing_fits():
+    assert estimate_workers([]) is None
+    assert estimate_workers([None, None]) is None
+    assert estimate_workers([sample(1 * GIB, 8 * GIB)], budget_bytes=8 * GIB) == 0
+    assert estimate_workers([sample(3 * GIB, 0)], budget_bytes=2 * GIB) == 0
+
+
+def test_process_memory_of_current_process():
+    info = memory_report.process_memory()
+    if info is None:
+        pytest.skip("/proc も psutil もありません")
+    assert info["pid"] == os.getpid()
+    assert info["rss"] > 0
+    assert info["unique"] + info["shared"] <= info["rss"] + MIB
@@ -0,0 +1,65 @@
+# tests/test_metrics.py
+import json
+import re
+
+import pytest
+
+import metrics
+
+# Prometheus テキスト形式の1行: 名前{ラベル} 値
+SAMPLE_LINE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[a-z_]+="[^"]*"\})? (-?[0-9.e+-]+)$')
+
+
+@pytest.fixture
+def recorded():
+    metrics.reset()
+    metrics.enable(trace=True)
+    with metrics.span("generate", batch=2):
+        pass
+    metrics.incr("tokens_out", 42)
+    metrics.incr("cache-hits")
+    metrics.observe("batch_size", 2)
+    yield
+    metrics.disable()
+    metrics.reset()
+
+
+def test_disabled_records_nothing():
+    metrics.reset()
+    with metrics.span("generate"):
+        pass
+    metrics.incr("tokens_out")
+    assert metrics.report()["timers"] == {}
+    assert metrics.report()["counters"] == {}
+
+
+def test_json_report(recorded, tmp_path):
+    data = json.loads(open(metrics.write_json(str(tmp_path / "run.json")), encoding="utf-8").read())
+    assert data["timers"]["generate"]["count"] == 1
+    assert data["counters"] == {"tokens_out": 42, "cache-hits": 1}
+    assert data["observations"]["batch_size"]["mean"] == 2
+
+
+def test_prometheus_text_parses(recorded, tmp_path):
+    path = metrics.write_prometheus(str(tmp_path / "run.prom"))
+    samples = {}
+    for line in open(path, encoding="utf-8").read().splitlines():
+        if line.startswith("#"):
+            continue
+        match = SAMPLE_LINE.match(line)
+        assert match, line
+        samples[match.group(1) + (match.group(2) or "")] = float(match.group(3))
+    assert samples['pptmaster_stage_calls_total{stage="generate"}'] == 1
+    assert 'pptmaster_stage_seconds_total{stage="generate"}' in samples
+    assert samples["pptmaster_tokens_out_total"] == 42
+    assert samples["pptmaster_cache_hits_total"] == 1
+    assert samples["pptmaster_batch_size_count"] == 1
+
+
+def test_chrome_trace_events(recorded, tmp_path):
+    data = json.loads(open(metrics.write_chrome_trace(str(tmp_path / "trace.json")), encoding="utf-8").read())
+    (event,) = data["traceEvents"]
+    assert event["name"] == "generate"
+    assert event["ph"] == "X"
+    assert event["args"] == {"batch": 2}
+    assert event["dur"] >= 0
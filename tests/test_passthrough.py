@@ -0,0 +1,65 @@
+# tests/test_passthrough.py
+import pytest
+
+from passthrough import PassThroughFilter
+
+
+@pytest.fixture
+def f(tmp_path):
+    # カレントの passthrough.txt を読まないよう、存在しない一覧を指定する
+    return PassThroughFilter("ja_XX", list_path=str(tmp_path / "none.txt"))
+
+
+@pytest.mark.parametrize("text", [
+    "12", "2024/04/01", "¥1,200", "https://example.com/a", "info@example.com",
+    "ABC-123", "p.3", "Page 3/20", "・・・", "Quarterly report", "   ",
+])
+def test_should_skip(f, text):
+    assert f.should_skip(text)
+
+
+@pytest.mark.parametrize("text", ["売上", "第3四半期の売上", "AIの活用"])
+def test_should_translate(f, text):
+    assert not f.should_skip(text)
+
+
+def test_registered_terms_are_skipped(tmp_path):
+    path = tmp_path / "list.txt"
+    path.write_text("# コメント\n製品X\nre:v\\d+\\.\\d+\n", encoding="utf-8")
+    f = PassThroughFilter("ja_XX", list_path=str(path))
+    assert f.should_skip("製品X")
+    assert f.should_skip("v1.2")
+    assert not f.should_skip("製品Xの紹介")
+
+
+def test_protect_and_restore(f):
+    masked, spans = f.protect("詳細は https://example.com/a を参照")
+    assert masked == "詳細は [1] を参照"
+    assert spans == ["https://example.com/a"]
+    assert f.restore("See [1] for details", spans) == "See https://example.com/a for details"
+
+
+def test_protect_model_number_next_to_japanese(f):
+    masked, spans = f.protect("型番ABC123の仕様")
+    assert spans == ["ABC123"]
+    assert masked == "型番[1]の仕様"
+
+
+def test_terms_only_match_whole_words(tmp_path):
+    f = PassThroughFilter("ja_XX", terms={"AI"}, list_path=str(tmp_path / "none.txt"))
+    assert f.protect("RAIDの設定") == ("RAIDの設定", [])
+    assert f.protect("AIの活用") == ("[1]の活用", ["AI"])
+
+
+def test_restore_rejects_lost_placeholder(f):
+    assert f.restore("See for details", ["https://example.com"]) is None
+    assert f.restore("[1] and [1]", ["a"]) is None
+
+
+def test_existing_brackets_are_not_masked(f):
+    assert f.protect("[1] https://example.com") == ("[1] https://example.com", [])
+
+
+def test_protect_disabled(tmp_path):
+    f = PassThroughFilter("ja_XX", list_path=str(tmp_path / "none.txt"), protect=False)
+    assert f.protect("https://example.com を参照") == ("https://example.com を参照", [])
@@ -0,0 +1,87 @@
+# tests/test_pipeline.py
+import os
+import threading
+
+import pytest
+from pptx import Presentation
+from pptx.util import Inches
+
+import xml_extract
+from pipeline import DeckPipeline
+from stub_translator import StubTranslator
+
+
+class CrashingStub(StubTranslator):
+    """crash_on を含む依頼を受けたらプロセスごと落ちる（推論ワーカーの異常終了の代わり）"""
+
+    def __init__(self, crash_on=None, delay_per_char=0.0):
+        super().__init__(delay_per_char)
+        self.crash_on = crash_on
+
+    def translate_batch(self, texts, max_batch_tokens=None, **kwargs):
+        if self.crash_on and self.crash_on in texts:
+            os._exit(3)
+        return super().translate_batch(texts, max_batch_tokens, **kwargs)
+
+
+def make_stub(cache=None, crash_on=None, delay_per_char=0.0):
+    """DeckPipeline の translator_factory（spawn で渡すのでトップレベルに置く）"""
+    return CrashingStub(crash_on, delay_per_char)
+
+
+def make_deck(path, paragraphs):
+    prs = Presentation()
+    for text in paragraphs:
+        slide = prs.slides.add_slide(prs.slide_layouts[6])
+        slide.shapes.add_textbox(Inches(1), Inches(1), Inches(4), Inches(1)).text_frame.text = text
+    prs.save(path)
+    return path
+
+
+def run_pipeline(pipeline, pairs, timeout=120):
+    """ハングしたら失敗にする（推論ワーカーが落ちても run は返ってくること）"""
+    out = {}
+    thread = threading.Thread(target=lambda: out.update(result=pipeline.run(pairs)), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "DeckPipeline.run が終わりません"
+    return out["result"]
+
+
+@pytest.fixture
+def decks(tmp_path):
+    pairs = []
+    for name, paragraphs in [("a", ["売上", "利益"]), ("b", ["顧客"]), ("crash", ["落ちる"])]:
+        in_path = make_deck(str(tmp_path / f"{name}.pptx"), paragraphs)
+        pairs.append((in_path, str(tmp_path / "out" / f"{name}.pptx")))
+    return pairs
+
+
+def test_deck_pipeline_translates_every_deck(decks):
+    pipeline = DeckPipeline(jobs=2, inference_workers=1, translator_factory=make_stub, chunk_texts=1)
+    results, failures = run_pipeline(pipeline, decks)
+    assert failures == []
+    assert len(results) == 3
+    assert len(pipeline.worker_pids) == 1
+    assert xml_extract.extract_slides_text(decks[0][1]) == [["[en] 上売"], ["[en] 益利"]]
+    assert xml_extract.extract_slides_text(decks[1][1]) == [["[en] 客顧"]]
+
+
+def test_crashed_worker_fails_only_its_deck(decks):
+    # 推論ワーカーが1つ落ちても、もう1つのワーカーが処理中・未処理のデッキは最後まで処理する（ハングしない）
+    pipeline = DeckPipeline(jobs=3, inference_workers=2,
+                            model_kwargs={"crash_on": "落ちる", "delay_per_char": 0.2},
+                            translator_factory=make_stub)
+    results, failures = run_pipeline(pipeline, decks)
+    assert failures == [decks[2][0]]
+    assert len(results) == 2
+    assert os.path.exists(decks[0][1]) and os.path.exists(decks[1][1])
+    assert not os.path.exists(decks[2][1])
+
+
+def test_all_workers_crashed_fails_remaining_decks(decks):
+    pipeline = DeckPipeline(jobs=1, inference_workers=1, model_kwargs={"crash_on": "落ちる"},
+                            translator_factory=make_stub)
+    results, failures = run_pipeline(pipeline, [decks[2], decks[0]])
+    assert sorted(failures) == sorted([decks[2][0], decks[0][0]])
+    assert results == []
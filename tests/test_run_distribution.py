@@ -0,0 +1,48 @@
+# tests/test_run_distribution.py
+from pptx import Presentation
+from pptx.util import Inches
+
+from model import PPTModel
+from run_distribution import distribute_translation
+
+
+def test_spaced_source_keeps_space_between_runs():
+    parts = distribute_translation(["売上 ", "前年比"], "Sales year over year")
+    assert "".join(parts) == "Sales year over year"
+    assert parts[0].endswith(" ")
+
+
+def test_spaced_source_every_run_boundary():
+    assert "".join(distribute_translation(["Hello ", "big ", "world"], "Bonjour le monde")) == "Bonjour le monde"
+
+
+def test_leading_space_stays_on_next_run():
+    parts = distribute_translation(["Hello", " world"], "Bonjour le monde")
+    assert "".join(parts) == "Bonjour le monde"
+    assert parts[1].startswith(" ")
+
+
+def test_unspaced_source_splits_at_word_boundary():
+    parts = distribute_translation(["重要な", "お知らせ"], "Important notice")
+    assert parts == ["Important ", "notice"]
+
+
+def test_run_count_and_empty_translation():
+    assert distribute_translation([], "x") == []
+    assert distribute_translation(["a", "b"], "") == ["", ""]
+    assert len(distribute_translation(["a ", "b ", "c"], "one")) == 3
+
+
+def test_update_slide_text_keeps_spaces(tmp_path):
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    paragraph = slide.shapes.add_textbox(Inches(1), Inches(1), Inches(4), Inches(1)).text_frame.paragraphs[0]
+    for text in ("売上 ", "前年比"):
+        paragraph.add_run().text = text
+    src = str(tmp_path / "deck.pptx")
+    prs.save(src)
+
+    ppt = PPTModel(src)
+    ppt.update_slide_text(0, ["Sales year over year"])
+    out = ppt.save(path=str(tmp_path / "out.pptx"), incremental=True)
+    assert PPTModel(out).extract_slides_text() == [["Sales year over year"]]
@@ -0,0 +1,48 @@
+# tests/test_segmenter.py
+import pytest
+
+from segmenter import join_sentences, reassemble, segment_text, sentence_spans, split_sentences
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("一文目。二文目！三文目？", ["一文目。", "二文目！", "三文目？"]),
+    ("First one. Second one! Third?", ["First one. ", "Second one! ", "Third?"]),
+    ("「はい。」と言った。次の文。", ["「はい。」と言った。", "次の文。"]),
+    ("Mr. Smith arrived. Pi is 3.14 now.", ["Mr. Smith arrived. ", "Pi is 3.14 now."]),
+    ("See example.com for e.g. details.", ["See example.com for e.g. details."]),
+    ("本当に！？そうです。", ["本当に！？", "そうです。"]),
+    ("区切りなし", ["区切りなし"]),
+])
+def test_split_sentences(text, expected):
+    assert split_sentences(text) == expected
+
+
+def test_spans_cover_text_without_gaps():
+    text = "A. B! 「C。」 D"
+    spans = sentence_spans(text)
+    assert spans[0][0] == 0 and spans[-1][1] == len(text)
+    assert all(a[1] == b[0] for a, b in zip(spans, spans[1:]))
+
+
+def test_segment_text_keeps_line_breaks():
+    assert segment_text("一文目。二文目！\n次の行\v改行") == [
+        (["一文目。", "二文目！"], "\n"), (["次の行"], "\v"), (["改行"], ""),
+    ]
+
+
+def test_long_sentence_is_split_at_clause_marks():
+    sentence = "、".join(["あ" * 30] * 10) + "。"
+    (pieces, _), = segment_text(sentence, max_chars=100)
+    assert all(len(p) <= 100 for p in pieces)
+    assert "".join(pieces) == sentence
+
+
+def test_join_sentences_by_language():
+    assert join_sentences(["First.", " Second! "], "en_XX") == "First. Second!"
+    assert join_sentences(["一文目。", "", "二文目。"], "ja_XX") == "一文目。二文目。"
+
+
+def test_reassemble_round_trip():
+    lines = segment_text("一文目。二文目。\n次の行")
+    translated = {"一文目。": "First.", "二文目。": "Second.", "次の行": "Next line"}
+    assert reassemble(lines, translated, "en_XX") == "First. Second.\nNext line"
@@ -0,0 +1,89 @@
+# tests/test_translation_cache.py
+from translation_cache import TranslationCache, make_key, model_fingerprint
+
+SETTINGS = {"num_beams": 4, "max_new_tokens": 128}
+
+
+def test_memory_hits_and_misses():
+    cache = TranslationCache(path=None)
+    cache.put_many([("a", "A"), ("b", "B")])
+    assert cache.get_many(["a", "b", "c"]) == {"a": "A", "b": "B"}
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_memory_lru_drops_least_recently_used():
+    cache = TranslationCache(path=None, max_memory_entries=2)
+    cache.put_many([("a", "A"), ("b", "B")])
+    cache.get_many(["a"])              # a を最近使ったことにする
+    cache.put_many([("c", "C")])
+    assert cache.get_many(["a", "b", "c"]) == {"a": "A", "c": "C"}
+
+
+def test_sqlite_hits_survive_reopen(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = TranslationCache(path=path)
+    cache.put_many([("a", "A")])
+    cache.close()
+
+    cache = TranslationCache(path=path)
+    assert cache.stats()["memory_entries"] == 0
+    assert cache.get_many(["a", "b"]) == {"a": "A"}
+    # SQLite から読んだものはメモリにも載る
+    assert cache.stats()["memory_entries"] == 1
+    cache.close()
+
+
+def test_sqlite_evicts_oldest_entries(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = TranslationCache(path=path, max_memory_entries=1, max_disk_entries=3)
+    for key in "abcde":
+        cache.put_many([(key, key.upper())])
+    assert cache._count_disk() == 3
+    assert cache.get_many(list("abcde")) == {"c": "C", "d": "D", "e": "E"}
+    cache.close()
+
+
+def test_sqlite_replacing_keys_does_not_evict(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = TranslationCache(path=path, max_memory_entries=1, max_disk_entries=2)
+    cache.put_many([("a", "A"), ("b", "B")])
+    for _ in range(3):
+        cache.put_many([("b", "B2")])
+    assert cache.get_many(["a", "b"]) == {"a": "A", "b": "B2"}
+    cache.close()
+
+
+def test_reopen_counts_existing_rows(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = TranslationCache(path=path)
+    cache.put_many([("a", "A"), ("b", "B")])
+    cache.close()
+
+    cache = TranslationCache(path=path, max_memory_entries=1, max_disk_entries=2)
+    cache.put_many([("c", "C")])
+    assert cache._count_disk() == 2
+    assert "a" not in cache.get_many(["a"])
+    cache.close()
+
+
+def test_key_separates_model_languages_and_settings():
+    base = make_key("model1", "ja_XX", "en_XX", SETTINGS, "売上")
+    assert base == make_key("model1", "ja_XX", "en_XX", dict(SETTINGS), "売上")
+    assert base != make_key("model2", "ja_XX", "en_XX", SETTINGS, "売上")
+    assert base != make_key("model1", "ja_XX", "zh_CN", SETTINGS, "売上")
+    assert base != make_key("model1", "en_XX", "en_XX", SETTINGS, "売上")
+    assert base != make_key("model1", "ja_XX", "en_XX", {**SETTINGS, "num_beams": 1}, "売上")
+    assert base != make_key("model1", "ja_XX", "en_XX", SETTINGS, "利益")
+
+
+def test_fingerprint_changes_with_model_files(tmp_path):
+    model_dir = tmp_path / "model"
+    model_dir.mkdir()
+    (model_dir / "openvino_model.xml").write_text("<net/>")
+    before = model_fingerprint(str(model_dir))
+    assert before == model_fingerprint(str(model_dir))
+
+    (model_dir / "openvino_model.bin").write_bytes(b"\0" * 8)
+    assert model_fingerprint(str(model_dir)) != before
+    assert model_fingerprint(str(tmp_path / "other")) != model_fingerprint(str(model_dir))
@@ -0,0 +1,55 @@
+# tests/test_translation_manifest.py
+from translation_manifest import TranslationManifest, count_known, manifest_path, source_hash
+
+
+def _manifest():
+    paragraphs = [[(2, "売上"), (3, "利益")], [(2, "顧客")]]
+    translations = [["Sales", "Profit"], ["Customers"]]
+    return TranslationManifest.from_paragraphs(paragraphs, translations, accepted={0: {0}, 1: {0}})
+
+
+def test_hash_ignores_surrounding_and_full_width_spaces():
+    assert source_hash(" 売上　計画 ") == source_hash("売上 計画")
+    assert source_hash("売上") != source_hash("利益")
+
+
+def test_match_unchanged_changed_and_new_paragraphs():
+    known = _manifest().match([[(2, "売上"), (3, "利益（改訂）"), (4, "新しい段落")], [(2, "顧客")]])
+    assert [e and e["translation"] for e in known[0]] == ["Sales", None, None]
+    assert known[1][0]["translation"] == "Customers"
+    assert count_known(known) == (2, 4)
+
+
+def test_match_moved_paragraph_by_hash():
+    # スライドの順番が入れ替わっても原文が同じなら引き継ぐ
+    known = _manifest().match([[(2, "顧客")], [(2, "売上"), (3, "利益")]])
+    assert known[0][0]["translation"] == "Customers"
+    assert [e["translation"] for e in known[1]] == ["Sales", "Profit"]
+
+
+def test_match_prefers_exact_position_then_accepted():
+    manifest = TranslationManifest([
+        {"slide": 0, "shape": 2, "paragraph": 0, "hash": source_hash("はい"), "translation": "Yes",
+         "accepted": False},
+        {"slide": 1, "shape": 5, "paragraph": 0, "hash": source_hash("はい"), "translation": "Yes!",
+         "accepted": True},
+    ])
+    known = manifest.match([[(2, "はい")], [(9, "はい")]])
+    assert known[0][0]["translation"] == "Yes"   # 同じスライド・図形
+    assert known[1][0]["translation"] == "Yes!"  # 位置が違えば採用済みを優先
+
+
+def test_accepted_flags_and_save_round_trip(tmp_path):
+    manifest = _manifest()
+    assert [e["accepted"] for e in manifest.entries] == [True, False, True]
+    path = manifest_path(str(tmp_path / "out.pptx"))
+    manifest.save(path)
+    loaded = TranslationManifest.load(path)
+    assert loaded.entries == manifest.entries
+
+
+def test_load_missing_or_broken(tmp_path):
+    assert TranslationManifest.load(str(tmp_path / "none.json")) is None
+    broken = tmp_path / "broken.json"
+    broken.write_text("{", encoding="utf-8")
+    assert TranslationManifest.load(str(broken)) is None
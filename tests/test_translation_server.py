@@ -0,0 +1,123 @@
+# tests/test_translation_server.py
+import asyncio
+import threading
+
+import pytest
+
+from stub_translator import StubTranslator
+from translation_server import ServerError, TranslationClient, TranslationServer
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def _server(translator, **kwargs):
+    return await TranslationServer(translator, port=0, **kwargs).start()
+
+
+def test_concurrent_requests_share_one_batch():
+    async def main():
+        translator = StubTranslator()
+        server = await _server(translator, batch_window=0.05)
+        try:
+            results = await asyncio.gather(server.translate(["こんにちは"]), server.translate(["さようなら", "はい"]))
+        finally:
+            await server.close()
+        return translator, server, results
+
+    translator, server, results = run(main())
+    assert results == [["[en] はちにんこ"], ["[en] らなうよさ", "[en] いは"]]
+    assert translator.calls == 1
+    assert server.stats["batches"] == 1 and server.stats["texts"] == 3
+
+
+def test_full_queue_is_rejected_as_busy():
+    async def main():
+        server = await _server(StubTranslator(delay_per_char=0.05), batch_window=0, max_pending=1)
+        try:
+            first = asyncio.ensure_future(server.translate(["あ" * 4]))
+            await asyncio.sleep(0.05)  # 1件目が推論中になるのを待つ
+            second = asyncio.ensure_future(server.translate(["い"]))
+            await asyncio.sleep(0)
+            with pytest.raises(ServerError) as busy:
+                await server.translate(["う"])
+            await asyncio.gather(first, second)
+        finally:
+            await server.close()
+        return server, busy.value
+
+    server, error = run(main())
+    assert error.code == "busy"
+    assert server.stats["rejected"] == 1
+
+
+def test_expired_request_is_not_translated():
+    async def main():
+        translator = StubTranslator(delay_per_char=0.1)
+        server = await _server(translator, batch_window=0)
+        try:
+            slow = asyncio.ensure_future(server.translate(["あ" * 3]))
+            await asyncio.sleep(0.05)
+            with pytest.raises(ServerError) as expired:
+                await server.translate(["い"], deadline_ms=50)
+            await slow
+            await asyncio.sleep(0.05)
+        finally:
+            await server.close()
+        return translator, expired.value
+
+    translator, error = run(main())
+    assert error.code == "deadline"
+    assert translator.calls == 1  # 期限切れの要求はモデルに渡さない
+
+
+def test_oversize_request_stops_at_deadline():
+    async def main():
+        translator = StubTranslator(delay_per_char=0.01)
+        server = await _server(translator, batch_window=0, max_batch_chars=10)
+        try:
+            with pytest.raises(ServerError) as expired:
+                # 10文字ずつ10回に分かれる。1回 0.1 秒なので期限内に終わるのは数回だけ
+                await server.translate(["あ" * 10] * 10, deadline_ms=250)
+            await asyncio.sleep(0.2)
+        finally:
+            await server.close()
+        return translator, expired.value
+
+    translator, error = run(main())
+    assert error.code == "deadline"
+    # 期限後の回はモデルに渡さない（推論スレッドを使い続けない）
+    assert translator.calls <= 4
+
+
+def test_oversize_request_is_split_into_chunks():
+    async def main():
+        translator = StubTranslator()
+        server = await _server(translator, batch_window=0, max_batch_chars=10)
+        try:
+            result = await server.translate(["あいう", "えおか", "きくけこさ", "し"])
+        finally:
+            await server.close()
+        return translator, result
+
+    translator, result = run(main())
+    assert result == ["[en] ういあ", "[en] かおえ", "[en] さこけくき", "[en] し"]
+    assert translator.calls == 2
+
+
+def test_client_round_trip():
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(_server(StubTranslator()))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    client = TranslationClient(server.address, timeout=5)
+    try:
+        assert client.translate_text("はい") == "[en] いは"
+        assert client.translate_batch([]) == []
+        assert client.stats()["requests"] == 1
+    finally:
+        client.close()
+        asyncio.run_coroutine_threadsafe(server.close(), loop).result(5)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
@@ -0,0 +1,181 @@
+# tests/test_translator_model.py
+import os
+
+from pptx import Presentation
+from pptx.util import Inches
+
+import pipeline
+import xml_extract
+from translator_model import TranslatorModel, pack_batches
+
+LANG_IDS = {"en_XX": 1, "ja_XX": 2, "zh_CN": 3}
+LANG_CODES = {i: lang for lang, i in LANG_IDS.items()}
+
+
+class FakeTokenizer:
+    """1文字 = 1トークン。デコードは大文字にして返す（訳文の代わり。英語以外は "zh_CN:" などを付ける）"""
+    lang_code_to_id = LANG_IDS
+    pad_token_id = 0
+
+    def __call__(self, texts, return_tensors=None, padding=False, truncation=False, max_length=None):
+        ids = [[ord(c) for c in t][:max_length] for t in texts]
+        if not return_tensors:
+            return {"input_ids": ids}
+        longest = max(len(row) for row in ids)
+        return {"input_ids": [row + [0] * (longest - len(row)) for row in ids],
+                "attention_mask": [[1] * len(row) + [0] * (longest - len(row)) for row in ids]}
+
+    def batch_decode(self, outputs, skip_special_tokens=True):
+        decoded = []
+        for row in outputs:
+            text = "".join(chr(c) for c in row[1:] if c).upper()
+            lang = LANG_CODES.get(row[0], "en_XX")
+            decoded.append(text if lang == "en_XX" else f"{lang}:{text}")
+        return decoded
+
+
+class FakeModel:
+    def __init__(self):
+        self.batches = []    # generate に渡されたバッチ（デコード後の原文）
+        self.langs = []      # generate ごとの出力言語
+        self.encoder_calls = 0
+
+    def get_encoder(self):
+        def encode(input_ids=None, attention_mask=None):
+            self.encoder_calls += 1
+            return {"last_hidden_state": input_ids}
+        return encode
+
+    def generate(self, input_ids=None, attention_mask=None, forced_bos_token_id=None,
+                 encoder_outputs=None, **kwargs):
+        if encoder_outputs is None:
+            self.encoder_calls += 1
+        else:
+            input_ids = encoder_outputs["last_hidden_state"]
+        self.batches.append(["".join(chr(c) for c in row if c) for row in input_ids])
+        self.langs.append(LANG_CODES[forced_bos_token_id])
+        # 出力言語が分かるよう、先頭に言語 ID の文字（"\x01" など）を付ける
+        return [[forced_bos_token_id] + list(row) for row in input_ids]
+
+
+def make_translator(segment=False, passthrough=None):
+    """OpenVINO / transformers を読まずに TranslatorModel を組み立てる"""
+    tm = TranslatorModel.__new__(TranslatorModel)
+    tm.tokenizer = FakeTokenizer()
+    tm.model = FakeModel()
+    tm.models = [tm.model]
+    tm.src_lang = "ja_XX"
+    tm.tgt_lang = "en_XX"
+    tm.forced_bos_token_id = LANG_IDS["en_XX"]
+    tm.segment = segment
+    tm.passthrough = passthrough
+    tm.profile = "fast"
+    tm.last_stats = None
+    tm.cache = None
+    tm.fingerprint = None
+    return tm
+
+
+# ---------------------------
+# pack_batches
+# ---------------------------
+def test_pack_batches_groups_similar_lengths():
+    lengths = [30, 2, 31, 3, 29, 1]
+    batches = pack_batches(lengths, max_batch_tokens=64)
+    assert batches == [[5, 1, 3], [4, 0], [2]]
+    # 短いものと長いものは同じバッチに入らない
+    for batch in batches:
+        assert max(lengths[i] for i in batch) - min(lengths[i] for i in batch) <= 2
+
+
+def test_pack_batches_keeps_padded_size_within_budget():
+    lengths = [5, 17, 9, 12, 3, 20, 8, 8, 14]
+    batches = pack_batches(lengths, max_batch_tokens=40)
+    assert sorted(i for batch in batches for i in batch) == list(range(len(lengths)))
+    for batch in batches:
+        assert max(lengths[i] for i in batch) * len(batch) <= 40
+
+
+def test_pack_batches_oversized_item_gets_its_own_batch():
+    assert pack_batches([100, 1, 1], max_batch_tokens=10) == [[1, 2], [0]]
+    assert pack_batches([]) == []
+
+
+# ---------------------------
+# translate_batch
+# ---------------------------
+def test_translate_batch_restores_input_order():
+    tm = make_translator()
+    texts = ["long sentence here", "a", "medium one", "bb"]
+    assert tm.translate_batch(texts, max_batch_tokens=24) == [
+        "LONG SENTENCE HERE", "A", "MEDIUM ONE", "BB"]
+    # 長さ順に詰められ、どのバッチもパディング後のトークン数が上限以内
+    assert tm.model.batches[0] == ["a", "bb"]
+    for batch in tm.model.batches:
+        assert max(map(len, batch)) * len(batch) <= 24
+
+
+def test_translate_batch_skips_empty_and_whitespace():
+    tm = make_translator()
+    assert tm.translate_batch(["", "  ", "x", "\n", None]) == ["", "", "X", "", ""]
+    assert tm.model.batches == [["x"]]
+    assert tm.translate_batch(["", " "]) == ["", ""]
+    assert tm.model.batches == [["x"]]
+
+
+def test_translate_batch_translates_duplicates_once():
+    tm = make_translator()
+    assert tm.translate_batch(["売上", "利益", "売上"]) == ["売上", "利益", "売上"]
+    assert sorted(t for batch in tm.model.batches for t in batch) == ["利益", "売上"]
+    assert tm.last_stats["generated"] == 2
+
+
+# ---------------------------
+# translate_multi（1回のエンコードから複数言語）
+# ---------------------------
+def test_translate_multi_encodes_each_batch_once():
+    tm = make_translator()
+    texts = ["Sales", "Profit", "", "a much longer paragraph of text"]
+    results = tm.translate_multi(texts, ["en_XX", "zh_CN"], max_batch_tokens=16)
+    assert results["en_XX"] == ["SALES", "PROFIT", "", "A MUCH LONGER PARAGRAPH OF TEXT"]
+    assert results["zh_CN"] == ["zh_CN:SALES", "zh_CN:PROFIT", "", "zh_CN:A MUCH LONGER PARAGRAPH OF TEXT"]
+    batches = len(tm.model.batches) // 2
+    assert batches == 2
+    # エンコーダはバッチごとに1回（get_encoder 経由）、デコードは言語ごとに1回
+    assert tm.model.encoder_calls == batches
+    assert sorted(tm.model.langs) == ["en_XX"] * batches + ["zh_CN"] * batches
+    assert tm.last_stats["generated"] == 6
+
+
+def test_translate_multi_single_language_uses_plain_generate():
+    tm = make_translator()
+    assert tm.translate_multi(["Sales"], ["zh_CN", "zh_CN"]) == {"zh_CN": ["zh_CN:SALES"]}
+    assert tm.model.encoder_calls == 1
+    assert tm.model.langs == ["zh_CN"]
+
+
+def test_lang_output_path():
+    assert pipeline.lang_output_path(os.path.join("out", "deck.pptx"), "zh_CN") == \
+        os.path.join("out", "deck_zh_CN.pptx")
+
+
+def test_run_translate_writes_one_deck_per_language(tmp_path):
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    box = slide.shapes.add_textbox(Inches(1), Inches(1), Inches(4), Inches(1))
+    box.text_frame.text = "Sales"
+    box.text_frame.add_paragraph().text = "Profit"
+    in_path = str(tmp_path / "deck.pptx")
+    prs.save(in_path)
+
+    tm = make_translator()
+    out_path = str(tmp_path / "out" / "deck.pptx")
+    results, failures = pipeline.run_translate([(in_path, out_path)], tm, tgt_langs=["en_XX", "zh_CN"])
+    assert failures == []
+    assert len(results) == 2
+    assert not os.path.exists(out_path)
+    assert xml_extract.extract_slides_text(pipeline.lang_output_path(out_path, "en_XX")) == [["SALES", "PROFIT"]]
+    # 図形単位で1回翻訳される（フェイクの言語の印は先頭の段落にだけ付く）
+    assert xml_extract.extract_slides_text(pipeline.lang_output_path(out_path, "zh_CN")) == \
+        [["zh_CN:SALES", "PROFIT"]]
+    assert tm.model.encoder_calls == 1
@@ -0,0 +1,70 @@
+# tests/test_xml_extract.py
+import pytest
+from pptx import Presentation
+from pptx.util import Inches
+
+import xml_extract
+from model import PPTModel
+
+
+@pytest.fixture
+def deck(tmp_path):
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    box = slide.shapes.add_textbox(Inches(1), Inches(1), Inches(4), Inches(1))
+    box.text_frame.text = "見出し"
+    box.text_frame.add_paragraph().text = "本文"
+    group = slide.shapes.add_group_shape()
+    group.shapes.add_textbox(0, 0, 100, 100).text_frame.text = "グループ内"
+    inner = group.shapes.add_group_shape()
+    inner.shapes.add_textbox(0, 0, 100, 100).text_frame.text = "入れ子"
+    table = slide.shapes.add_table(2, 2, Inches(1), Inches(3), Inches(4), Inches(1)).table
+    table.cell(0, 0).text = "表A"
+    table.cell(1, 1).text = "表D"
+    slide.notes_slide.notes_text_frame.text = "ノート"
+    prs.slides.add_slide(prs.slide_layouts[6])  # テキストのないスライド
+    path = str(tmp_path / "deck.pptx")
+    prs.save(path)
+    return path
+
+
+def test_records_cover_groups_tables_and_notes(deck):
+    records = list(xml_extract.iter_text_records(deck))
+    slide = [r for r in records if r.part == "slide"]
+    assert [r.text for r in slide] == ["見出し", "本文", "グループ内", "入れ子", "表A", "表D"]
+    assert [r.paragraph for r in slide[:2]] == [0, 1]
+    table_id = slide[4].shape_id.split(":")[0]
+    assert [r.shape_id for r in slide[4:]] == [f"{table_id}:r0c0", f"{table_id}:r1c1"]
+    assert [(r.slide, r.text) for r in records if r.part == "notes"] == [(0, "ノート")]
+
+
+def test_shape_ids_are_ints_like_pptx_writer(deck):
+    records = list(xml_extract.iter_text_records(deck, include_notes=False))
+    assert all(isinstance(r.shape_id, int) for r in records[:4])
+
+
+def test_extract_slides_text_by_paragraph(deck):
+    assert xml_extract.extract_slides_text(deck) == [["見出し", "本文", "グループ内", "入れ子", "表A", "表D"], []]
+    assert xml_extract.extract_slides_text(deck, include_notes=True)[0][-1] == "ノート"
+
+
+def test_run_offsets(tmp_path):
+    prs = Presentation()
+    paragraph = prs.slides.add_slide(prs.slide_layouts[6]).shapes.add_textbox(0, 0, 100, 100) \
+        .text_frame.paragraphs[0]
+    for text in ("重要な", "お知らせ"):
+        paragraph.add_run().text = text
+    path = str(tmp_path / "runs.pptx")
+    prs.save(path)
+    record, = xml_extract.iter_text_records(path)
+    assert record.run_offsets == ((0, 3), (3, 7))
+
+
+def test_streaming_matches_python_pptx(deck):
+    ppt = PPTModel(deck)
+    streamed = ppt.extract_slides_text(with_ids=True)
+    assert ppt._presentation is None  # 抽出だけでは python-pptx を読み込まない
+    ppt.presentation
+    assert ppt.extract_slides_text(with_ids=True) == streamed
+    assert streamed[0][0][1] == "見出し\n本文"
+    assert [text for _, text in streamed[0][-4:]] == ["表A", "", "", "表D"]
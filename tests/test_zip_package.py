@@ -0,0 +1,68 @@
+# tests/test_zip_package.py
+import os
+import zipfile
+
+import pytest
+
+from zip_package import write_package
+
+
+@pytest.fixture
+def package(tmp_path):
+    path = str(tmp_path / "deck.pptx")
+    with zipfile.ZipFile(path, "w") as z:
+        z.writestr("[Content_Types].xml", "<Types/>", compress_type=zipfile.ZIP_DEFLATED)
+        z.writestr("ppt/slides/slide1.xml", "<old/>", compress_type=zipfile.ZIP_DEFLATED)
+        z.writestr("ppt/media/image1.png", os.urandom(4096), compress_type=zipfile.ZIP_STORED)
+    return path
+
+
+def _read(path):
+    with zipfile.ZipFile(path) as z:
+        assert z.testzip() is None
+        return {info.filename: (z.read(info), info.compress_type) for info in z.infolist()}
+
+
+def test_replaces_only_given_parts(package, tmp_path):
+    before = _read(package)
+    out = write_package(package, str(tmp_path / "out.pptx"), {"/ppt/slides/slide1.xml": b"<new/>"})
+    after = _read(out)
+    assert list(after) == list(before)  # メンバーの順番も変えない
+    assert after["ppt/slides/slide1.xml"][0] == b"<new/>"
+    # 置き換えないメンバーは圧縮方式ごとそのまま
+    assert after["ppt/media/image1.png"] == before["ppt/media/image1.png"]
+    assert after["[Content_Types].xml"] == before["[Content_Types].xml"]
+
+
+def test_overwrite_source_in_place(package):
+    image = _read(package)["ppt/media/image1.png"]
+    write_package(package, package, {"ppt/slides/slide1.xml": b"<new/>"})
+    after = _read(package)
+    assert after["ppt/slides/slide1.xml"][0] == b"<new/>"
+    assert after["ppt/media/image1.png"] == image
+    assert [name for name in os.listdir(os.path.dirname(package)) if name.endswith(".tmp")] == []
+
+
+def test_new_parts_are_appended(package, tmp_path):
+    out = write_package(package, str(tmp_path / "out.pptx"), {"ppt/slides/slide2.xml": b"<added/>"})
+    after = _read(out)
+    assert list(after)[-1] == "ppt/slides/slide2.xml"
+    assert after["[Content_Types].xml"][0] == b"<Types/>"  # 自動では書き換えない
+
+
+def test_without_replacements_copies(package, tmp_path):
+    out = write_package(package, str(tmp_path / "copy.pptx"), {})
+    with open(out, "rb") as a, open(package, "rb") as b:
+        assert a.read() == b.read()
+    assert write_package(package, package, {}) == package
+
+
+def test_failed_write_leaves_destination(package, tmp_path):
+    broken = str(tmp_path / "broken.pptx")
+    with open(broken, "wb") as f:
+        f.write(b"not a zip")
+    dst = str(tmp_path / "out.pptx")
+    with pytest.raises(zipfile.BadZipFile):
+        write_package(broken, dst, {"a.xml": b""})
+    assert not os.path.exists(dst)
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
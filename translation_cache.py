@@ -0,0 +1,156 @@
+# translation_cache.py
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = "translation_cache.sqlite3"
+
+
+def model_fingerprint(model_dir: str) -> str:
+    """モデルディレクトリ内のファイル名・サイズ・更新時刻からフィンガープリントを作る"""
+    h = hashlib.sha256()
+    h.update(os.path.abspath(model_dir).encode("utf-8"))
+    if os.path.isdir(model_dir):
+        for root, dirs, files in os.walk(model_dir):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                rel = os.path.relpath(path, model_dir)
+                h.update(f"{rel}:{st.st_size}:{int(st.st_mtime)}".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def make_key(fingerprint, src_lang, tgt_lang, settings, text) -> str:
+    """(モデル, 言語ペア, 生成設定, 正規化済みテキスト) からキャッシュキーを作る"""
+    payload = json.dumps([fingerprint, src_lang, tgt_lang, settings, text],
+                         ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ---------------------------
+# 翻訳メモリ (メモリ内 LRU + SQLite)
+# ---------------------------
+class TranslationCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_memory_entries=10000, max_disk_entries=500000):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disk_entries = 0  # SQLite の行数の上限見積もり（置き換えも1件と数える）
+        if path:
+            self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                " key TEXT PRIMARY KEY, translation TEXT NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations(last_used)"
+            )
+            self._conn.commit()
+            self._disk_entries = self._count_disk()
+
+    def get_many(self, keys):
+        """キーごとの翻訳を辞書で返す（見つからないキーは含まない）"""
+        found = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                else:
+                    missing.append(key)
+
+            if missing and self._conn is not None:
+                now = time.time()
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    marks = ",".join("?" * len(chunk))
+                    rows = self._conn.execute(
+                        f"SELECT key, translation FROM translations WHERE key IN ({marks})", chunk
+                    ).fetchall()
+                    for key, translation in rows:
+                        found[key] = translation
+                        self._remember(key, translation)
+                    if rows:
+                        self._conn.executemany(
+                            "UPDATE translations SET last_used = ? WHERE key = ?",
+                            [(now, key) for key, _ in rows]
+                        )
+                self._conn.commit()
+
+            hit_count = sum(1 for key in keys if key in found)
+            self.hits += hit_count
+            self.misses += len(keys) - hit_count
+        return found
+
+    def put_many(self, items):
+        """(key, translation) の組をまとめて保存する"""
+        items = list(items)
+        if not items:
+            return
+        with self._lock:
+            for key, translation in items:
+                self._remember(key, translation)
+            if self._conn is not None:
+                now = time.time()
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO translations (key, translation, last_used) VALUES (?, ?, ?)",
+                    [(key, translation, now) for key, translation in items]
+                )
+                self._disk_entries += len(items)
+                if self._disk_entries > self.max_disk_entries:
+                    self._evict_disk()
+                self._conn.commit()
+
+    def _remember(self, key, translation):
+        self._memory[key] = translation
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _count_disk(self):
+        return self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    def _evict_disk(self):
+        """
+        見積もりが上限を超えたときだけ実際の行数を数え、古いものから消す
+        （置き換えや他プロセスの書き込みで見積もりがずれても、ここで実数に戻る）
+        """
+        count = self._count_disk()
+        overflow = count - self.max_disk_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM translations WHERE key IN ("
+                " SELECT key FROM translations ORDER BY last_used ASC LIMIT ?)",
+                (overflow,)
+            )
+            count -= overflow
+        self._disk_entries = count
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,110 @@
+# translation_manifest.py
+"""
+出力デッキの横に置く翻訳マニフェスト（<出力>.pptx.pptmaster.json）
+
+段落ごとに スライド番号・図形 ID・原文のハッシュ・訳文・採用済みか を記録しておき、
+改訂版のデッキを開いたときに突き合わせて、新しい・変わった段落だけを翻訳する
+採用済み（チェックして置換した）訳文は自動で置換し直す
+
+    manifest = TranslationManifest.load(manifest_path(out_path))
+    known = manifest.match(paragraphs)   # paragraphs: スライドごとの [(shape_id, text), ...]
+    known[slide][i]                      # 一致したエントリ（dict）または None
+"""
+import hashlib
+import json
+import os
+
+MANIFEST_SUFFIX = ".pptmaster.json"
+MANIFEST_VERSION = 1
+
+
+def manifest_path(deck_path):
+    return deck_path + MANIFEST_SUFFIX
+
+
+def source_hash(text):
+    """原文のハッシュ（前後の空白・全角スペースの違いは無視する）"""
+    normalized = text.replace("　", " ").strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:20]
+
+
+class TranslationManifest:
+    def __init__(self, entries=None, source=None):
+        # entry: {"slide", "shape", "paragraph", "hash", "translation", "accepted"}
+        self.entries = entries or []
+        self.source = source
+
+    @classmethod
+    def load(cls, path):
+        """マニフェストを読む。無い・壊れている・版が違う場合は None"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            print(f"⚠️ マニフェストを読めませんでした: {path}")
+            return None
+        if data.get("version") != MANIFEST_VERSION:
+            return None
+        return cls(data.get("entries", []), data.get("source"))
+
+    def save(self, path):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "source": self.source, "entries": self.entries},
+                      f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def from_paragraphs(cls, paragraphs, translations, accepted=None, source=None):
+        """
+        paragraphs: スライドごとの [(shape_id, text), ...]
+        translations: スライドごとの訳文リスト（未翻訳のスライド・段落は None）
+        accepted: スライドごとの採用済み段落番号の集合（None なら訳文のあるものをすべて採用済みとする）
+        """
+        entries = []
+        for slide_idx, items in enumerate(paragraphs):
+            texts = translations[slide_idx] if slide_idx < len(translations) else None
+            if not texts:
+                continue
+            chosen = None if accepted is None else accepted.get(slide_idx, set())
+            for i, (shape_id, text) in enumerate(items):
+                translation = texts[i] if i < len(texts) else None
+                if translation is None or not text.strip():
+                    continue
+                entries.append({
+                    "slide": slide_idx, "shape": shape_id, "paragraph": i, "hash": source_hash(text),
+                    "translation": translation, "accepted": chosen is None or i in chosen,
+                })
+        return cls(entries, source)
+
+    def match(self, paragraphs):
+        """
+        新しいデッキの段落と突き合わせる。スライドごとに、一致したエントリまたは None のリストを返す
+        同じスライド・同じ図形・同じ原文 を優先し、無ければ原文が同じエントリ（移動したスライドなど）を使う
+        """
+        exact = {}
+        by_hash = {}
+        for entry in self.entries:
+            exact.setdefault((entry["slide"], entry["shape"], entry["hash"]), entry)
+            # 採用済みのものを優先して残す
+            current = by_hash.get(entry["hash"])
+            if current is None or (entry["accepted"] and not current["accepted"]):
+                by_hash[entry["hash"]] = entry
+
+        known = []
+        for slide_idx, items in enumerate(paragraphs):
+            row = []
+            for shape_id, text in items:
+                h = source_hash(text)
+                row.append(exact.get((slide_idx, shape_id, h)) or by_hash.get(h))
+            known.append(row)
+        return known
+
+
+def count_known(known):
+    """(一致した段落数, 全段落数)"""
+    total = sum(len(row) for row in known)
+    return sum(1 for row in known for entry in row if entry is not None), total
@@ -0,0 +1,366 @@
+# translation_server.py
+"""
+ローカル翻訳サーバ（1つの TranslatorModel を複数の GUI / スクリプトで共有する）
+
+    python -m pptmaster serve                          # 127.0.0.1:8765
+    python -m pptmaster serve --socket /tmp/pptmaster.sock
+    python -m pptmaster serve --stub                   # モデルなし（stub_translator.StubTranslator）で動作確認
+
+    client = TranslationClient("127.0.0.1:8765")       # または "unix:/tmp/pptmaster.sock"
+    client.translate_text("こんにちは")                  # TranslatorModel と同じ呼び出し方
+
+GUI は環境変数 PPT_MASTER_SERVER、CLI は --server でサーバを使う
+
+プロトコル: 1行1 JSON（改行区切り）
+    → {"id": 1, "texts": ["..."], "deadline_ms": 30000, "profile": "fast"}
+    ← {"id": 1, "translations": ["..."]}  /  {"id": 1, "error": "...", "code": "busy"}
+
+- 動的バッチ: batch_window 秒の間、または max_batch_chars に達するまで届いた要求をまとめ、
+  translate_batch を1回だけ呼ぶ
+- バックプレッシャー: 待ち行列が max_pending 件を超えたら code="busy" で即座に断る
+- 期限: 要求ごとの deadline_ms を過ぎたものはバッチに入れず code="deadline" で返す
+  max_batch_chars を超えるバッチは分けて translate_batch に渡し、分けた各回の前にも期限を確かめる
+  （大きな要求が期限後も推論スレッドを使い続けないように）
+"""
+import asyncio
+import itertools
+import json
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SERVER_ENV = "PPT_MASTER_SERVER"
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_DEADLINE_MS = 60000
+# 1行（1要求）の上限。StreamReader の既定 64KiB ではデッキ全体を送れない
+MAX_LINE_BYTES = 64 * 1024 * 1024
+
+_LOCAL_HOSTS = {"127.0.0.1", "localhost", "::1"}
+
+
+class ServerError(RuntimeError):
+    """サーバが返したエラー（code: busy / deadline / error）"""
+
+    def __init__(self, message, code="error"):
+        super().__init__(message)
+        self.code = code
+
+
+def parse_address(address):
+    """"host:port" / ":port" / "unix:/path" を ("tcp", host, port) / ("unix", path, None) にする"""
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):], None
+    host, _, port = address.rpartition(":")
+    return "tcp", host or DEFAULT_HOST, int(port or DEFAULT_PORT)
+
+
+class _Pending:
+    __slots__ = ("texts", "future", "deadline", "profile", "chars")
+
+    def __init__(self, texts, future, deadline, profile=None):
+        self.texts = texts
+        self.future = future
+        self.deadline = deadline
+        self.profile = profile
+        self.chars = sum(len(t) for t in texts)
+
+
+# ---------------------------
+# サーバ
+# ---------------------------
+class TranslationServer:
+    def __init__(self, translator, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None,
+                 batch_window=0.01, max_batch_chars=20000, max_pending=256):
+        """
+        translator: translate_batch(texts) を持つもの（TranslatorModel / stub_translator.StubTranslator）
+        path を指定すると Unix ソケットで待ち受ける（host / port は使わない）
+        """
+        if path is None and host not in _LOCAL_HOSTS:
+            raise ValueError(f"ローカルホスト以外では待ち受けません: {host}")
+        self.translator = translator
+        self.host = host
+        self.port = port
+        self.path = path
+        self.batch_window = batch_window
+        self.max_batch_chars = max_batch_chars
+        self.max_pending = max_pending
+        self.stats = {"requests": 0, "batches": 0, "texts": 0, "rejected": 0, "expired": 0}
+
+        self._queue = None
+        self._server = None
+        self._batcher = None
+        # モデル（トークナイザ）は同時に呼ばないので推論スレッドは1本
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="translate")
+
+    @property
+    def address(self):
+        if self.path:
+            return f"unix:{self.path}"
+        return f"{self.host}:{self.port}"
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        if self.path:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self._server = await asyncio.start_unix_server(self._handle, path=self.path, limit=MAX_LINE_BYTES)
+        else:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=MAX_LINE_BYTES)
+            # port=0 のときは OS が割り当てたポートを使う
+            self.port = self._server.sockets[0].getsockname()[1]
+        self._batcher = asyncio.create_task(self._batch_loop())
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        print(f"🛰 翻訳サーバ待ち受け中: {self.address}")
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._batcher is not None:
+            self._batcher.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._executor.shutdown(wait=False)
+        if self.path and os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def translate(self, texts, deadline_ms=DEFAULT_DEADLINE_MS, profile=None):
+        """texts を他の要求とまとめて翻訳する（asyncio から直接呼べる API）"""
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + deadline_ms / 1000
+        pending = _Pending(list(texts), loop.create_future(), deadline, profile)
+        try:
+            self._queue.put_nowait(pending)
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            raise ServerError("サーバが混雑しています", "busy")
+        self.stats["requests"] += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(pending.future), max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            pending.future.cancel()  # バッチ待ちなら翻訳しない
+            raise ServerError("期限までに翻訳できませんでした", "deadline")
+
+    async def _collect(self):
+        """最初の要求から batch_window 秒、または max_batch_chars に達するまで要求を集める"""
+        first = await self._queue.get()
+        batch = [first]
+        chars = first.chars
+        window_end = time.monotonic() + self.batch_window
+        while chars < self.max_batch_chars:
+            timeout = window_end - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            chars += item.chars
+        return batch
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            live = [item for item in batch if self._alive(item)]
+            if not live:
+                continue
+
+            # デコード設定（profile）ごとに1回ずつ translate_batch を呼ぶ
+            groups = {}
+            for item in live:
+                groups.setdefault(item.profile, []).append(item)
+            for profile, items in groups.items():
+                await self._run_batch(loop, items, profile)
+
+    def _alive(self, item):
+        """まだ翻訳すべき要求か（取り消し済み・期限切れなら False。期限切れはここで応答する）"""
+        if item.future.done():
+            return False
+        if item.deadline <= time.monotonic():
+            self.stats["expired"] += 1
+            item.future.set_exception(ServerError("期限切れのため翻訳しませんでした", "deadline"))
+            return False
+        return True
+
+    def _chunks(self, entries):
+        """(要求の番号, テキスト) の列を max_batch_chars ごとに分ける（1件で超えるものは単独）"""
+        chunk = []
+        chars = 0
+        for entry in entries:
+            if chunk and chars + len(entry[1]) > self.max_batch_chars:
+                yield chunk
+                chunk = []
+                chars = 0
+            chunk.append(entry)
+            chars += len(entry[1])
+        if chunk:
+            yield chunk
+
+    async def _run_batch(self, loop, items, profile):
+        kwargs = {"profile": profile} if profile else {}
+        outputs = [[] for _ in items]
+        entries = [(k, t) for k, item in enumerate(items) for t in item.texts]
+        for chunk in self._chunks(entries):
+            # 前の回の間に期限が過ぎた・取り消された要求のテキストは渡さない
+            chunk = [(k, t) for k, t in chunk if self._alive(items[k])]
+            if not chunk:
+                continue
+            flat = [t for _, t in chunk]
+            try:
+                translated = await loop.run_in_executor(
+                    self._executor, lambda flat=flat: self.translator.translate_batch(flat, **kwargs))
+            except Exception as e:
+                for item in items:
+                    if not item.future.done():
+                        item.future.set_exception(ServerError(str(e)))
+                return
+            self.stats["batches"] += 1
+            self.stats["texts"] += len(flat)
+            for (k, _), text in zip(chunk, translated):
+                outputs[k].append(text)
+
+        for item, output in zip(items, outputs):
+            if not item.future.done():
+                item.future.set_result(output)
+
+    async def _handle(self, reader, writer):
+        """1接続につき1行ずつ要求を読み、並行に処理して応答を書く"""
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        async def respond(message):
+            reply = {"id": message.get("id")}
+            try:
+                if message.get("op") == "stats":
+                    reply["stats"] = dict(self.stats)
+                else:
+                    reply["translations"] = await self.translate(
+                        message.get("texts", []), message.get("deadline_ms", DEFAULT_DEADLINE_MS),
+                        message.get("profile"))
+            except ServerError as e:
+                reply.update(error=str(e), code=e.code)
+            async with write_lock:
+                writer.write(json.dumps(reply, ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    message = None
+                if not isinstance(message, dict):
+                    async with write_lock:
+                        writer.write(b'{"error": "invalid request", "code": "error"}\n')
+                        await writer.drain()
+                    continue
+                task = asyncio.create_task(respond(message))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def run_server(translator, **kwargs):
+    """サーバを起動して Ctrl+C まで待ち受ける"""
+    server = TranslationServer(translator, **kwargs)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print("🛑 翻訳サーバを終了しました")
+
+
+# ---------------------------
+# クライアント
+# ---------------------------
+class TranslationClient:
+    """
+    TranslatorModel と同じ translate_text / translate_batch を持つサーバのクライアント
+    スレッドから呼んでよい（接続は1本、要求は直列化する）
+    """
+
+    def __init__(self, address=None, timeout=DEFAULT_DEADLINE_MS / 1000):
+        self.address = address or os.environ.get(SERVER_ENV) or f"{DEFAULT_HOST}:{DEFAULT_PORT}"
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._sock = None
+        self._file = None
+
+    def _connect(self):
+        kind, host, port = parse_address(self.address)
+        # 応答はサーバ側の期限（timeout）までに返るので、少し長めに待つ
+        if kind == "unix":
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout + 5)
+            sock.connect(host)
+        else:
+            sock = socket.create_connection((host, port), timeout=self.timeout + 5)
+        self._sock = sock
+        self._file = sock.makefile("rb")
+
+    def _request(self, message):
+        with self._lock:
+            message["id"] = next(self._ids)
+            data = json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n"
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    self._sock.sendall(data)
+                    line = self._file.readline()
+                    if not line:
+                        raise ConnectionError("サーバが接続を閉じました")
+                    break
+                except ConnectionError:
+                    # サーバ再起動などで切れた接続は1回だけ張り直す
+                    self.close()
+                    if attempt:
+                        raise
+                except OSError:
+                    self.close()
+                    raise
+        reply = json.loads(line)
+        if "error" in reply:
+            raise ServerError(reply["error"], reply.get("code", "error"))
+        return reply
+
+    def translate_text(self, text: str, profile=None):
+        return self.translate_batch([text], profile=profile)[0]
+
+    def translate_batch(self, texts, max_batch_tokens=None, profile=None, deadline_ms=None, **kwargs):
+        """max_batch_tokens はサーバ側のバッチングに任せるので使わない"""
+        texts = list(texts)
+        if not texts:
+            return []
+        message = {"texts": texts, "deadline_ms": deadline_ms or int(self.timeout * 1000)}
+        if profile:
+            message["profile"] = profile
+        return self._request(message)["translations"]
+
+    def stats(self):
+        return self._request({"op": "stats"})["stats"]
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        if self._sock is not None:
+            self._sock.close()
+        self._sock = None
+        self._file = None
@@ -0,0 +1,159 @@
+# translator_config.py
+"""
+翻訳モデル (OpenVINO) の実行設定
+
+優先順位: 既定値 < 設定ファイル (JSON) < 環境変数 < コンストラクタ引数
+
+設定ファイルは PPT_MASTER_CONFIG で指定（未指定ならカレントの translator_config.json）:
+
+    {"device": "GPU", "precision": "int8", "performance_hint": "THROUGHPUT",
+     "num_streams": 4, "num_requests": 4, "cache_dir": "ov_cache", "decoding_profile": "fast", "mmap": true}
+"""
+import json
+import os
+
+DEFAULT_CONFIG_PATH = "translator_config.json"
+
+# precision ごとのモデル出力先（optimum-cli export openvino の --output）
+MODEL_DIRS = {
+    "int8": "openvino_model",
+    "fp": "openvino_model_fp",
+}
+
+DEFAULTS = {
+    "model_dir": None,  # None なら precision から決める
+    "precision": "int8",
+    "device": "GPU",
+    "performance_hint": "LATENCY",  # LATENCY / THROUGHPUT
+    "num_streams": None,  # None なら OpenVINO に任せる
+    "inference_threads": None,
+    "num_requests": None,  # 同時に投げる推論リクエスト数（None なら hint から決める）
+    "cache_dir": "ov_cache",  # コンパイル済みモデルのキャッシュ先（空なら無効。相対パスはモデルディレクトリの隣）
+    "mmap": True,  # 重み (.bin) とキャッシュを読み取り専用で mmap し、同じホストのプロセス間で物理ページを共有する
+    "decoding_profile": "quality",  # fast（貪欲法）/ quality（ビームサーチ）
+}
+
+ENV_VARS = {
+    "model_dir": "PPT_MASTER_MODEL_DIR",
+    "precision": "PPT_MASTER_PRECISION",
+    "device": "PPT_MASTER_DEVICE",
+    "performance_hint": "PPT_MASTER_PERF_HINT",
+    "num_streams": "PPT_MASTER_NUM_STREAMS",
+    "inference_threads": "PPT_MASTER_NUM_THREADS",
+    "num_requests": "PPT_MASTER_NUM_REQUESTS",
+    "cache_dir": "PPT_MASTER_CACHE_DIR",
+    "decoding_profile": "PPT_MASTER_PROFILE",
+    "mmap": "PPT_MASTER_MMAP",
+}
+
+_INT_KEYS = ("inference_threads", "num_requests")
+_BOOL_KEYS = ("mmap",)
+# translator_model.DECODING_PROFILES のキー（translator_model はこのモジュールを import するので循環を避けて持つ）
+DECODING_PROFILE_NAMES = ("fast", "quality")
+
+
+class TranslatorConfig:
+    def __init__(self, **values):
+        unknown = set(values) - set(DEFAULTS)
+        if unknown:
+            raise ValueError(f"未知の設定項目: {', '.join(sorted(unknown))}")
+        merged = dict(DEFAULTS)
+        merged.update(values)
+        for key, value in merged.items():
+            setattr(self, key, value)
+
+        self.performance_hint = str(self.performance_hint).upper()
+        if self.performance_hint not in ("LATENCY", "THROUGHPUT"):
+            raise ValueError(f"performance_hint は LATENCY か THROUGHPUT: {self.performance_hint}")
+        if self.precision not in MODEL_DIRS:
+            raise ValueError(f"precision は {' / '.join(MODEL_DIRS)} のいずれか: {self.precision}")
+        if self.decoding_profile not in DECODING_PROFILE_NAMES:
+            raise ValueError(f"decoding_profile は {' / '.join(DECODING_PROFILE_NAMES)} のいずれか: "
+                             f"{self.decoding_profile}")
+        for key in _INT_KEYS:
+            if getattr(self, key) is not None:
+                setattr(self, key, int(getattr(self, key)))
+        for key in _BOOL_KEYS:
+            value = getattr(self, key)
+            if isinstance(value, str):
+                setattr(self, key, value.strip().lower() not in ("0", "false", "no", "off", ""))
+
+    @classmethod
+    def load(cls, path=None):
+        """設定ファイルと環境変数から読み込む"""
+        values = {}
+        path = path or os.environ.get("PPT_MASTER_CONFIG") or DEFAULT_CONFIG_PATH
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                values.update(json.load(f))
+        for key, env in ENV_VARS.items():
+            if os.environ.get(env):
+                values[key] = os.environ[env]
+        return cls(**values)
+
+    def override(self, **values):
+        """None 以外の値で上書きした新しい設定を返す"""
+        merged = self.as_dict()
+        merged.update({k: v for k, v in values.items() if v is not None})
+        return TranslatorConfig(**merged)
+
+    def as_dict(self):
+        return {key: getattr(self, key) for key in DEFAULTS}
+
+    def resolved_model_dir(self):
+        return self.model_dir or MODEL_DIRS[self.precision]
+
+    def resolved_cache_dir(self):
+        """
+        コンパイル済みモデルのキャッシュ先（絶対パス）
+        相対パスはカレントではなくモデルディレクトリの隣に置き、どこから起動したプロセスも同じキャッシュを使う
+        （モデルディレクトリの中に置くと翻訳メモリのフィンガープリントが変わるので隣にする）
+        """
+        if not self.cache_dir:
+            return None
+        if os.path.isabs(self.cache_dir):
+            return self.cache_dir
+        base = os.path.dirname(os.path.abspath(self.resolved_model_dir()))
+        return os.path.join(base, self.cache_dir)
+
+    def resolved_num_requests(self):
+        """THROUGHPUT ならストリーム数ぶん同時に推論リクエストを投げる"""
+        if self.num_requests:
+            return max(1, self.num_requests)
+        if self.performance_hint != "THROUGHPUT":
+            return 1
+        if self.num_streams and str(self.num_streams).isdigit():
+            return max(1, int(self.num_streams))
+        return max(2, (os.cpu_count() or 4) // 4)
+
+    def ov_config(self):
+        """OVModelForSeq2SeqLM.from_pretrained に渡す ov_config"""
+        config = {"PERFORMANCE_HINT": self.performance_hint}
+        cache_dir = self.resolved_cache_dir()
+        if cache_dir:
+            config["CACHE_DIR"] = cache_dir
+        if self.num_streams is not None:
+            config["NUM_STREAMS"] = str(self.num_streams)
+        if self.inference_threads is not None:
+            config["INFERENCE_NUM_THREADS"] = str(self.inference_threads)
+        return config
+
+
+def resolve_device(device):
+    """
+    指定デバイスが使えなければ CPU にフォールバックする
+    AUTO / MULTI / HETERO などの仮想デバイスはそのまま OpenVINO に任せる
+    """
+    device = (device or "CPU").upper()
+    if device == "CPU" or device.split(":")[0] in ("AUTO", "MULTI", "HETERO"):
+        return device
+    try:
+        import openvino as ov
+
+        available = [d.upper() for d in ov.Core().available_devices]
+    except Exception:
+        available = ["CPU"]
+    if any(d == device or d.startswith(device + ".") for d in available):
+        return device
+    print(f"⚠️ デバイス {device} が見つからないため CPU を使います（利用可能: {', '.join(available)}）")
+    return "CPU"
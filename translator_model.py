@@ -1,22 +1,403 @@
 # translator_model.py
-from transformers import AutoTokenizer
-from optimum.intel.openvino import OVModelForSeq2SeqLM
+# transformers / optimum (torch) は重いので TranslatorModel 生成時に読み込む
+import metrics
+from passthrough import PassThroughFilter
+from segmenter import reassemble, segment_text
+from translation_cache import make_key, model_fingerprint
+from translator_config import TranslatorConfig, resolve_device
+from concurrent.futures import ThreadPoolExecutor
+import copy
+import queue
 import re
+import time
+
+MAX_LENGTH = 256
+DEFAULT_MAX_BATCH_TOKENS = 4096
+
+# デコード設定
+# fast: 貪欲法（ビームなし＝キャッシュの並べ替えもない）。一括処理のスループット向け
+# quality: ビームサーチ。GUI での1枚ずつの翻訳向け
+# どちらも同じ n-gram の繰り返しを禁止し、暴走した出力が上限まで伸びないようにする
+DECODING_PROFILES = {
+    "fast": {"num_beams": 1, "do_sample": False, "no_repeat_ngram_size": 4, "repetition_penalty": 1.1},
+    "quality": {"num_beams": 4, "do_sample": False, "early_stopping": True, "no_repeat_ngram_size": 4,
+                "repetition_penalty": 1.05},
+}
+
+# 出力トークン数 ÷ 入力トークン数 の目安（言語対ごと。無ければ DEFAULT_LENGTH_RATIO）
+LENGTH_RATIOS = {
+    ("ja_XX", "en_XX"): 1.5,
+    ("en_XX", "ja_XX"): 1.3,
+    ("ja_XX", "zh_CN"): 1.0,
+    ("zh_CN", "ja_XX"): 1.3,
+    ("ja_XX", "ko_KR"): 1.2,
+}
+DEFAULT_LENGTH_RATIO = 1.6
+# 短い入力（タイトルなど）でも最低限確保するトークン数
+MIN_NEW_TOKENS = 16
+
+
+def max_new_tokens(input_tokens, src_lang, tgt_lang):
+    """入力トークン数と言語対から max_new_tokens を決める（上限は MAX_LENGTH）"""
+    ratio = LENGTH_RATIOS.get((src_lang, tgt_lang), DEFAULT_LENGTH_RATIO)
+    return max(MIN_NEW_TOKENS, min(MAX_LENGTH, int(input_tokens * ratio) + 8))
+
+
+def normalize_text(text: str) -> str:
+    """前後の空白を除き、連続する改行を1つにまとめる"""
+    return re.sub(r'\n{2,}', '\n', text.strip())
+
+
+def pack_batches(lengths, max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS):
+    """
+    トークン長の昇順に並べ、パディング後のトークン数 (最大長 × 件数) が
+    max_batch_tokens 以内に収まるようにインデックスをバッチへ詰める
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches = []
+    current = []
+    current_max = 0
+    for i in order:
+        longest = max(current_max, lengths[i])
+        if current and longest * (len(current) + 1) > max_batch_tokens:
+            batches.append(current)
+            current = []
+            longest = lengths[i]
+        current.append(i)
+        current_max = longest
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _count_tokens(rows, pad_token_id=None):
+    """バッチ内のトークン数（pad_token_id を除く）"""
+    if hasattr(rows, "numel"):
+        return int(rows.numel() if pad_token_id is None else (rows != pad_token_id).sum())
+    return sum(sum(1 for t in row if t != pad_token_id) for row in rows)
+
+
+def enable_mmap(enabled=True):
+    """
+    optimum が使う OpenVINO Core に ENABLE_MMAP を設定する
+    IR の .bin とキャッシュのブロブを読み取り専用で mmap するので、同じファイルを読む
+    推論ワーカー間で重みの物理ページが共有される（プロセスごとの固有メモリが減る）
+    optimum / OpenVINO のバージョンで Core の置き場所が違うため、見つからなければ何もしない
+    戻り値: 設定できたか
+    """
+    import importlib
+
+    for name in ("optimum.intel.openvino.utils", "optimum.intel.openvino.modeling_base"):
+        try:
+            core = getattr(importlib.import_module(name), "core", None)
+        except ImportError:
+            continue
+        if core is None:
+            continue
+        try:
+            core.set_property({"ENABLE_MMAP": bool(enabled)})
+            return True
+        except (RuntimeError, TypeError):
+            return False
+    return False
+
+
+def _clone_with_new_requests(model):
+    """
+    コンパイル済みモデル（重み）は共有したまま、推論リクエストだけを新しく作った複製を返す
+    THROUGHPUT ヒントでは複数リクエストを同時に投げることで全ストリームを使い切れる
+    """
+    clone = copy.copy(model)
+    for name in ("encoder", "decoder", "decoder_with_past"):
+        part = getattr(model, name, None)
+        if part is None:
+            continue
+        request = getattr(part, "request", None)
+        if request is None:
+            raise AttributeError(f"{name} はコンパイルされていません")
+        part_clone = copy.copy(part)
+        part_clone.request = request.get_compiled_model().create_infer_request()
+        setattr(clone, name, part_clone)
+    return clone
+
 
 class TranslatorModel:
-    def __init__(self, model_dir="openvino_model", src_lang="ja_XX", tgt_lang="en_XX"):
-        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
-        self.model = OVModelForSeq2SeqLM.from_pretrained(model_dir, device="GPU")
+    def __init__(self, model_dir=None, src_lang="ja_XX", tgt_lang="en_XX", cache=None,
+                 device=None, ov_cache_dir=None, config=None, segment=True, profile=None,
+                 passthrough=True, passthrough_list=None, **options):
+        """
+        実行設定は config（既定は TranslatorConfig.load()）から取り、
+        model_dir / device / ov_cache_dir / options (precision, performance_hint, num_streams,
+        inference_threads, num_requests) を指定した項目だけ上書きする
+        segment=True なら段落を文単位に分けて翻訳する（segmenter.py）
+        profile は DECODING_PROFILES のキー（既定は config.decoding_profile）。呼び出しごとにも指定できる
+        passthrough=True なら数字・URL・原文の文字を含まないテキストなどはモデルに通さない（passthrough.py）
+        passthrough_list はそのまま通す語の一覧ファイル（既定は passthrough.txt）
+        """
+        from transformers import AutoTokenizer
+        from optimum.intel.openvino import OVModelForSeq2SeqLM
+
+        self.config = (config or TranslatorConfig.load()).override(
+            model_dir=model_dir, device=device, cache_dir=ov_cache_dir, decoding_profile=profile, **options
+        )
+        model_dir = self.config.resolved_model_dir()
+        self.model_dir = model_dir
+        self.device = resolve_device(self.config.device)
+
+        with metrics.span("load", model_dir=model_dir, device=self.device):
+            self.mmap = enable_mmap(self.config.mmap)
+            self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+            # CACHE_DIR にコンパイル済みモデルを保存し、2回目以降の起動ではグラフコンパイルを省く
+            ov_config = self.config.ov_config()
+            self.model = OVModelForSeq2SeqLM.from_pretrained(model_dir, device=self.device, ov_config=ov_config)
+
+            # THROUGHPUT ヒント時は推論リクエストを複数用意し、バッチを並行に流す
+            # 複製できない（optimum の内部が違う）ときはモデルを読み直さず1リクエストで動かす
+            # （読み直すとメモリが num_requests 倍になる）
+            self.models = [self.model]
+            for _ in range(self.config.resolved_num_requests() - 1):
+                try:
+                    self.models.append(_clone_with_new_requests(self.model))
+                except (AttributeError, RuntimeError) as e:
+                    print(f"⚠️ 推論リクエストを複製できないため1リクエストで実行します: {e}")
+                    break
 
         self.src_lang = src_lang
         self.tgt_lang = tgt_lang
         self.tokenizer.src_lang = src_lang
         self.forced_bos_token_id = self.tokenizer.lang_code_to_id[tgt_lang]
 
-    def translate_text(self, text: str):
-        if not text.strip():
-            return ""
-        text = re.sub(r'\n{2,}', '\n', text.strip())
-        inputs = self.tokenizer(text, return_tensors="pt", truncation=True, max_length=256)
-        outputs = self.model.generate(**inputs, max_length=256, forced_bos_token_id=self.forced_bos_token_id)
-        return self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+        self.segment = segment
+        self.passthrough = PassThroughFilter(src_lang, list_path=passthrough_list) if passthrough else None
+        self.profile = self.config.decoding_profile
+        self.last_stats = None  # 直近の translate_batch の profile / トークン数 / tokens/s
+
+        # 翻訳メモリ（TranslationCache）。None なら毎回モデルを通す
+        self.cache = cache
+        self.fingerprint = model_fingerprint(model_dir) if cache is not None else None
+
+    def generation_settings(self, profile=None):
+        """キャッシュキーに含める生成設定（profile ごとに別のキーになる）"""
+        profile = profile or self.profile
+        return {"max_length": MAX_LENGTH, "profile": profile, **DECODING_PROFILES[profile]}
+
+    def generate_kwargs(self, input_tokens, profile=None, tgt_lang=None):
+        """generate に渡すデコード設定（max_new_tokens は入力長と言語対から決める）"""
+        kwargs = dict(DECODING_PROFILES[profile or self.profile])
+        kwargs["max_new_tokens"] = max_new_tokens(input_tokens, self.src_lang, tgt_lang or self.tgt_lang)
+        return kwargs
+
+    def _cache_key(self, text, profile=None, tgt_lang=None):
+        return make_key(self.fingerprint, self.src_lang, tgt_lang or self.tgt_lang,
+                        self.generation_settings(profile), text)
+
+    def _forced_bos(self, tgt_lang):
+        if tgt_lang is None or tgt_lang == self.tgt_lang:
+            return self.forced_bos_token_id
+        return self.tokenizer.lang_code_to_id[tgt_lang]
+
+    def translate_text(self, text: str, profile=None):
+        return self.translate_batch([text], profile=profile)[0]
+
+    def translate_batch(self, texts, max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS, profile=None):
+        """
+        複数テキストをまとめて翻訳する（結果は入力順）
+        segment=True なら各段落を文に分け、全段落の文をまとめて翻訳してから行構造どおりに組み立てる
+        長さの近いもの同士でバッチを組み、generate はバッチごとに1回だけ呼ぶ
+        profile でこの呼び出しだけデコード設定を変えられる（"fast" / "quality"）
+        """
+        return self.translate_multi(texts, [self.tgt_lang], max_batch_tokens, profile)[self.tgt_lang]
+
+    def translate_multi(self, texts, tgt_langs, max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS, profile=None):
+        """
+        同じテキストを複数の言語へ翻訳する（{tgt_lang: 入力順の訳文リスト}）
+        mbart-50 のエンコーダは出力言語によらないので、バッチごとにエンコーダを1回だけ通し、
+        その出力を使ってデコーダを言語の数だけ回す
+        """
+        tgt_langs = list(dict.fromkeys(tgt_langs))
+        profile = profile or self.profile
+        if profile not in DECODING_PROFILES:
+            raise ValueError(f"未知のデコード設定: {profile}（{' / '.join(DECODING_PROFILES)}）")
+        unknown = [lang for lang in tgt_langs if lang not in self.tokenizer.lang_code_to_id]
+        if unknown:
+            raise ValueError(f"未知の言語コード: {', '.join(unknown)}")
+        self.last_stats = {"profile": profile, "texts": len(texts), "generated": 0, "skipped": 0,
+                           "tokens_out": 0, "seconds": 0.0, "tokens_per_s": 0.0}
+        results = {lang: [""] * len(texts) for lang in tgt_langs}
+        pending = [(i, normalize_text(t)) for i, t in enumerate(texts) if t and t.strip()]
+        if not pending:
+            return results
+
+        if not self.segment:
+            translated = self._translate_units([t for _, t in pending], max_batch_tokens, profile, tgt_langs)
+            for lang in tgt_langs:
+                for i, t in pending:
+                    results[lang][i] = translated[lang][t]
+            return results
+
+        segmented = {t: segment_text(t) for _, t in pending}
+        units = [s for lines in segmented.values() for sentences, _ in lines for s in sentences]
+        translated = self._translate_units(units, max_batch_tokens, profile, tgt_langs)
+        for lang in tgt_langs:
+            for i, t in pending:
+                results[lang][i] = reassemble(segmented[t], translated[lang], lang)
+        return results
+
+    def _translate_units(self, units, max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS, profile=None, tgt_langs=None):
+        """
+        翻訳単位（段落または文）を {tgt_lang: {原文: 訳文}} で返す
+        翻訳不要なものはそのまま返し、埋め込みの URL・数字はプレースホルダーにしてからモデルに渡す
+        """
+        tgt_langs = tgt_langs or [self.tgt_lang]
+        if self.passthrough is None:
+            return self._translate_cached(units, max_batch_tokens, profile, tgt_langs)
+
+        translated = {lang: {} for lang in tgt_langs}
+        masked = {}
+        for t in dict.fromkeys(units):
+            if self.passthrough.should_skip(t):
+                for lang in tgt_langs:
+                    translated[lang][t] = t
+            else:
+                masked[t] = self.passthrough.protect(t)
+        skipped = len(translated[tgt_langs[0]])
+        metrics.incr("passthrough", skipped)
+        if self.last_stats is not None:
+            self.last_stats["skipped"] += skipped
+        if not masked:
+            return translated
+
+        outputs = self._translate_cached([m for m, _ in masked.values()], max_batch_tokens, profile, tgt_langs)
+        retry = {}
+        for t, (m, spans) in masked.items():
+            for lang in tgt_langs:
+                restored = self.passthrough.restore(outputs[lang][m], spans)
+                if restored is None:
+                    retry.setdefault(t, []).append(lang)
+                else:
+                    translated[lang][t] = restored
+        # プレースホルダーが訳文に残らなかったものは、置き換えずに翻訳し直す
+        if retry:
+            metrics.incr("placeholder_retries", len(retry))
+            langs = [lang for lang in tgt_langs if any(lang in ls for ls in retry.values())]
+            outputs = self._translate_cached(list(retry), max_batch_tokens, profile, langs)
+            for t, ls in retry.items():
+                for lang in ls:
+                    translated[lang][t] = outputs[lang][t]
+        return translated
+
+    def _translate_cached(self, units, max_batch_tokens, profile, tgt_langs):
+        """同一テキストは1回だけ翻訳し、翻訳メモリにあるものはモデルを通さない"""
+        unique = list(dict.fromkeys(units))
+        translated = {lang: {} for lang in tgt_langs}
+        keys = {}
+        if self.cache is not None:
+            for lang in tgt_langs:
+                keys[lang] = {t: self._cache_key(t, profile, lang) for t in unique}
+                found = self.cache.get_many(list(keys[lang].values()))
+                translated[lang] = {t: found[k] for t, k in keys[lang].items() if k in found}
+                metrics.incr("cache_hits", len(translated[lang]))
+                metrics.incr("cache_misses", len(unique) - len(translated[lang]))
+        # どれか1言語でも訳が無いものはエンコーダに通す（訳がある言語のデコードは省く）
+        missing = {lang: [t for t in unique if t not in translated[lang]] for lang in tgt_langs}
+        sources = [t for t in unique if any(t not in translated[lang] for lang in tgt_langs)]
+
+        if sources:
+            new_items = self._generate_batches(sources, max_batch_tokens, profile, missing)
+            for lang, items in new_items.items():
+                translated[lang].update(items)
+                if self.cache is not None:
+                    self.cache.put_many((keys[lang][t], out) for t, out in items.items())
+        return translated
+
+    def _generate_batches(self, sources, max_batch_tokens, profile=None, missing=None):
+        """
+        sources を翻訳して {tgt_lang: {原文: 訳文}} を返す
+        missing: {tgt_lang: 訳が必要な原文}（None なら self.tgt_lang へ全部）
+        """
+        missing = missing or {self.tgt_lang: sources}
+        needed = {lang: set(texts) for lang, texts in missing.items()}
+        with metrics.span("tokenize", texts=len(sources)):
+            lengths = [len(ids) for ids in
+                       self.tokenizer(sources, truncation=True, max_length=MAX_LENGTH)["input_ids"]]
+
+            # トークナイザはスレッドセーフでないため、トークン化とデコードは呼び出し元スレッドで行う
+            encoded = []
+            for batch in pack_batches(lengths, max_batch_tokens):
+                inputs = self.tokenizer([sources[j] for j in batch], return_tensors="pt",
+                                        padding=True, truncation=True, max_length=MAX_LENGTH)
+                # バッチ内の最長入力に合わせて生成トークン数の上限を決める（言語ごと）
+                longest = max(lengths[j] for j in batch)
+                settings = {lang: self.generate_kwargs(longest, profile, lang) for lang in missing
+                            if any(sources[j] in needed[lang] for j in batch)}
+                encoded.append((batch, inputs, settings))
+
+        if len(self.models) > 1 and len(encoded) > 1:
+            free = queue.Queue()
+            for m in self.models:
+                free.put(m)
+
+            def run(item):
+                inputs, settings = item
+                model = free.get()
+                try:
+                    return self._generate_langs(model, inputs, settings)
+                finally:
+                    free.put(model)
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=len(self.models)) as pool:
+                outputs = list(pool.map(run, [(inputs, settings) for _, inputs, settings in encoded]))
+        else:
+            started = time.perf_counter()
+            outputs = [self._generate_langs(self.model, inputs, settings) for _, inputs, settings in encoded]
+        elapsed = time.perf_counter() - started
+
+        translated = {lang: {} for lang in missing}
+        tokens_out = 0
+        generated = 0
+        with metrics.span("decode", batches=len(encoded)):
+            for (batch, _, _), by_lang in zip(encoded, outputs):
+                for lang, out in by_lang.items():
+                    decoded = self.tokenizer.batch_decode(out, skip_special_tokens=True)
+                    # バッチはどれかの言語で必要な原文の集まりなので、この言語で必要な行だけ数える
+                    used = [k for k, j in enumerate(batch) if sources[j] in needed[lang]]
+                    for k in used:
+                        translated[lang][sources[batch[k]]] = decoded[k]
+                    rows = out if len(used) == len(batch) else [out[k] for k in used]
+                    tokens_out += _count_tokens(rows, self.tokenizer.pad_token_id)
+                    generated += len(used)
+        metrics.incr("tokens_out", tokens_out)
+
+        stats = self.last_stats
+        if stats is not None:
+            stats["generated"] += generated
+            stats["tokens_out"] += tokens_out
+            stats["seconds"] += elapsed
+            stats["tokens_per_s"] = stats["tokens_out"] / stats["seconds"] if stats["seconds"] else 0.0
+            metrics.observe(f"tokens_per_s_{stats['profile']}", stats["tokens_per_s"])
+        return translated
+
+    def _generate_langs(self, model, inputs, settings_by_lang):
+        """1バッチを言語ごとに生成する。2言語以上ならエンコーダ出力を使い回す"""
+        if len(settings_by_lang) == 1:
+            (lang, settings), = settings_by_lang.items()
+            return {lang: self._generate(model, inputs, settings, lang)}
+        with metrics.span("encode", batch=len(inputs["input_ids"])):
+            encoder_outputs = model.get_encoder()(input_ids=inputs["input_ids"],
+                                                  attention_mask=inputs["attention_mask"])
+        return {lang: self._generate(model, inputs, settings, lang, encoder_outputs)
+                for lang, settings in settings_by_lang.items()}
+
+    def _generate(self, model, inputs, settings=None, tgt_lang=None, encoder_outputs=None):
+        settings = settings or self.generate_kwargs(len(inputs["input_ids"][0]), tgt_lang=tgt_lang)
+        if metrics.enabled:
+            metrics.incr("generate_calls")
+            metrics.incr("tokens_in", _count_tokens(inputs["attention_mask"], 0))
+            metrics.observe("batch_size", len(inputs["input_ids"]))
+        if encoder_outputs is not None:
+            # generate はエンコーダ出力が渡されるとエンコーダを呼ばない
+            # ビームぶんの複製で中身を書き換えるので、言語ごとに浅いコピーを渡す
+            settings = dict(settings, encoder_outputs=copy.copy(encoder_outputs))
+        with metrics.span("generate", batch=len(inputs["input_ids"]), max_new_tokens=settings["max_new_tokens"]):
+            return model.generate(**inputs, forced_bos_token_id=self._forced_bos(tgt_lang), **settings)
@@ -0,0 +1,313 @@
+# workers.py
+"""
+GUI を固めないためのバックグラウンド処理
+
+- PPTDocumentWorker: PowerPoint (COM) を専用スレッドで開き・抽出・置換・保存する
+  COM オブジェクトは作成したスレッドでしか触れないため、操作はすべてシグナル経由で依頼する
+- TranslateJob: スライド1枚分の翻訳を QThreadPool 上で行い、段落ごとに結果を通知する
+- DeckTranslateJob: 全スライドの段落を重複なしでまとめて翻訳する（デッキ一括の翻訳・置換用）
+- BackgroundCall: モデル読み込みやデバイス検出など、任意の重い処理を裏で1回実行する
+"""
+from PySide6.QtCore import QObject, QRunnable, Signal, Slot
+
+from ppt_com_model import PowerPointCOM
+from translation_manifest import TranslationManifest, count_known, manifest_path
+
+
+# ---------------------------
+# PowerPoint 操作スレッド
+# ---------------------------
+class PPTDocumentWorker(QObject):
+    # 依頼（メインスレッドから emit → ワーカースレッドで実行）
+    open_requested = Signal(str)
+    replace_requested = Signal(int, list, list)  # slide_idx, 文書中の現在のテキスト, 置換後のテキスト
+    replace_deck_requested = Signal(object)  # {slide_idx: (現在のテキスト, 置換後のテキスト)}
+    record_requested = Signal(int, list)  # slide_idx, 機械翻訳の結果（マニフェスト用）
+    save_requested = Signal()
+
+    # 結果
+    restored = Signal(object)  # {slide_idx: (訳文 or None のリスト, 採用済み段落番号の集合)}（loaded より先に通知）
+    loaded = Signal(list)
+    replaced = Signal(int, int, list)  # slide_idx, replaced_count, misses
+    deck_progress = Signal(int, int)   # 置換済みスライド数, 全スライド数
+    deck_replaced = Signal(object)     # {slide_idx: (replaced_count, misses)}
+    applied = Signal(object)           # {slide_idx: 置換後に文書中にある段落テキスト}
+    saved = Signal(object)
+    failed = Signal(str)
+
+    def __init__(self):
+        super().__init__()
+        self.ppt = None
+        self.paragraphs = []     # スライドごとの [(shape_id, 原文), ...]
+        self.translations = {}   # slide_idx -> 訳文（未翻訳の段落は None）
+        self.accepted = {}       # slide_idx -> 置換した（チェックした）段落番号の集合
+        self.open_requested.connect(self.open)
+        self.replace_requested.connect(self.replace)
+        self.replace_deck_requested.connect(self.replace_deck)
+        self.record_requested.connect(self.record)
+        self.save_requested.connect(self.save)
+
+    @Slot(str)
+    def open(self, path):
+        try:
+            self.ppt = PowerPointCOM(path)
+            self.paragraphs = self.ppt.extract_texts(with_ids=True)
+            slides_text = [[text for _, text in row] for row in self.paragraphs]
+            self.translations = {}
+            self.accepted = {}
+            self._restore(slides_text)
+            self.loaded.emit(slides_text)
+        except Exception as e:
+            self.failed.emit(f"❌ PPTを開けませんでした: {e}")
+
+    def _restore(self, slides_text):
+        """
+        前回の出力のマニフェストと突き合わせ、変わっていない段落の訳文を引き継ぐ
+        採用済みの訳文はこの場で置換し直し、文書中にあるテキストを applied で通知する
+        """
+        manifest = TranslationManifest.load(manifest_path(self.ppt.output_path()))
+        if manifest is None:
+            return
+        known = manifest.match(self.paragraphs)
+        restored = {}
+        applied = {}
+        for slide_idx, row in enumerate(known):
+            if not any(row):
+                continue
+            self.translations[slide_idx] = [entry["translation"] if entry else None for entry in row]
+            self.accepted[slide_idx] = {i for i, entry in enumerate(row) if entry and entry["accepted"]}
+            if self.accepted[slide_idx]:
+                originals = slides_text[slide_idx]
+                texts = [row[i]["translation"] if i in self.accepted[slide_idx] else text
+                         for i, text in enumerate(originals)]
+                _, misses = self.ppt.replace_text_preserve_format(slide_idx, originals, texts)
+                applied[slide_idx] = self._applied_text(slide_idx, texts, misses)
+            restored[slide_idx] = (self.translations[slide_idx], self.accepted[slide_idx])
+        reused, total = count_known(known)
+        print(f"♻️ マニフェストから {reused}/{total} 段落の訳文を引き継ぎました")
+        self.restored.emit(restored)
+        # 置換し直したスライドは、以後の置換で原文ではなくこのテキストを探す
+        if applied:
+            self.applied.emit(applied)
+
+    @Slot(int, list)
+    def record(self, slide_idx, translations):
+        self.translations[slide_idx] = list(translations)
+
+    @Slot(int, list, list)
+    def replace(self, slide_idx, originals, translations):
+        if not self.ppt:
+            return
+        try:
+            count, misses = self.ppt.replace_text_preserve_format(slide_idx, originals, translations)
+            self._accept(slide_idx, translations)
+            self.applied.emit({slide_idx: self._applied_text(slide_idx, translations, misses)})
+            self.replaced.emit(slide_idx, count, misses)
+        except Exception as e:
+            self.failed.emit(f"❌ 置換に失敗しました: {e}")
+
+    @Slot(object)
+    def replace_deck(self, slides):
+        """複数スライドをまとめて置換する（プレゼンテーションの走査は1回）"""
+        if not self.ppt:
+            return
+        try:
+            results = self.ppt.replace_deck(slides, progress=self.deck_progress.emit)
+            applied = {}
+            for slide_idx, (_, translations) in slides.items():
+                self._accept(slide_idx, translations)
+                misses = results.get(slide_idx, (0, []))[1]
+                applied[slide_idx] = self._applied_text(slide_idx, translations, misses)
+            self.applied.emit(applied)
+            self.deck_replaced.emit(results)
+        except Exception as e:
+            self.failed.emit(f"❌ 置換に失敗しました: {e}")
+
+    def _applied_text(self, slide_idx, translations, misses):
+        """
+        置換後に文書中にある段落テキスト
+        置換できなかった段落があれば、その段落は元のままなのでスライドを読み直す
+        """
+        if misses:
+            current = self.ppt.slide_texts(slide_idx)
+            if len(current) == len(translations):
+                return current
+        return list(translations)
+
+    def _accept(self, slide_idx, translations):
+        """原文と異なる段落を採用済みとして記録する（マニフェスト用）"""
+        originals = [text for _, text in self.paragraphs[slide_idx]]
+        self.accepted[slide_idx] = {i for i, (o, t) in enumerate(zip(originals, translations)) if o != t}
+        known = self.translations.setdefault(slide_idx, [None] * len(originals))
+        for i in self.accepted[slide_idx]:
+            known[i] = translations[i]
+
+    @Slot()
+    def save(self):
+        if not self.ppt:
+            return
+        path = self.ppt.save_as()
+        if path:
+            self._write_manifest(path)
+        self.ppt.close()
+        self.ppt = None
+        self.saved.emit(path)
+
+    def _write_manifest(self, path):
+        translations = [self.translations.get(i) for i in range(len(self.paragraphs))]
+        manifest = TranslationManifest.from_paragraphs(self.paragraphs, translations, self.accepted,
+                                                       source=self.ppt.path)
+        try:
+            manifest.save(manifest_path(path))
+        except OSError as e:
+            print(f"⚠️ マニフェストを保存できませんでした: {e}")
+
+
+# ---------------------------
+# 翻訳ジョブ
+# ---------------------------
+class TranslateSignals(QObject):
+    paragraph_done = Signal(int, int, str)  # slide_idx, paragraph_idx, translation
+    finished = Signal(int, list)            # slide_idx, translations
+    failed = Signal(int, str)
+
+
+class TranslateJob(QRunnable):
+    """
+    スライド1枚分の段落を stream_chunk 件ずつ translate_batch に渡し、
+    終わった段落から順に paragraph_done で返す
+    """
+
+    def __init__(self, translator, slide_idx, texts, prefetch=False, stream_chunk=8, known=None):
+        """known: マニフェストから引き継いだ訳文（None の段落だけモデルに渡す）"""
+        super().__init__()
+        self.translator = translator
+        self.slide_idx = slide_idx
+        self.texts = list(texts)
+        self.known = list(known) if known else [None] * len(self.texts)
+        self.prefetch = prefetch
+        self.stream_chunk = stream_chunk
+        self.signals = TranslateSignals()
+        self._cancelled = False
+        self.setAutoDelete(False)
+
+    def cancel(self):
+        self._cancelled = True
+
+    @property
+    def is_cancelled(self):
+        return self._cancelled
+
+    def run(self):
+        results = []
+        try:
+            for start in range(0, len(self.texts), self.stream_chunk):
+                if self._cancelled:
+                    return
+                chunk = self.texts[start:start + self.stream_chunk]
+                known = self.known[start:start + self.stream_chunk]
+                pending = [text for text, k in zip(chunk, known) if k is None]
+                fresh = iter(self.translator.translate_batch(pending) if pending else [])
+                for offset, k in enumerate(known):
+                    text = k if k is not None else next(fresh)
+                    results.append(text)
+                    self.signals.paragraph_done.emit(self.slide_idx, start + offset, text)
+        except Exception as e:
+            self.signals.failed.emit(self.slide_idx, str(e))
+            return
+        if self._cancelled:
+            return
+        self.signals.finished.emit(self.slide_idx, results)
+
+
+class DeckTranslateSignals(QObject):
+    progress = Signal(int, int)   # 翻訳済みのユニーク段落数, 全ユニーク段落数
+    finished = Signal(object)     # {slide_idx: translations}
+    failed = Signal(str)
+
+
+class DeckTranslateJob(QRunnable):
+    """
+    複数スライドの段落を1つのジョブで翻訳する
+    同じ原文（タイトルの繰り返し・フッターなど）はデッキ全体で1回だけモデルに渡し、
+    chunk 件ずつ translate_batch に渡して進捗を通知する
+    """
+
+    def __init__(self, translator, slides, known=None, chunk=64):
+        """
+        slides: {slide_idx: 段落テキストのリスト}
+        known: {slide_idx: マニフェストから引き継いだ訳文（None の段落だけモデルに渡す）}
+        """
+        super().__init__()
+        self.translator = translator
+        self.slides = {idx: list(texts) for idx, texts in slides.items()}
+        self.known = known or {}
+        self.chunk = chunk
+        self.signals = DeckTranslateSignals()
+        self._cancelled = False
+        self.setAutoDelete(False)
+
+    def cancel(self):
+        self._cancelled = True
+
+    @property
+    def is_cancelled(self):
+        return self._cancelled
+
+    def unique_texts(self):
+        """モデルに渡す原文（重複なし・出現順）"""
+        unique = {}
+        for idx, texts in self.slides.items():
+            known = self.known.get(idx) or [None] * len(texts)
+            for text, k in zip(texts, known):
+                if k is None:
+                    unique.setdefault(text, None)
+        return list(unique)
+
+    def run(self):
+        unique = self.unique_texts()
+        translated = {}
+        try:
+            for start in range(0, len(unique), self.chunk):
+                if self._cancelled:
+                    return
+                chunk = unique[start:start + self.chunk]
+                translated.update(zip(chunk, self.translator.translate_batch(chunk)))
+                self.signals.progress.emit(len(translated), len(unique))
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        if self._cancelled:
+            return
+
+        results = {}
+        for idx, texts in self.slides.items():
+            known = self.known.get(idx) or [None] * len(texts)
+            results[idx] = [k if k is not None else translated[text] for text, k in zip(texts, known)]
+        self.signals.finished.emit(results)
+
+
+# ---------------------------
+# 汎用バックグラウンド呼び出し
+# ---------------------------
+class BackgroundSignals(QObject):
+    done = Signal(object)
+    failed = Signal(str)
+
+
+class BackgroundCall(QRunnable):
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = BackgroundSignals()
+        self.setAutoDelete(False)
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.done.emit(result)
@@ -0,0 +1,196 @@
+# xml_extract.py
+"""
+python-pptx を使わずに .pptx (zip) から直接テキストを抽出する高速パス
+
+ppt/slides/slideN.xml（とノート）を lxml.etree.iterparse でストリーム解析し、
+処理し終えた要素はその場で clear するので、デッキが大きくてもメモリはほぼ一定
+グループ・表・ノートのテキストも含む
+PPTModel.extract_slides_text は、まだ書き換えていないデッキではこのモジュールで抽出する
+（python-pptx のオブジェクトは書き込むときまで作らない）
+"""
+from collections import namedtuple
+import posixpath
+import zipfile
+
+from lxml import etree
+
+A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+NOTES_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/notesSlide"
+
+SHAPE_TAGS = {P + "sp", P + "graphicFrame", P + "grpSp", P + "pic", P + "cxnSp"}
+RUN_TAGS = {A + "r", A + "fld"}
+# iterparse でイベントを受け取るタグ（run や書式要素のイベントは受け取らない）
+EVENT_TAGS = sorted(SHAPE_TAGS | {P + "cNvPr", P + "ph", A + "tbl", A + "tr", A + "tc",
+                                  P + "txBody", A + "txBody", A + "p"})
+
+# slide: スライド番号 (0 始まり)
+# part: "slide" / "notes"
+# shape_id: 図形の cNvPr id（数字なら int。表のセルは "id:r行c列"。pptx_writer と同じ）
+# paragraph: 図形（セル）内の段落番号
+# run_offsets: 段落テキスト内での各 run (a:r / a:fld) の (開始, 終了) 位置
+# text: 段落テキスト（改行 a:br は "\v"）
+TextRecord = namedtuple("TextRecord", "slide part shape_id paragraph run_offsets text")
+
+# 図形として数える親（pptx_writer.iter_text_bodies と同じく spTree / grpSp の直下だけ）
+_SHAPE_PARENTS = {P + "spTree", P + "grpSp"}
+
+
+def shape_id_value(value):
+    """cNvPr の id 属性を図形 ID にする（数字なら int。COM の Shape.Id と同じ型）"""
+    return int(value) if value and value.isdigit() else value
+
+
+def _read_rels(zf, rels_name):
+    """rels パートを {rId: (Type, Target)} で返す"""
+    if rels_name not in zf.namelist():
+        return {}
+    root = etree.fromstring(zf.read(rels_name))
+    return {rel.get("Id"): (rel.get("Type"), rel.get("Target")) for rel in root.iter(REL + "Relationship")}
+
+
+def _resolve(base_dir, target):
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(base_dir, target))
+
+
+def _rels_name(part_name):
+    directory, name = posixpath.split(part_name)
+    return posixpath.join(directory, "_rels", name + ".rels")
+
+
+def slide_part_names(zf):
+    """presentation.xml の sldIdLst 順にスライドのパート名を返す"""
+    rels = _read_rels(zf, "ppt/_rels/presentation.xml.rels")
+    root = etree.fromstring(zf.read("ppt/presentation.xml"))
+    id_list = root.find(P + "sldIdLst")
+    if id_list is None:
+        return []
+    return [_resolve("ppt", rels[sld.get(R + "id")][1]) for sld in id_list]
+
+
+def notes_part_name(zf, slide_part):
+    for rel_type, target in _read_rels(zf, _rels_name(slide_part)).values():
+        if rel_type == NOTES_REL_TYPE:
+            return _resolve(posixpath.dirname(slide_part), target)
+    return None
+
+
+def _paragraph_text(p):
+    pieces = []
+    offsets = []
+    pos = 0
+    for child in p:
+        if child.tag in RUN_TAGS:
+            t = child.find(A + "t")
+            text = (t.text or "") if t is not None else ""
+            offsets.append((pos, pos + len(text)))
+        elif child.tag == A + "br":
+            text = "\v"
+        else:
+            continue
+        pieces.append(text)
+        pos += len(text)
+    return "".join(pieces), tuple(offsets)
+
+
+def iter_part_records(source, slide_idx, part="slide", include_empty=False):
+    """1パート (slideN.xml / notesSlideN.xml) を iterparse して TextRecord を返す"""
+    shapes = []  # [shape_id, placeholder type, 対象か] のスタック（グループの入れ子に対応）
+    row = col = -1
+    paragraph = 0
+
+    for event, elem in etree.iterparse(source, events=("start", "end"), tag=EVENT_TAGS):
+        tag = elem.tag
+        if event == "start":
+            if tag in SHAPE_TAGS:
+                parent = elem.getparent()
+                wanted = parent is not None and parent.tag in _SHAPE_PARENTS and (not shapes or shapes[-1][2])
+                shapes.append([None, None, wanted])
+            elif tag == P + "cNvPr":
+                if shapes and shapes[-1][0] is None:
+                    shapes[-1][0] = shape_id_value(elem.get("id"))
+            elif tag == P + "ph":
+                if shapes:
+                    shapes[-1][1] = elem.get("type", "obj")
+            elif tag == A + "tbl":
+                row = -1
+            elif tag == A + "tr":
+                row += 1
+                col = -1
+            elif tag == A + "tc":
+                col += 1
+            elif tag in (P + "txBody", A + "txBody"):
+                paragraph = 0
+            continue
+
+        if tag == A + "p":
+            text, offsets = _paragraph_text(elem)
+            shape_id, ph_type, wanted = shapes[-1] if shapes else (None, None, False)
+            # ノートは本文プレースホルダーのみ（スライド画像・ページ番号は除く）
+            wanted = wanted and (part != "notes" or ph_type == "body")
+            if wanted and (include_empty or text.strip()):
+                if shape_id is not None and row >= 0 and col >= 0:
+                    shape_id = f"{shape_id}:r{row}c{col}"
+                yield TextRecord(slide_idx, part, shape_id, paragraph, offsets, text)
+            paragraph += 1
+            elem.clear()
+        elif tag == A + "tbl":
+            row = col = -1
+        elif tag in SHAPE_TAGS:
+            shapes.pop()
+            # 処理済みの図形と、その前の兄弟要素を解放する
+            elem.clear()
+            parent = elem.getparent()
+            while parent is not None and elem.getprevious() is not None:
+                del parent[0]
+
+
+def iter_text_records(path, include_notes=True, include_empty=False):
+    """デッキ全体の TextRecord をスライド順に返す"""
+    with zipfile.ZipFile(path) as zf:
+        for slide_idx, slide_part in enumerate(slide_part_names(zf)):
+            with zf.open(slide_part) as f:
+                yield from iter_part_records(f, slide_idx, "slide", include_empty)
+            if include_notes:
+                notes_part = notes_part_name(zf, slide_part)
+                if notes_part:
+                    with zf.open(notes_part) as f:
+                        yield from iter_part_records(f, slide_idx, "notes", include_empty)
+
+
+def extract_shape_texts(path, with_ids=False):
+    """
+    スライドごとの図形（セル）単位のテキスト（段落は "\n"）
+    PPTModel.extract_slides_text / pptx_writer.SlideTextWriter.texts と同じ順・同じ値
+    with_ids=True なら各要素を (shape_id, text) にする
+    """
+    with zipfile.ZipFile(path) as zf:
+        slides = []
+        for slide_idx, slide_part in enumerate(slide_part_names(zf)):
+            bodies = []
+            with zf.open(slide_part) as f:
+                for record in iter_part_records(f, slide_idx, "slide", include_empty=True):
+                    # 段落番号は txBody ごとに 0 から始まる
+                    if record.paragraph == 0:
+                        bodies.append((record.shape_id, []))
+                    bodies[-1][1].append(record.text)
+            slides.append([(shape_id, "\n".join(texts)) if with_ids else "\n".join(texts)
+                           for shape_id, texts in bodies])
+    return slides
+
+
+def extract_slides_text(path, include_notes=False):
+    """
+    スライドごとの段落テキストを [[para1, para2, ...], [...], ...] で返す
+    （PowerPointCOM.extract_texts と同じ段落単位）
+    """
+    with zipfile.ZipFile(path) as zf:
+        slides_text = [[] for _ in slide_part_names(zf)]
+    for record in iter_text_records(path, include_notes):
+        slides_text[record.slide].append(record.text)
+    return slides_text
@@ -0,0 +1,98 @@
+# zip_package.py
+"""
+.pptx (zip) を差分保存する
+
+変更したパートだけを書き直し、それ以外のメンバー（画像・動画など）は
+圧縮済みのバイト列をそのままコピーする（展開も再圧縮もしない）
+保存時間とメモリは、デッキ全体ではなく編集したテキスト量に比例する
+"""
+import copy
+import os
+import shutil
+import struct
+import tempfile
+import zipfile
+
+_COPY_CHUNK = 1 << 20
+_DATA_DESCRIPTOR_FLAG = 0x08
+_ZIP64_EXTRA_ID = 0x0001
+
+
+def _strip_zip64_extra(extra):
+    """extra フィールドから ZIP64 情報を除く（FileHeader が必要に応じて付け直す）"""
+    out = b""
+    pos = 0
+    while pos + 4 <= len(extra):
+        header_id, size = struct.unpack("<HH", extra[pos:pos + 4])
+        if header_id != _ZIP64_EXTRA_ID:
+            out += extra[pos:pos + 4 + size]
+        pos += 4 + size
+    return out
+
+
+def _copy_raw(zin, zout, info):
+    """圧縮済みデータを展開せずに zout へコピーする"""
+    zin.fp.seek(info.header_offset)
+    header = zin.fp.read(zipfile.sizeFileHeader)
+    if header[:4] != zipfile.stringFileHeader:
+        raise zipfile.BadZipFile(f"ローカルヘッダが不正です: {info.filename}")
+    name_len, extra_len = struct.unpack("<HH", header[26:30])
+    data_offset = info.header_offset + zipfile.sizeFileHeader + name_len + extra_len
+
+    out = copy.copy(info)
+    # CRC・サイズは分かっているのでローカルヘッダに書き、データディスクリプタは付けない
+    out.flag_bits &= ~_DATA_DESCRIPTOR_FLAG
+    out.extra = _strip_zip64_extra(info.extra)
+    zip64 = out.file_size > zipfile.ZIP64_LIMIT or out.compress_size > zipfile.ZIP64_LIMIT
+
+    out.header_offset = zout.fp.tell()
+    zout.fp.write(out.FileHeader(zip64))
+    zin.fp.seek(data_offset)
+    remaining = info.compress_size
+    while remaining:
+        chunk = zin.fp.read(min(_COPY_CHUNK, remaining))
+        if not chunk:
+            raise zipfile.BadZipFile(f"データが途中で終わっています: {info.filename}")
+        zout.fp.write(chunk)
+        remaining -= len(chunk)
+
+    zout.filelist.append(out)
+    zout.NameToInfo[out.filename] = out
+    zout.start_dir = zout.fp.tell()
+
+
+def write_package(src_path, dst_path, replacements):
+    """
+    src_path の各メンバーを dst_path へ書き出す
+    replacements ({メンバー名: bytes}) にあるものだけ新しい内容で圧縮し直し、
+    それ以外は圧縮済みバイト列をそのままコピーする
+    同じディレクトリの一時ファイルに書いてから置き換えるので、dst_path == src_path でもよい
+
+    元のパッケージに無いメンバーは末尾に追加するだけで、[Content_Types].xml やリレーションは
+    書き換えない。新しいパートを足すときは、それらの更新版も replacements に含めること
+    """
+    replacements = {name.lstrip("/"): data for name, data in replacements.items()}
+    if not replacements:
+        if not os.path.exists(dst_path) or not os.path.samefile(src_path, dst_path):
+            shutil.copyfile(src_path, dst_path)
+        return dst_path
+
+    fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(os.path.abspath(dst_path)))
+    try:
+        with os.fdopen(fd, "w+b") as tmp, zipfile.ZipFile(src_path) as zin, zipfile.ZipFile(tmp, "w") as zout:
+            for info in zin.infolist():
+                data = replacements.pop(info.filename, None)
+                if data is None:
+                    _copy_raw(zin, zout, info)
+                else:
+                    zout.writestr(zipfile.ZipInfo(info.filename, info.date_time), data,
+                                  compress_type=zipfile.ZIP_DEFLATED)
+            # 元のパッケージに無いパートは末尾に追加する
+            for name, data in replacements.items():
+                zout.writestr(name, data, compress_type=zipfile.ZIP_DEFLATED)
+        shutil.copymode(src_path, tmp_path)  # mkstemp は 0600 で作るので元ファイルに合わせる
+        os.replace(tmp_path, dst_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return dst_path